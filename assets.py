@@ -0,0 +1,130 @@
+import gzip
+import hashlib
+import mimetypes
+import os
+import re
+
+from flask import abort, request, send_file
+from werkzeug.security import safe_join
+
+
+# ----------------------------------------
+# Fingerprinted static assets
+# ----------------------------------------
+# url_for('static', filename=...) gains a ?v=<content hash> argument, so a
+# URL changes whenever the file does and browsers can cache it forever. The
+# static view answers fingerprinted requests with an immutable
+# Cache-Control, uses the content hash as a strong ETag, and leaves
+# conditional GET and Range handling to send_file(). Compressible files are
+# served from a .br/.gz sibling when one exists and the client accepts it.
+
+CONTENT_HASH_RE = re.compile(r'[0-9a-f]{64}')
+COMPRESSIBLE = {'.css', '.js', '.svg', '.json', '.txt', '.map'}
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+ONE_YEAR = 365 * 24 * 3600
+
+
+class StaticAssets:
+    def __init__(self, app=None):
+        self._cache = {}  # path -> (mtime_ns, size, digest)
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.folder = app.static_folder
+        app.url_defaults(self._add_fingerprint)
+        app.view_functions['static'] = self.serve
+
+    def fingerprint(self, filename):
+        # Content-addressed uploads carry their hash in the name already.
+        match = CONTENT_HASH_RE.search(filename)
+        if match:
+            return match.group(0)
+
+        path = safe_join(self.folder, filename)
+        if path is None:
+            return None
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        cached = self._cache.get(path)
+        if cached and cached[0] == stat.st_mtime_ns and cached[1] == stat.st_size:
+            return cached[2]
+
+        hasher = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(64 * 1024), b''):
+                hasher.update(chunk)
+        digest = hasher.hexdigest()
+        self._cache[path] = (stat.st_mtime_ns, stat.st_size, digest)
+        return digest
+
+    def _add_fingerprint(self, endpoint, values):
+        if endpoint == 'static' and 'filename' in values and 'v' not in values:
+            digest = self.fingerprint(values['filename'])
+            if digest:
+                values['v'] = digest[:16]
+
+    def serve(self, filename):
+        path = safe_join(self.folder, filename)
+        if path is None or not os.path.isfile(path):
+            abort(404)
+
+        digest = self.fingerprint(filename)
+        ext = os.path.splitext(filename)[1].lower()
+        mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+
+        send_path, encoding = path, None
+        if ext in COMPRESSIBLE:
+            accepted = request.accept_encodings
+            for name, suffix in ENCODINGS:
+                candidate = path + suffix
+                if (accepted[name] and os.path.isfile(candidate)
+                        and os.path.getmtime(candidate) >= os.path.getmtime(path)):
+                    send_path, encoding = candidate, name
+                    break
+
+        etag = f"{digest[:32]}-{encoding}" if encoding else digest[:32]
+        response = send_file(send_path, mimetype=mimetype, conditional=True, etag=etag)
+        if encoding:
+            response.headers['Content-Encoding'] = encoding
+        if ext in COMPRESSIBLE:
+            response.vary.add('Accept-Encoding')
+
+        if request.args.get('v') == digest[:16]:
+            response.cache_control.no_cache = None
+            response.cache_control.public = True
+            response.cache_control.max_age = ONE_YEAR
+            response.cache_control.immutable = True
+        else:
+            # Unversioned or stale URL: cacheable, but always revalidated.
+            response.cache_control.no_cache = True
+        return response
+
+
+def precompress(folder):
+    """Write .gz (and .br when the brotli package is installed) next to
+    every compressible file under `folder`. Returns the files written."""
+    try:
+        import brotli
+    except ImportError:
+        brotli = None
+
+    written = []
+    for dirpath, _, filenames in os.walk(folder):
+        for name in filenames:
+            if os.path.splitext(name)[1].lower() not in COMPRESSIBLE:
+                continue
+            path = os.path.join(dirpath, name)
+            with open(path, 'rb') as f:
+                data = f.read()
+
+            with open(path + '.gz', 'wb') as f:
+                f.write(gzip.compress(data, compresslevel=9, mtime=0))
+            written.append(path + '.gz')
+            if brotli is not None:
+                with open(path + '.br', 'wb') as f:
+                    f.write(brotli.compress(data, quality=11))
+                written.append(path + '.br')
+    return written
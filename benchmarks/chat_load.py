@@ -0,0 +1,110 @@
+"""Synthetic chat load through the Flask-SocketIO test client.
+
+    python benchmarks/chat_load.py --clients 50 --messages 40
+
+Clients are paired into direct-message rooms and every client also sits in
+the lobby. Each client sends --messages room messages and a few lobby
+messages. The run is repeated with the message pipeline off and on, each in
+a fresh subprocess with its own SQLite file.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def run_mode(n_clients, n_messages):
+    sys.path.insert(0, ROOT)
+    from app import create_app, db, init_socketio
+    from model import ChatMessage, User
+    from sqlalchemy import event
+    from werkzeug.security import generate_password_hash
+
+    app = create_app()
+    socketio = init_socketio(app)
+    with app.app_context():
+        db.create_all()
+        password = generate_password_hash('pw')
+        db.session.add_all([User(username=f'user{i}', email=f'user{i}@example.com',
+                                 password=password) for i in range(n_clients)])
+        db.session.commit()
+        commits = [0]
+        event.listen(db.engine, 'commit', lambda conn: commits.__setitem__(0, commits[0] + 1))
+
+    clients = []
+    for i in range(n_clients):
+        http = app.test_client()
+        http.post('/login', data={'login_field': f'user{i}', 'password': 'pw'})
+        sock = socketio.test_client(app, flask_test_client=http)
+        partner = i + 1 if i % 2 == 0 else i - 1
+        room = f"{i + 1}-{partner + 1}"
+        sock.emit('join', {'room': room})
+        sock.get_received()
+        clients.append((sock, room))
+
+    baseline = commits[0]
+    start = time.perf_counter()
+    for n in range(n_messages):
+        for i, (sock, room) in enumerate(clients):
+            sock.emit('message', {'room': room, 'msg': f'message {n} from {i}'})
+            if n % 10 == 0:
+                sock.emit('send_message', {'message': f'lobby {n} from {i}'})
+    send_elapsed = time.perf_counter() - start
+
+    expected = n_clients * n_messages + n_clients * ((n_messages + 9) // 10)
+    with app.app_context():
+        while ChatMessage.query.count() < expected:
+            time.sleep(0.01)
+    total_elapsed = time.perf_counter() - start
+
+    time.sleep(0.3)  # let the last frames go out
+    emits = frames = 0
+    for sock, _ in clients:
+        for packet in sock.get_received():
+            emits += 1
+            frames += packet['name'].endswith('_batch')
+
+    chat_pipeline = app.extensions['chat_pipeline']
+    metrics = chat_pipeline.metrics() if chat_pipeline else {}
+    print(json.dumps({
+        'messages': expected,
+        'send_msgs_per_sec': round(expected / send_elapsed, 1),
+        'persisted_msgs_per_sec': round(expected / total_elapsed, 1),
+        'commits': commits[0] - baseline,
+        'emits_received': emits,
+        'batched_frames_received': frames,
+        'pipeline_batches': metrics.get('batches'),
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--clients', type=int, default=50)
+    parser.add_argument('--messages', type=int, default=40)
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_mode(args.clients, args.messages)
+        return
+
+    for label, pipeline in (('direct', '0'), ('pipeline', '1')):
+        with tempfile.TemporaryDirectory() as tmp:
+            env = dict(os.environ,
+                       DATABASE_URL=f"sqlite:///{os.path.join(tmp, 'bench.db')}",
+                       CHAT_PIPELINE=pipeline)
+            out = subprocess.run(
+                [sys.executable, __file__, '--child',
+                 '--clients', str(args.clients), '--messages', str(args.messages)],
+                env=env, cwd=tmp, capture_output=True, text=True, check=True,
+            ).stdout.strip().splitlines()[-1]
+        print(f"{label:<9} {out}")
+
+
+if __name__ == '__main__':
+    main()
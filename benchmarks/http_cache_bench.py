@@ -0,0 +1,118 @@
+"""Bytes on the wire and CPU per page, with and without gzip and 304s.
+
+    python benchmarks/http_cache_bench.py --requests 100
+
+Seeds a fresh SQLite database with benchmarks/seed.py and builds one app
+per configuration:
+
+    plain       no compression, no conditional GET (the old behaviour)
+    gzip-1/6/9  compression at that level, full page loads
+    304         conditional GET: the browser revalidates with the ETag from
+                its last visit and nothing changed in between
+
+Each page is fetched --requests times by a logged-in client that sends
+Accept-Encoding: gzip. The report gives the body size on the wire, p50
+latency and mean process CPU per request. A second table times
+gzip.compress alone on each page body at every level, i.e. what
+compression adds to a request on top of rendering.
+"""
+import argparse
+import gzip
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+VOLUMES = {'users': 200, 'posts': 3000, 'blogs': 500, 'likes': 6000, 'tasks': 1000,
+           'help_requests': 500, 'help_replies': 4000, 'chat_messages': 100}
+
+CONFIGS = {
+    'plain': {'COMPRESS_MIN_BYTES': None, 'CONDITIONAL_GET': False},
+    'gzip-1': {'COMPRESS_LEVEL': 1},
+    'gzip-6': {'COMPRESS_LEVEL': 6},
+    'gzip-9': {'COMPRESS_LEVEL': 9},
+    '304': {'COMPRESS_LEVEL': 6},
+}
+
+
+def pages(app):
+    from model import Blog, HelpRequest, User
+
+    with app.app_context():
+        blog_id = Blog.query.order_by(Blog.like_count.desc()).first().id
+        help_id = HelpRequest.query.order_by(HelpRequest.reply_count.desc()).first().id
+        username = User.query.first().username
+    return ['/', '/blogs', f'/blog/{blog_id}', '/help', f'/help/{help_id}',
+            f'/profile/{username}', f'/help/{help_id}/replies/newer']
+
+
+def fetch(client, path, n, revalidate):
+    headers = {'Accept-Encoding': 'gzip'}
+    if revalidate:
+        headers['If-None-Match'] = client.get(path, headers=headers).headers['ETag']
+    walls, cpus, sizes = [], [], []
+    for _ in range(n):
+        wall, cpu = time.perf_counter(), time.process_time()
+        response = client.get(path, headers=headers)
+        cpus.append(time.process_time() - cpu)
+        walls.append(time.perf_counter() - wall)
+        sizes.append(len(response.data))
+        assert response.status_code == (304 if revalidate else 200), (path, response.status_code)
+    return {'bytes': statistics.mean(sizes), 'p50_ms': statistics.median(walls) * 1000,
+            'cpu_ms': statistics.mean(cpus) * 1000}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--requests', type=int, default=100)
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp(prefix='flaskbook-bench-')
+    os.environ.setdefault('DATABASE_URL', f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+    sys.path.insert(0, ROOT)
+    from app import create_app
+    from seed import seed
+
+    base = {'SEARCH_BACKEND': 'memory', 'TIMELINE_BACKEND': 'memory',
+            'UPLOAD_FOLDER': os.path.join(tmp, 'uploads')}
+    seed(create_app(base), VOLUMES)
+
+    results, bodies = {}, {}
+    for label, config in CONFIGS.items():
+        app = create_app(dict(base, **config))
+        client = app.test_client()
+        username = pages(app)[5].rsplit('/', 1)[1]
+        client.post('/login', data={'login_field': username, 'password': 'pw'})
+        client.get('/')  # consumes the welcome flash
+        for path in pages(app):
+            if label == 'plain':
+                bodies[path] = client.get(path).data
+            results[label, path] = fetch(client, path, args.requests, revalidate=(label == '304'))
+    paths = list(bodies)
+
+    print(f"{args.requests} requests per page; bytes = response body, cpu = process time per request\n")
+    print(f"{'page':<26}" + ''.join(f"{label:>24}" for label in CONFIGS))
+    print(f"{'':<26}" + ''.join(f"{'bytes   p50 ms  cpu ms':>24}" for _ in CONFIGS))
+    for path in paths:
+        print(f"{path:<26}" + ''.join(
+            f"{r['bytes']:>8.0f} {r['p50_ms']:7.2f} {r['cpu_ms']:7.2f}"
+            for r in (results[label, path] for label in CONFIGS)))
+
+    print("\ngzip.compress alone, per page body")
+    print(f"{'page':<26}{'raw':>8}" + ''.join(f"{f'level {level}':>22}" for level in (1, 6, 9)))
+    for path in paths:
+        row = f"{path:<26}{len(bodies[path]):>8}"
+        for level in (1, 6, 9):
+            started = time.perf_counter()
+            for _ in range(args.requests):
+                packed = gzip.compress(bodies[path], compresslevel=level, mtime=0)
+            micros = (time.perf_counter() - started) / args.requests * 1e6
+            row += f"{len(packed):>8} {len(packed) / len(bodies[path]):4.0%} {micros:6.0f} us"
+        print(row)
+
+
+if __name__ == '__main__':
+    main()
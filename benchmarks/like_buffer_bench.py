@@ -0,0 +1,110 @@
+"""Like endpoint throughput with and without the write-behind buffer.
+
+    python benchmarks/like_buffer_bench.py --clients 16 --seconds 5
+
+Each mode runs in a fresh subprocess against its own SQLite file so the
+LIKE_WRITE_BEHIND environment setting is picked up by config.Config.
+"""
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def run_mode(clients, seconds, posts):
+    sys.path.insert(0, ROOT)
+    from app import create_app, db
+    from model import Like, Post, User
+    from sqlalchemy import event
+    from werkzeug.security import generate_password_hash
+
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        password = generate_password_hash('pw')
+        users = [User(username=f'user{i}', email=f'user{i}@example.com', password=password)
+                 for i in range(clients)]
+        db.session.add_all(users)
+        db.session.commit()
+        db.session.add_all([Post(content=f'post {i}', user_id=users[0].id) for i in range(posts)])
+        db.session.commit()
+
+        commits = [0]
+        event.listen(db.engine, 'commit', lambda conn: commits.__setitem__(0, commits[0] + 1))
+
+    requests_done = [0] * clients
+    stop = threading.Event()
+
+    def worker(i):
+        client = app.test_client()
+        client.post('/login', data={'login_field': f'user{i}', 'password': 'pw'})
+        rng = random.Random(i)
+        while not stop.is_set():
+            # Skewed towards the first few posts, like a trending post.
+            post_id = min(int(rng.expovariate(1.0)) + 1, posts)
+            client.post(f'/like_post/{post_id}')
+            requests_done[i] += 1
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(clients)]
+    baseline = commits[0]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    time.sleep(seconds)
+    stop.set()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+    like_buffer = app.extensions['like_buffer']
+    if like_buffer is not None:
+        like_buffer.stop()
+
+    with app.app_context():
+        drift = sum(
+            abs(post.like_count - Like.query.filter_by(post_id=post.id).count())
+            for post in Post.query.all()
+        )
+
+    total = sum(requests_done)
+    print(json.dumps({
+        'requests_per_sec': round(total / elapsed, 1),
+        'commits_per_sec': round((commits[0] - baseline) / elapsed, 1),
+        'commits_per_request': round((commits[0] - baseline) / max(total, 1), 3),
+        'counter_drift': drift,
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--clients', type=int, default=16)
+    parser.add_argument('--seconds', type=float, default=5)
+    parser.add_argument('--posts', type=int, default=20)
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_mode(args.clients, args.seconds, args.posts)
+        return
+
+    for label, write_behind in (('direct', '0'), ('write-behind', '1')):
+        with tempfile.TemporaryDirectory() as tmp:
+            env = dict(os.environ,
+                       DATABASE_URL=f"sqlite:///{os.path.join(tmp, 'bench.db')}",
+                       LIKE_WRITE_BEHIND=write_behind)
+            out = subprocess.run(
+                [sys.executable, __file__, '--child', '--clients', str(args.clients),
+                 '--seconds', str(args.seconds), '--posts', str(args.posts)],
+                env=env, cwd=tmp, capture_output=True, text=True, check=True,
+            ).stdout.strip().splitlines()[-1]
+        print(f"{label:<13} {out}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,145 @@
+"""Feed latency while a login flood is running, inline vs pooled hashing.
+
+    python benchmarks/login_storm_bench.py --threads 8 --login-rate 20 --seconds 5
+
+Each mode runs in a fresh subprocess against its own seeded SQLite file, so
+PASSWORD_HASH_WORKERS is picked up at import time. The server is modelled as
+a pool of --threads request threads (like gunicorn's gthread worker) fed
+from an unbounded backlog. A prober submits GET / every 20 ms and records
+latency from submission, so time spent waiting for a free thread counts.
+Modes:
+  - inline: every hash runs on the request thread;
+  - pool: hashing uses the bounded process pool, and overflow gets a 503.
+The feed is measured idle, then while logins arrive at --login-rate per
+second.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'benchmarks'))
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, round(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[rank]
+
+
+def summary(latencies):
+    ordered = sorted(latencies)
+    return {f'p{p}_ms': round(percentile(ordered, p) * 1000, 1) for p in (50, 95, 99)}
+
+
+def run_mode(threads, login_rate, seconds, users):
+    sys.path.insert(0, ROOT)
+    import seed
+    from app import create_app
+
+    # Memory backends keep instance/*.db untouched.
+    app = create_app({'SEARCH_BACKEND': 'memory', 'TIMELINE_BACKEND': 'memory'})
+    seed.seed(app, {'users': users, 'posts': 2000, 'blogs': 50, 'likes': 2000, 'tasks': 100,
+                          'help_requests': 20, 'help_replies': 100, 'chat_messages': 10})
+    server = ThreadPoolExecutor(max_workers=threads)
+
+    def timed_get(submitted, out):
+        app.test_client().get('/')
+        out.append(time.perf_counter() - submitted)
+
+    def login(i, outcomes):
+        response = app.test_client().post('/login', data={
+            'login_field': f'user{i % users + 1}', 'password': 'pw'})
+        outcomes[response.status_code] = outcomes.get(response.status_code, 0) + 1
+
+    def probe(duration):
+        latencies = []
+        futures = []
+        end = time.perf_counter() + duration
+        while time.perf_counter() < end:
+            futures.append(server.submit(timed_get, time.perf_counter(), latencies))
+            time.sleep(0.02)
+        return futures, latencies
+
+    # Warm up templates, caches and the hashing pool.
+    for future in [server.submit(timed_get, time.perf_counter(), []) for _ in range(threads)]:
+        future.result()
+    login(0, {})
+
+    futures, idle = probe(seconds / 2)
+    for future in futures:
+        future.result()
+
+    outcomes = {}
+    login_futures = []
+
+    def flood():
+        i = 0
+        start = time.perf_counter()
+        while time.perf_counter() - start < seconds:
+            due = int((time.perf_counter() - start) * login_rate)
+            while i < due:
+                login_futures.append(server.submit(login, i, outcomes))
+                i += 1
+            time.sleep(0.005)
+
+    flooder = threading.Thread(target=flood)
+    storm_start = time.perf_counter()
+    flooder.start()
+    futures, loaded = probe(seconds)
+    flooder.join()
+    for future in futures + login_futures:
+        future.result()
+    drain = time.perf_counter() - storm_start
+    server.shutdown()
+    app.extensions['password_hasher'].shutdown()
+
+    print(json.dumps({
+        'feed_idle': summary(idle),
+        'feed_during_flood': summary(loaded),
+        'logins_submitted': len(login_futures),
+        'logins_ok': outcomes.get(302, 0),
+        'logins_503': outcomes.get(503, 0),
+        'seconds_to_drain': round(drain, 1),
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--threads', type=int, default=8, help='request threads')
+    parser.add_argument('--login-rate', type=float, default=20, help='logins submitted per second')
+    parser.add_argument('--seconds', type=float, default=5)
+    parser.add_argument('--users', type=int, default=200)
+    parser.add_argument('--hash-workers', type=int, default=2)
+    parser.add_argument('--hash-queue', type=int, default=2)
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_mode(args.threads, args.login_rate, args.seconds, args.users)
+        return
+
+    for label, workers in (('inline', 0), ('pool', args.hash_workers)):
+        with tempfile.TemporaryDirectory() as tmp:
+            env = dict(os.environ,
+                       DATABASE_URL=f"sqlite:///{os.path.join(tmp, 'bench.db')}",
+                       PASSWORD_HASH_WORKERS=str(workers),
+                       PASSWORD_HASH_QUEUE=str(args.hash_queue))
+            out = subprocess.run(
+                [sys.executable, __file__, '--child', '--threads', str(args.threads),
+                 '--login-rate', str(args.login_rate), '--seconds', str(args.seconds),
+                 '--users', str(args.users)],
+                env=env, cwd=tmp, capture_output=True, text=True, check=True,
+            ).stdout.strip().splitlines()[-1]
+        print(f"{label:<7} {out}")
+
+
+if __name__ == '__main__':
+    main()
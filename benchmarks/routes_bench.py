@@ -0,0 +1,306 @@
+"""Per-endpoint latency, query count and throughput for every route.
+
+    python benchmarks/routes_bench.py --requests 50
+    python benchmarks/routes_bench.py --requests 50 --compare benchmarks/results/<baseline>.json
+
+Seeds a fresh SQLite database (or the empty database named by DATABASE_URL)
+with benchmarks/seed.py. Then it drives each HTTP route through the Flask
+test client and each Socket.IO event through the Socket.IO test client,
+--requests times each, and reports p50/p95/p99 latency, SQL statements per
+request and sequential requests/second. Results are written as JSON
+(--save). --compare prints the change against an earlier run and, with
+--fail-on-regression, exits non-zero when a p50 or p95 grew by more than
+--tolerance.
+
+Query counts include statements from the app's background threads (chat
+persistence, like flushes) that happen to run during a request.
+"""
+import argparse
+import io
+import json
+import os
+import platform
+import random
+import struct
+import subprocess
+import sys
+import tempfile
+import time
+import zlib
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(ROOT, 'benchmarks', 'results')
+
+
+def pixel_png(i):
+    # A distinct, valid 1x1 PNG per upload, so every request stores a new file.
+    def chunk(kind, data):
+        return (struct.pack('>I', len(data)) + kind + data
+                + struct.pack('>I', zlib.crc32(kind + data) & 0xffffffff))
+    header = struct.pack('>IIBBBBB', 1, 1, 8, 2, 0, 0, 0)
+    pixel = zlib.compress(bytes([0, i % 256, (i // 256) % 256, (i // 65536) % 256]))
+    return b'\x89PNG\r\n\x1a\n' + chunk(b'IHDR', header) + chunk(b'IDAT', pixel) + chunk(b'IEND', b'')
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, round(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[rank]
+
+
+class Recorder:
+    def __init__(self, queries):
+        self.queries = queries      # one-element list bumped by an engine event
+        self.samples = {}           # label -> [(seconds, statements, ok)]
+
+    def measure(self, label, call):
+        before = self.queries[0]
+        start = time.perf_counter()
+        result = call()
+        elapsed = time.perf_counter() - start
+        status = getattr(result, 'status_code', 200)
+        self.samples.setdefault(label, []).append((elapsed, self.queries[0] - before, status < 500))
+        return result
+
+    def summary(self):
+        endpoints = {}
+        for label, samples in self.samples.items():
+            times = sorted(s[0] * 1000 for s in samples)
+            total = sum(s[0] for s in samples)
+            endpoints[label] = {
+                'requests': len(samples),
+                'errors': sum(1 for s in samples if not s[2]),
+                'p50_ms': round(percentile(times, 50), 3),
+                'p95_ms': round(percentile(times, 95), 3),
+                'p99_ms': round(percentile(times, 99), 3),
+                'mean_ms': round(total / len(samples) * 1000, 3),
+                'queries_per_request': round(sum(s[1] for s in samples) / len(samples), 2),
+                'requests_per_sec': round(len(samples) / total, 1) if total else None,
+            }
+        return endpoints
+
+
+def run(app, socketio, volumes, n, rng):
+    from sqlalchemy import event
+    from sqlalchemy.engine import Engine
+
+    from model import Post, Task, User
+    from pagination import encode_cursor
+    from views.chat import LOBBY
+
+    queries = [0]
+    event.listen(Engine, 'before_cursor_execute',
+                 lambda *args: queries.__setitem__(0, queries[0] + 1))
+    rec = Recorder(queries)
+
+    with app.app_context():
+        mid = Post.query.order_by(Post.id).offset(volumes['posts'] // 2).first()
+        feed_cursor = encode_cursor(mid.date_posted, mid.id, 'next') if mid else ''
+
+    def login(username):
+        client = app.test_client()
+        client.post('/login', data={'login_field': username, 'password': 'pw'})
+        return client
+
+    # A handful of logged-in users, visited round-robin; user1 is the most
+    # active account in the seeded data.
+    users = [f'user{i}' for i in range(1, min(volumes['users'], 8) + 1)]
+    clients = [login(name) for name in users]
+
+    def each(label, request):
+        for i in range(n):
+            client = clients[i % len(clients)]
+            rec.measure(label, lambda: request(client, i))
+
+    post_id = lambda: rng.randint(1, volumes['posts'])
+    blog_id = lambda: rng.randint(1, volumes['blogs'])
+    help_id = lambda: rng.randint(1, volumes['help_requests'])
+
+    # -- reads ---------------------------------------------------------
+    each('GET /', lambda c, i: c.get('/'))
+    each('GET / page 2', lambda c, i: c.get(f'/?cursor={feed_cursor}'))
+    each('GET / search', lambda c, i: c.get(f"/?search={rng.choice(['exam', 'biology', 'draft'])}"))
+    each('GET / by user', lambda c, i: c.get(f'/?user=user{rng.randint(1, 20)}'))
+    each('GET /users/suggest', lambda c, i: c.get(f"/users/suggest?q=user{rng.randint(1, 9)}"))
+    each('GET /dashboard', lambda c, i: c.get('/dashboard'))
+    each('GET /tasks', lambda c, i: c.get('/tasks'))
+    each('GET /tasks filtered', lambda c, i: c.get('/tasks?category=School&status=pending'))
+    each('GET /help', lambda c, i: c.get('/help'))
+    each('GET /help?subject', lambda c, i: c.get('/help?subject=Biology'))
+    each('GET /help/<id> popular', lambda c, i: c.get('/help/1'))
+    each('GET /help/<id>', lambda c, i: c.get(f'/help/{help_id()}'))
+    each('GET /help/<id>/replies/newer', lambda c, i: c.get(f'/help/{help_id()}/replies/newer'))
+    each('GET /blogs', lambda c, i: c.get('/blogs'))
+    each('GET /blog/<id>', lambda c, i: c.get(f'/blog/{blog_id()}'))
+    each('GET /profile/<username>', lambda c, i: c.get(f'/profile/user{rng.randint(1, 50)}'))
+    each('GET /chat', lambda c, i: c.get('/chat'))
+    for path in ('/create_post', '/create_task', '/create_help_request', '/create_blog',
+                 '/edit_profile', '/login', '/register'):
+        each(f'GET {path}', lambda c, i, path=path: c.get(path))
+    for path in ('/chat/metrics', '/auth/metrics', '/fragments/metrics', '/dashboard/metrics'):
+        each(f'GET {path}', lambda c, i, path=path: c.get(path))
+    static_file = next((name for name in ('style.css',)
+                        if os.path.exists(os.path.join(app.static_folder, name))), None)
+    if static_file:
+        each('GET /static/<file>', lambda c, i: c.get(f'/static/{static_file}'))
+
+    # -- writes --------------------------------------------------------
+    each('POST /like_post/<id>', lambda c, i: c.post(f'/like_post/{post_id()}'))
+    each('POST /like_blog/<id>', lambda c, i: c.post(f'/like_blog/{blog_id()}'))
+    each('POST /create_post', lambda c, i: c.post('/create_post', data={'content': f'bench post {i}'}))
+    each('POST /create_post image', lambda c, i: c.post('/create_post', data={
+        'content': f'bench image {i}', 'file': (io.BytesIO(pixel_png(i)), 'pixel.png')}))
+    each('POST /create_task', lambda c, i: c.post('/create_task', data={
+        'title': f'bench task {i}', 'category': 'School', 'due_date': '2025-12-01'}))
+    each('POST /create_help_request', lambda c, i: c.post('/create_help_request', data={
+        'title': f'bench question {i}', 'description': 'details', 'subject': 'Math'}))
+    each('POST /help/<id>/reply', lambda c, i: c.post(f'/help/{help_id()}/reply', data={'reply': f'bench reply {i}'}))
+    each('POST /create_blog', lambda c, i: c.post('/create_blog', data={
+        'title': f'bench blog {i}', 'content': 'body ' * 50}))
+    each('POST /edit_profile', lambda c, i: c.post('/edit_profile', data={'bio': f'bench bio {i}'}))
+
+    # Edits and deletes work on rows the benchmark users own.
+    with app.app_context():
+        owned_posts, owned_tasks = {}, {}
+        for name in users:
+            user = User.query.filter_by(username=name).one()
+            owned_posts[name] = [p.id for p in Post.query.filter_by(user_id=user.id)
+                                 .order_by(Post.id.desc()).limit(3 * n)]
+            owned_tasks[name] = [t.id for t in Task.query.filter_by(user_id=user.id, is_completed=False)
+                                 .order_by(Task.id.desc()).limit(3 * n)]
+
+    def owned(table, i):
+        ids = table[users[i % len(users)]]
+        return ids.pop() if ids else 0
+
+    each('GET /edit_post/<id>', lambda c, i: c.get(f'/edit_post/{owned_posts[users[i % len(users)]][-1]}'))
+    each('POST /edit_post/<id>', lambda c, i: c.post(f'/edit_post/{owned_posts[users[i % len(users)]][-1]}',
+                                                     data={'content': f'edited {i}'}))
+    each('GET /delete_post/<id>', lambda c, i: c.get(f'/delete_post/{owned(owned_posts, i)}'))
+    each('GET /complete_task/<id>', lambda c, i: c.get(f'/complete_task/{owned(owned_tasks, i)}'))
+    each('GET /delete_task/<id>', lambda c, i: c.get(f'/delete_task/{owned(owned_tasks, i)}'))
+
+    # -- account -------------------------------------------------------
+    for i in range(n):
+        client = app.test_client()
+        rec.measure('POST /register', lambda: client.post('/register', data={
+            'username': f'bench{i}', 'email': f'bench{i}@example.com', 'password': 'pw'}))
+        rec.measure('POST /login', lambda: client.post('/login', data={
+            'login_field': f'bench{i}', 'password': 'pw'}))
+        rec.measure('GET /logout', lambda: client.get('/logout'))
+
+    # -- Socket.IO -----------------------------------------------------
+    for i in range(n):
+        http = clients[i % len(clients)]
+        sock = rec.measure('ws connect', lambda: socketio.test_client(app, flask_test_client=http))
+        room = f'{i % len(clients) + 1}-{(i + 1) % len(clients) + 1}'
+        rec.measure('ws join', lambda: sock.emit('join', {'room': room}))
+        rec.measure('ws history', lambda: sock.emit('history', {'room': LOBBY}))
+        rec.measure('ws message', lambda: sock.emit('message', {'room': room, 'msg': f'bench {i}'}))
+        rec.measure('ws send_message', lambda: sock.emit('send_message', {'message': f'lobby {i}'}))
+        rec.measure('ws heartbeat', lambda: sock.emit('heartbeat'))
+        rec.measure('ws leave', lambda: sock.emit('leave', {'room': room}))
+        sock.get_received()
+        rec.measure('ws disconnect', lambda: sock.disconnect())
+
+    return rec.summary()
+
+
+def compare(current, baseline, tolerance):
+    regressions = []
+    print(f"\n{'endpoint':<34} {'p50 base':>9} {'p50 now':>9} {'Δ':>7}   {'p95 base':>9} {'p95 now':>9} {'Δ':>7}")
+    for label, now in current.items():
+        base = baseline.get(label)
+        if base is None:
+            print(f"{label:<34} {'(new)':>9}")
+            continue
+        row = []
+        for key in ('p50_ms', 'p95_ms'):
+            change = (now[key] - base[key]) / base[key] if base[key] else 0.0
+            row.append((base[key], now[key], change))
+            if change > tolerance:
+                regressions.append((label, key, change))
+        print(f"{label:<34} " + "   ".join(f"{b:9.2f} {c:9.2f} {d:+6.0%}" for b, c, d in row))
+    return regressions
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    from seed import DEFAULT_VOLUMES, seed
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--requests', type=int, default=30, help='requests per endpoint')
+    for name, default in DEFAULT_VOLUMES.items():
+        parser.add_argument(f"--{name.replace('_', '-')}", type=int, default=default)
+    parser.add_argument('--no-seed', action='store_true', help='reuse an already seeded DATABASE_URL')
+    parser.add_argument('--save', default=os.path.join(
+        RESULTS_DIR, datetime.utcnow().strftime('routes-%Y%m%dT%H%M%S.json')))
+    parser.add_argument('--compare', help='earlier results file to compare against')
+    parser.add_argument('--tolerance', type=float, default=0.25)
+    parser.add_argument('--fail-on-regression', action='store_true')
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp(prefix='flaskbook-bench-')
+    os.environ.setdefault('DATABASE_URL', f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+    sys.path.insert(0, ROOT)
+    from app import create_app, init_socketio
+    from sqlalchemy.engine import make_url
+
+    # Keep the search index and uploads out of the working tree.
+    app = create_app({'SEARCH_BACKEND': 'memory', 'TIMELINE_BACKEND': 'memory',
+                      'UPLOAD_FOLDER': os.path.join(tmp, 'uploads')})
+    socketio = init_socketio(app)
+
+    volumes = {name: getattr(args, name) for name in DEFAULT_VOLUMES}
+    if not args.no_seed:
+        started = time.perf_counter()
+        seed(app, volumes)
+        print(f"seeded in {time.perf_counter() - started:.1f}s")
+
+    endpoints = run(app, socketio, volumes, args.requests, random.Random(7))
+
+    print(f"\n{'endpoint':<34} {'p50':>8} {'p95':>8} {'p99':>8} {'q/req':>6} {'req/s':>8} {'err':>4}")
+    for label, r in endpoints.items():
+        print(f"{label:<34} {r['p50_ms']:8.2f} {r['p95_ms']:8.2f} {r['p99_ms']:8.2f} "
+              f"{r['queries_per_request']:6.1f} {r['requests_per_sec'] or 0:8.1f} {r['errors']:4d}")
+
+    results = {
+        'meta': {
+            'timestamp': datetime.utcnow().isoformat(timespec='seconds') + 'Z',
+            'git_revision': git_revision(),
+            'python': platform.python_version(),
+            'database': make_url(os.environ['DATABASE_URL']).get_backend_name(),
+            'requests_per_endpoint': args.requests,
+            'volumes': volumes,
+        },
+        'endpoints': endpoints,
+    }
+    os.makedirs(os.path.dirname(os.path.abspath(args.save)), exist_ok=True)
+    with open(args.save, 'w') as f:
+        json.dump(results, f, indent=2, sort_keys=True)
+    print(f"\nsaved {args.save}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(endpoints, baseline['endpoints'], args.tolerance)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) above {args.tolerance:.0%}:")
+            for label, key, change in regressions:
+                print(f"  {label} {key} {change:+.0%}")
+            if args.fail_on_regression:
+                sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+"""Compare the old LIKE '%term%' feed search with the search.py backends.
+
+    python benchmarks/search_bench.py --posts 100000
+"""
+import argparse
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from search import Fts5Index, MemoryIndex, fts5_available  # noqa: E402
+
+
+def make_vocabulary(size, rng):
+    letters = 'abcdefghijklmnopqrstuvwxyz'
+    words = {''.join(rng.choice(letters) for _ in range(rng.randint(4, 10))) for _ in range(size)}
+    return sorted(words)
+
+
+def make_posts(n, vocabulary, rng):
+    # Zipf-like word frequencies, like real text: a few very common words and
+    # a long tail of rare ones.
+    weights = [1 / rank for rank in range(1, len(vocabulary) + 1)]
+    return [(i, ' '.join(rng.choices(vocabulary, weights, k=rng.randint(8, 40))))
+            for i in range(1, n + 1)]
+
+
+def timed(fn, queries, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for q in queries:
+            fn(q)
+    return (time.perf_counter() - start) / (repeat * len(queries)) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--posts', type=int, default=50000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    vocabulary = make_vocabulary(20000, rng)
+    posts = make_posts(args.posts, vocabulary, rng)
+    # Mid- and low-frequency terms, plus one two-word query.
+    queries = [vocabulary[50], vocabulary[500], vocabulary[2000], vocabulary[8000],
+               f"{vocabulary[20]} {vocabulary[300]}"]
+
+    db = sqlite3.connect(':memory:')
+    db.execute('CREATE TABLE post (id INTEGER PRIMARY KEY, content TEXT NOT NULL)')
+    db.executemany('INSERT INTO post VALUES (?, ?)', posts)
+
+    def like_search(q):
+        # What index() used to pay: a COUNT(*) for the paginator plus one page.
+        pattern = f"%{q}%"
+        db.execute("SELECT count(*) FROM post WHERE content LIKE ?", (pattern,)).fetchone()
+        return db.execute("SELECT id FROM post WHERE content LIKE ? ORDER BY id DESC LIMIT 5",
+                          (pattern,)).fetchall()
+
+    results = {'LIKE %term%': timed(like_search, queries, args.repeat)}
+
+    start = time.perf_counter()
+    memory = MemoryIndex()
+    memory.add_many('post', posts)
+    build_memory = time.perf_counter() - start
+    results['MemoryIndex'] = timed(lambda q: memory.search('post', q, 500), queries, args.repeat)
+
+    if fts5_available():
+        with tempfile.TemporaryDirectory() as tmp:
+            start = time.perf_counter()
+            fts = Fts5Index(os.path.join(tmp, 'search.db'))
+            fts.add_many('post', posts)
+            build_fts = time.perf_counter() - start
+            results['Fts5Index'] = timed(lambda q: fts.search('post', q, 500), queries, args.repeat)
+    else:
+        build_fts = None
+
+    print(f"{args.posts} posts, {len(queries)} queries x {args.repeat}")
+    print(f"index build: memory {build_memory:.2f}s"
+          + (f", fts5 {build_fts:.2f}s" if build_fts is not None else ''))
+    for name, ms in results.items():
+        print(f"{name:<14} {ms:8.2f} ms/query")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,158 @@
+"""Synthetic data generator for the benchmarks.
+
+    DATABASE_URL=sqlite:////tmp/flaskbook.db python benchmarks/seed.py --users 2000 --posts 50000
+
+Creates (or migrates) the schema and bulk-inserts users, posts, blogs,
+likes, tasks, help requests/replies and chat messages with a fixed random
+seed, so two runs with the same volumes produce the same database. Every
+user's password is "pw". Denormalized counters, task facets, the search
+index and the home timelines are rebuilt afterwards. Meant for an empty database.
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import date, datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+DEFAULT_VOLUMES = {
+    'users': 500,
+    'posts': 10000,
+    'blogs': 2000,
+    'likes': 30000,
+    'tasks': 20000,
+    'help_requests': 2000,
+    'help_replies': 10000,
+    'chat_messages': 10000,
+}
+
+WORDS = ('exam notes lab project deadline group biology chemistry physics history essay '
+         'math algebra calculus review study library campus lecture slides question answer '
+         'help thanks homework quiz midterm final research paper draft outline reading').split()
+SUBJECTS = ['Biology', 'Chemistry', 'Physics', 'Math', 'History', 'English', 'Computer Science']
+CATEGORIES = ['School', 'Work', 'Personal', 'Group activity', 'Errands', 'Health']
+BATCH = 5000
+
+
+def sentence(rng, low, high):
+    return ' '.join(rng.choice(WORDS) for _ in range(rng.randint(low, high))).capitalize()
+
+
+def timestamps(rng, n, days=365):
+    # Sorted so that ids and dates grow together, like real traffic.
+    end = datetime(2025, 10, 1)
+    return sorted(end - timedelta(seconds=rng.randint(0, days * 86400)) for _ in range(n))
+
+
+def insert(db, model, rows):
+    for start in range(0, len(rows), BATCH):
+        db.session.execute(db.insert(model), rows[start:start + BATCH])
+
+
+def seed(app, volumes, seed_value=42):
+    """Populate the app's database; returns the volumes used."""
+    from werkzeug.security import generate_password_hash
+
+    import migrations
+    import model
+    from extensions import db
+    from views.chat import LOBBY
+
+    rng = random.Random(seed_value)
+    v = dict(DEFAULT_VOLUMES, **volumes)
+    n_users = v['users']
+
+    def user_id():
+        # A few very active users and a long tail.
+        return min(int(rng.paretovariate(1.2)), n_users)
+
+    with app.app_context():
+        migrations.upgrade(db.engine)
+
+        password = generate_password_hash('pw')
+        insert(db, model.User, [
+            {'username': f'user{i}', 'email': f'user{i}@example.com', 'password': password}
+            for i in range(1, n_users + 1)
+        ])
+
+        insert(db, model.Post, [
+            {'content': sentence(rng, 5, 40), 'date_posted': ts, 'user_id': user_id()}
+            for ts in timestamps(rng, v['posts'])
+        ])
+        insert(db, model.Blog, [
+            {'title': sentence(rng, 3, 8), 'content': sentence(rng, 80, 400),
+             'date_posted': ts, 'author_id': user_id()}
+            for ts in timestamps(rng, v['blogs'])
+        ])
+
+        likes = set()
+        n_likes = min(v['likes'], n_users * (v['posts'] + v['blogs']) // 2)
+        while len(likes) < n_likes:
+            # Most likes go to recent posts; some to blogs.
+            if v['posts'] and (rng.random() < 0.8 or not v['blogs']):
+                target = ('post_id', v['posts'] - min(int(rng.expovariate(0.002)), v['posts'] - 1))
+            else:
+                target = ('blog_id', rng.randint(1, v['blogs']))
+            likes.add((rng.randint(1, n_users), target))
+        insert(db, model.Like, [{'user_id': u, col: target_id} for u, (col, target_id) in likes])
+
+        today = date(2025, 10, 1)
+        insert(db, model.Task, [
+            {'title': sentence(rng, 2, 6), 'category': rng.choice(CATEGORIES),
+             'due_date': today + timedelta(days=rng.randint(-60, 120)),
+             'is_completed': rng.random() < 0.5, 'user_id': rng.randint(1, n_users)}
+            for _ in range(v['tasks'])
+        ])
+
+        insert(db, model.HelpRequest, [
+            {'title': sentence(rng, 4, 10) + '?', 'description': sentence(rng, 20, 80),
+             'subject': rng.choice(SUBJECTS), 'date_posted': ts, 'user_id': user_id()}
+            for ts in timestamps(rng, v['help_requests'])
+        ])
+        if v['help_requests']:
+            insert(db, model.HelpReply, [
+                {'content': sentence(rng, 5, 50), 'date_posted': ts, 'user_id': user_id(),
+                 'request_id': min(int(rng.paretovariate(0.8)), v['help_requests'])}
+                for ts in timestamps(rng, v['help_replies'])
+            ])
+
+        rooms = [LOBBY] + [f'dm-{i}-{i + 1}' for i in range(1, min(n_users, 50), 2)]
+        insert(db, model.ChatMessage, [
+            {'room': rng.choice(rooms), 'body': sentence(rng, 1, 15), 'date_posted': ts,
+             'user_id': user_id()}
+            for ts in timestamps(rng, v['chat_messages'], days=30)
+        ])
+        db.session.commit()
+
+        cli = app.test_cli_runner()
+        for command in ('recount-likes', 'recount-replies', 'rebuild-task-facets',
+                        'rebuild-help-subjects', 'reindex-search', 'rebuild-timelines'):
+            result = cli.invoke(args=[command])
+            if result.exit_code != 0:
+                raise RuntimeError(f"flask {command} failed: {result.output}")
+    return v
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    for name, default in DEFAULT_VOLUMES.items():
+        parser.add_argument(f"--{name.replace('_', '-')}", type=int, default=default)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    sys.path.insert(0, ROOT)
+    from app import create_app
+
+    volumes = {name: getattr(args, name) for name in DEFAULT_VOLUMES}
+    started = time.perf_counter()
+    app = create_app()
+    seed(app, volumes, args.seed)
+    print(f"seeded {app.config['SQLALCHEMY_DATABASE_URI']} in "
+          f"{time.perf_counter() - started:.1f}s: "
+          + ', '.join(f"{count} {name}" for name, count in volumes.items()))
+
+
+if __name__ == '__main__':
+    main()
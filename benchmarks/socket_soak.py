@@ -0,0 +1,212 @@
+"""Soak test: thousands of idle plus active chat sockets against serve.py.
+
+    python benchmarks/socket_soak.py --idle 2000 --active 100 --seconds 30
+    python benchmarks/socket_soak.py --modes gevent,eventlet,threading
+
+For each mode, starts `python serve.py` (ASYNC_MODE=<mode>) on a fresh
+SQLite database and registers --users accounts over HTTP. It then opens
+--idle + --active Socket.IO websockets, spread across those accounts.
+Idle sockets only answer Engine.IO pings. Every --interval seconds, each
+active socket asks for the lobby history (a DB read), timing the reply,
+and posts a message to a DM room. The report gives the server's RSS and
+thread count before and after connecting, memory per connection, history
+round-trip percentiles, and connection errors.
+
+The clients run on gevent in this process (needs gevent and
+websocket-client); they speak the Engine.IO v4 / Socket.IO v5 wire format
+directly so client overhead stays small.
+"""
+from gevent import monkey
+
+monkey.patch_all()
+
+import argparse  # noqa: E402
+import json  # noqa: E402
+import os  # noqa: E402
+import random  # noqa: E402
+import socket  # noqa: E402
+import subprocess  # noqa: E402
+import sys  # noqa: E402
+import tempfile  # noqa: E402
+import time  # noqa: E402
+
+import gevent  # noqa: E402
+import requests  # noqa: E402
+import websocket  # noqa: E402
+from gevent.pool import Pool  # noqa: E402
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, round(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[rank]
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def process_status(pid):
+    fields = {}
+    with open(f'/proc/{pid}/status') as f:
+        for line in f:
+            key, _, value = line.partition(':')
+            fields[key] = value.split()
+    return int(fields['VmRSS'][0]) * 1024, int(fields['Threads'][0])
+
+
+class SocketClient:
+    def __init__(self, url, cookie):
+        self.ws = websocket.create_connection(url, header=[f'Cookie: session={cookie}'], timeout=10)
+        handshake = self.ws.recv()
+        if not handshake.startswith('0'):
+            raise RuntimeError(f"unexpected Engine.IO open packet: {handshake[:40]!r}")
+        self.ws.send('40')
+        self.ws.settimeout(None)  # idle sockets only hear a ping every 25 s
+        self.waiting = None  # (event name, started, sink)
+
+    def emit(self, event, data):
+        self.ws.send('42' + json.dumps([event, data]))
+
+    def request(self, event, data, reply_event, sink):
+        self.waiting = (reply_event, time.perf_counter(), sink)
+        self.emit(event, data)
+
+    def serve(self):
+        prefix_len = len('42["')
+        while True:
+            packet = self.ws.recv()
+            if packet == '2':
+                self.ws.send('3')
+            elif packet.startswith('42') and self.waiting is not None:
+                event, started, sink = self.waiting
+                if packet[prefix_len:prefix_len + len(event) + 1] == f'{event}"':
+                    sink.append(time.perf_counter() - started)
+                    self.waiting = None
+
+    def close(self):
+        # No close handshake: it would wait on each socket in turn.
+        self.ws.shutdown()
+
+
+def run_mode(mode, args):
+    port = free_port()
+    base = f'http://127.0.0.1:{port}'
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ, ASYNC_MODE=mode, PORT=str(port),
+                   DATABASE_URL=f"sqlite:///{os.path.join(tmp, 'soak.db')}",
+                   PASSWORD_HASH_METHOD='pbkdf2:sha256:1000')
+        server = subprocess.Popen([sys.executable, os.path.join(ROOT, 'serve.py')], env=env, cwd=tmp,
+                                  stdout=subprocess.DEVNULL, stderr=open(os.path.join(tmp, 'server.log'), 'w'))
+        try:
+            return soak(server, base, args)
+        finally:
+            server.terminate()
+            server.wait(timeout=30)
+
+
+def soak(server, base, args):
+    for _ in range(300):
+        try:
+            requests.get(f'{base}/login', timeout=1)
+            break
+        except requests.ConnectionError:
+            time.sleep(0.1)
+    else:
+        raise RuntimeError('server did not start')
+
+    cookies = []
+    for i in range(1, args.users + 1):
+        http = requests.Session()
+        http.post(f'{base}/register', data={'username': f'soak{i}', 'email': f'soak{i}@example.com',
+                                           'password': 'pw'})
+        http.post(f'{base}/login', data={'login_field': f'soak{i}', 'password': 'pw'})
+        cookies.append(http.cookies['session'])
+    # Let the server settle after its first requests before the baseline.
+    requests.get(f'{base}/', timeout=10)
+    time.sleep(1)
+    rss_before, threads_before = process_status(server.pid)
+
+    url = base.replace('http', 'ws') + '/socket.io/?EIO=4&transport=websocket'
+    clients, readers, errors = [], [], [0]
+
+    def connect(i):
+        try:
+            client = SocketClient(url, cookies[i % len(cookies)])
+        except Exception:
+            errors[0] += 1
+            return
+        clients.append((i, client))
+        readers.append(gevent.spawn(client.serve))
+
+    total = args.idle + args.active
+    started = time.perf_counter()
+    Pool(args.connect_concurrency).map(connect, range(total))
+    connect_seconds = time.perf_counter() - started
+    time.sleep(2)
+    rss_after, threads_after = process_status(server.pid)
+
+    latencies = []
+    active = [client for i, client in clients if i < args.active]
+
+    def chatter(n, client):
+        rng = random.Random(n)
+        user_id = n % len(cookies) + 1
+        room = f'dm-{user_id}-{user_id % len(cookies) + 1}'
+        gevent.sleep(rng.random() * args.interval)
+        end = time.perf_counter() + args.seconds
+        while time.perf_counter() < end:
+            client.request('history', {'room': 'lobby'}, 'history', latencies)
+            client.emit('message', {'room': room, 'msg': f'soak {n}'})
+            gevent.sleep(args.interval)
+
+    gevent.joinall([gevent.spawn(chatter, n, client) for n, client in enumerate(active)])
+    rss_end, _ = process_status(server.pid)
+    dead = sum(1 for reader in readers if reader.dead)
+
+    gevent.killall(readers)
+    for _, client in clients:
+        client.close()
+
+    latencies.sort()
+    connected = len(clients)
+    return {
+        'connections': connected,
+        'connect_errors': errors[0],
+        'dropped_during_soak': dead,
+        'connect_seconds': round(connect_seconds, 1),
+        'rss_before_mb': round(rss_before / 2**20, 1),
+        'rss_connected_mb': round(rss_after / 2**20, 1),
+        'rss_end_mb': round(rss_end / 2**20, 1),
+        'kb_per_connection': round((rss_after - rss_before) / max(connected, 1) / 1024, 1),
+        'threads_before': threads_before,
+        'threads_connected': threads_after,
+        'history_replies': len(latencies),
+        'history_p50_ms': round(percentile(latencies, 50) * 1000, 1),
+        'history_p95_ms': round(percentile(latencies, 95) * 1000, 1),
+        'history_p99_ms': round(percentile(latencies, 99) * 1000, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--modes', default='gevent', help='comma-separated: gevent,eventlet,threading')
+    parser.add_argument('--idle', type=int, default=2000)
+    parser.add_argument('--active', type=int, default=100)
+    parser.add_argument('--users', type=int, default=20)
+    parser.add_argument('--seconds', type=float, default=30)
+    parser.add_argument('--interval', type=float, default=1.0, help='seconds between active requests')
+    parser.add_argument('--connect-concurrency', type=int, default=50)
+    args = parser.parse_args()
+
+    for mode in args.modes.split(','):
+        print(f"{mode:<10} {json.dumps(run_mode(mode, args))}", flush=True)
+
+
+if __name__ == '__main__':
+    main()
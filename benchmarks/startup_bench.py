@@ -0,0 +1,128 @@
+"""Cold-start cost of a worker, test or CLI process, and where it goes.
+
+    python benchmarks/startup_bench.py --runs 7
+    python benchmarks/startup_bench.py --profile 25
+
+Each run is a fresh interpreter (`--child`) that times, in process:
+importing app, create_app(), init_socketio() (only in the "with sockets"
+rows), the first request (GET /login, which compiles its templates) and a
+second create_app() with everything already imported, which is roughly
+what each extra app in a test suite costs. The parent also times the
+whole process from spawn to exit, next to a bare `python -c pass`.
+Medians over --runs are reported.
+
+--profile N runs `python -X importtime` on the same steps and lists the N
+top-level packages (sqlalchemy, flask, engineio, the app's own modules, ...)
+whose modules take the most import time in total.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+STAGES = ('import', 'create_app', 'init_socketio', 'first_request', 'next_app')
+CONFIG = {'SEARCH_BACKEND': 'memory', 'TIMELINE_BACKEND': 'memory'}  # keep instance/*.db untouched
+
+
+def child(socketio):
+    started = time.perf_counter()
+    sys.path.insert(0, ROOT)
+    import app as module
+    imported = time.perf_counter()
+    app = module.create_app(CONFIG)
+    created = time.perf_counter()
+    if socketio:
+        module.init_socketio(app)
+    attached = time.perf_counter()
+    app.test_client().get('/login')
+    served = time.perf_counter()
+    module.create_app(CONFIG)
+    done = time.perf_counter()
+    print(json.dumps({
+        'import': imported - started,
+        'create_app': created - imported,
+        'init_socketio': attached - created,
+        'first_request': served - attached,
+        'next_app': done - served,
+    }))
+
+
+def spawn(args, env, cwd):
+    started = time.perf_counter()
+    out = subprocess.run([sys.executable, *args], env=env, cwd=cwd,
+                         capture_output=True, text=True, check=True).stdout
+    return time.perf_counter() - started, out
+
+
+def measure(runs, socketio, env, cwd):
+    stages, walls = {stage: [] for stage in STAGES}, []
+    for _ in range(runs):
+        wall, out = spawn([__file__, '--child'] + (['--socketio'] if socketio else []), env, cwd)
+        walls.append(wall)
+        for stage, seconds in json.loads(out.strip().splitlines()[-1]).items():
+            stages[stage].append(seconds)
+    row = {stage: statistics.median(values) * 1000 for stage, values in stages.items()}
+    row['process'] = statistics.median(walls) * 1000
+    return row
+
+
+def import_profile(top, socketio, env, cwd):
+    # -X importtime writes "import time: self [us] | cumulative | module" to
+    # stderr. Self times are summed per top-level package.
+    script = (f"import sys; sys.path.insert(0, {ROOT!r}); import app; "
+              f"a = app.create_app({CONFIG!r}); "
+              + ("app.init_socketio(a); " if socketio else "")
+              + "a.test_client().get('/login')")
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', script], env=env, cwd=cwd,
+                            capture_output=True, text=True, check=True)
+    packages, modules = {}, {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        self_us, _, name = line[len('import time:'):].split('|')
+        package = name.strip().split('.')[0]
+        packages[package] = packages.get(package, 0) + int(self_us)
+        modules[package] = modules.get(package, 0) + 1
+    total = sum(packages.values())
+    print(f"\nimports{' (with sockets)' if socketio else ''}: {total / 1000:.0f} ms, "
+          f"{sum(modules.values())} modules")
+    for package, self_us in sorted(packages.items(), key=lambda item: -item[1])[:top]:
+        print(f"{self_us / 1000:9.1f} ms {modules[package]:5d}  {package}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--runs', type=int, default=7)
+    parser.add_argument('--profile', type=int, default=15, metavar='N',
+                        help='top-level imports to list (0 to skip the profile)')
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    parser.add_argument('--socketio', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args.socketio)
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ, DATABASE_URL=f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        bare = statistics.median(spawn(['-c', 'pass'], env, tmp)[0] for _ in range(args.runs)) * 1000
+        rows = {'http only': measure(args.runs, False, env, tmp),
+                'with sockets': measure(args.runs, True, env, tmp)}
+
+        print(f"median of {args.runs} runs, ms (bare interpreter: {bare:.0f} ms)\n")
+        print(f"{'':<14}" + ''.join(f"{stage:>15}" for stage in STAGES + ('process',)))
+        for label, row in rows.items():
+            print(f"{label:<14}" + ''.join(f"{row[stage]:15.1f}" for stage in STAGES + ('process',)))
+
+        if args.profile:
+            import_profile(args.profile, False, env, tmp)
+            import_profile(args.profile, True, env, tmp)
+
+
+if __name__ == '__main__':
+    main()
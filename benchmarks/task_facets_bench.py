@@ -0,0 +1,121 @@
+"""Task filter queries before and after the per-user facet index.
+
+    python benchmarks/task_facets_bench.py --tasks 1000000 --users 10000
+
+"Before" is what tasks() used to run: a DISTINCT over every user's
+categories plus a LIKE '%category%' filter, on a Task table with no
+composite indexes. "After" runs the TaskFacet lookup and the exact-match
+filters with the composite indexes in place. Both run against the same
+SQLite file.
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CATEGORIES = ['work', 'study', 'home', 'health', 'errands', 'finance', 'travel', 'reading',
+              'projects', 'family', 'music', 'garden', 'sport', 'cooking', 'admin']
+
+
+def populate(n_tasks, n_users, rng):
+    from extensions import db
+    from model import Task, User
+
+    db.session.execute(db.insert(User), [
+        {'username': f'user{i}', 'email': f'user{i}@example.com', 'password': 'x'}
+        for i in range(1, n_users + 1)
+    ])
+    start = date(2025, 1, 1)
+    batch = []
+    for i in range(n_tasks):
+        batch.append({
+            'title': f'task {i}',
+            'category': rng.choice(CATEGORIES[:rng.randint(3, len(CATEGORIES))]),
+            'due_date': start + timedelta(days=rng.randint(0, 730)),
+            'is_completed': rng.random() < 0.6,
+            'user_id': rng.randint(1, n_users),
+        })
+        if len(batch) == 50000:
+            db.session.execute(db.insert(Task), batch)
+            batch = []
+    if batch:
+        db.session.execute(db.insert(Task), batch)
+    db.session.commit()
+
+
+def timed(fn, cases):
+    start = time.perf_counter()
+    for case in cases:
+        fn(*case)
+    return (time.perf_counter() - start) / len(cases) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--tasks', type=int, default=1000000)
+    parser.add_argument('--users', type=int, default=10000)
+    parser.add_argument('--requests', type=int, default=200)
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp()
+    os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+    sys.path.insert(0, ROOT)
+    from app import create_app, db
+    from model import Task, TaskFacet
+
+    app = create_app()
+    rng = random.Random(42)
+    with app.app_context():
+        db.create_all()
+        started = time.perf_counter()
+        populate(args.tasks, args.users, rng)
+        app.test_cli_runner().invoke(args=['rebuild-task-facets'])
+        print(f"populated {args.tasks} tasks in {time.perf_counter() - started:.1f}s")
+
+        cases = [(rng.randint(1, args.users), rng.choice(CATEGORIES + [''] * 5),
+                  rng.choice(['all', 'completed', 'pending'])) for _ in range(args.requests)]
+
+        def status_filter(query, status):
+            if status == 'completed':
+                return query.filter_by(is_completed=True)
+            if status == 'pending':
+                return query.filter_by(is_completed=False)
+            return query
+
+        def before(user_id, category, status):
+            query = Task.query.filter_by(user_id=user_id)
+            if category:
+                query = query.filter(Task.category.like(f"%{category}%"))
+            status_filter(query, status).order_by(Task.due_date.asc()).all()
+            [c[0] for c in db.session.query(Task.category).distinct().all()]
+
+        def after(user_id, category, status):
+            query = Task.query.filter_by(user_id=user_id)
+            if category:
+                query = query.filter(Task.category == category)
+            status_filter(query, status).order_by(Task.due_date.asc()).all()
+            TaskFacet.query.filter(TaskFacet.user_id == user_id, TaskFacet.total > 0).all()
+
+        indexes = list(Task.__table__.indexes)
+        for index in indexes:
+            index.drop(db.engine)
+        before_ms = timed(before, cases)
+        db.session.rollback()
+
+        for index in indexes:
+            index.create(db.engine)
+        db.session.execute(db.text('ANALYZE'))
+        after_ms = timed(after, cases)
+
+    print(f"{'before (distinct + LIKE)':<28} {before_ms:9.2f} ms/request")
+    print(f"{'after (facets + indexes)':<28} {after_ms:9.2f} ms/request")
+    print(f"speedup {before_ms / after_ms:.1f}x")
+
+
+if __name__ == '__main__':
+    main()
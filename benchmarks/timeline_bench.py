@@ -0,0 +1,104 @@
+"""Home feed read cost with and without precomputed timelines, and what
+fan-out costs a new post.
+
+    python benchmarks/timeline_bench.py --posts 50000 --requests 50
+
+Seeds a fresh SQLite database with benchmarks/seed.py, then for each
+timeline store (none = the Post query, memory, sqlite):
+
+  read    GET / (first page and ten pages in) and GET /?user=<author>,
+          p50 latency and SQL statements per request, once every timeline
+          involved has been built; plus the cost of building one cold
+  write   POST /create_post, which pushes to the home and author timelines
+"""
+import argparse
+import os
+import re
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def timed(call, n, queries):
+    walls, counts = [], []
+    for _ in range(n):
+        before = queries[0]
+        started = time.perf_counter()
+        response = call()
+        walls.append(time.perf_counter() - started)
+        counts.append(queries[0] - before)
+        assert response.status_code < 400, response.status_code
+    return statistics.median(walls) * 1000, statistics.mean(counts)
+
+
+def deep_cursor(client, pages):
+    cursor = ''
+    for _ in range(pages):
+        html = client.get(f"/?cursor={cursor}").get_data(as_text=True)
+        cursor = re.search(r'cursor=([\w-]+)[^"]*">Next', html).group(1)
+    return cursor
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--users', type=int, default=2000)
+    parser.add_argument('--posts', type=int, default=50000)
+    parser.add_argument('--requests', type=int, default=50)
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp(prefix='flaskbook-bench-')
+    os.environ.setdefault('DATABASE_URL', f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+    sys.path.insert(0, ROOT)
+    from app import create_app, db
+    from seed import seed
+    from views.feed import HOME, ensure_timeline
+
+    base = {'SEARCH_BACKEND': 'memory', 'UPLOAD_FOLDER': os.path.join(tmp, 'uploads'),
+            'CONDITIONAL_GET': False, 'COMPRESS_MIN_BYTES': None}
+    seed(create_app(dict(base, TIMELINE_BACKEND=None)),
+         {'users': args.users, 'posts': args.posts, 'likes': args.posts, 'blogs': 100,
+          'tasks': 100, 'help_requests': 10, 'help_replies': 10, 'chat_messages': 10})
+
+    print(f"{args.posts} posts by {args.users} users, {args.requests} requests each, "
+          f"p50 ms / statements per request\n")
+    for store in (None, 'memory', 'sqlite'):
+        app = create_app(dict(base, TIMELINE_BACKEND=store,
+                              TIMELINE_PATH=os.path.join(tmp, 'timelines.db')))
+        queries = [0]
+        with app.app_context():
+            db.event.listen(db.engine, 'before_cursor_execute',
+                            lambda *a, **k: queries.__setitem__(0, queries[0] + 1))
+        if store:
+            app.test_cli_runner().invoke(args=['rebuild-timelines'])
+
+        client = app.test_client()
+        client.post('/login', data={'login_field': 'user1', 'password': 'pw'})
+        client.get('/')
+        label = store or 'none (Post query)'
+        print(f"[{label}]")
+
+        if store:
+            app.extensions['timeline_store'].clear()
+            started = time.perf_counter()
+            with app.test_request_context():
+                ensure_timeline(HOME)
+            print(f"  {'build one home timeline':<30}{(time.perf_counter() - started) * 1000:8.2f} ms")
+
+        cursor = deep_cursor(client, 10)
+        for name, path in (('GET / first page', '/'), ('GET / page 11', f"/?cursor={cursor}"),
+                           ('GET /?user=user2', '/?user=user2')):
+            client.get(path)
+            p50, statements = timed(lambda: client.get(path), args.requests, queries)
+            print(f"  {name:<30}{p50:8.2f} ms {statements:5.1f}")
+
+        form = {'content': 'fan-out benchmark post'}
+        p50, statements = timed(lambda: client.post('/create_post', data=form), args.requests, queries)
+        print(f"  {'POST /create_post':<30}{p50:8.2f} ms {statements:5.1f}")
+        print()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,133 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+# ----------------------------------------
+# Bounded LRU with expiry
+# ----------------------------------------
+# For values that can be rebuilt cheaply but are read on almost every
+# request. At most `max_entries` are kept (least recently used evicted
+# first) and each expires `ttl` seconds after it was stored, which bounds
+# staleness when another process changes the underlying row.
+
+class TTLCache:
+    def __init__(self, name, max_entries=1024, ttl=60.0):
+        self.name = name
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._values = OrderedDict()   # key -> (expires, value)
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, key, default=None):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is not None and entry[0] > now:
+                self._values.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            if entry is not None:
+                del self._values[key]
+            self.misses += 1
+            return default
+
+    def set(self, key, value):
+        with self._lock:
+            self._values[key] = (time.monotonic() + self.ttl, value)
+            self._values.move_to_end(key)
+            while len(self._values) > self.max_entries:
+                self._values.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, key):
+        with self._lock:
+            self._values.pop(key, None)
+            self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'name': self.name,
+                'entries': len(self._values),
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+# ----------------------------------------
+# Rendered fragment cache
+# ----------------------------------------
+# Holds rendered HTML for pages that are read far more often than they
+# change. Eviction is least-recently-used and bounded by the total size of
+# the stored strings (`max_bytes`) rather than by entry count, since a long
+# thread and a short blog differ by orders of magnitude. There is no
+# invalidate(): callers put the version of what a fragment shows in its key,
+# so a change is a miss on a new key and the old entry ages out.
+
+class FragmentCache:
+    def __init__(self, name, max_bytes=32 * 1024 * 1024):
+        self.name = name
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._values = OrderedDict()   # key -> (size, html)
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get_or_render(self, key, render):
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is not None:
+                self._values.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+
+        html = render()
+        size = len(html.encode('utf-8'))
+
+        with self._lock:
+            if size <= self.max_bytes:
+                old = self._values.pop(key, None)
+                if old is not None:
+                    self.size -= old[0]
+                self._values[key] = (size, html)
+                self.size += size
+                while self.size > self.max_bytes:
+                    _, (evicted, _) = self._values.popitem(last=False)
+                    self.size -= evicted
+                    self.evictions += 1
+        return html
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+            self.size = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'name': self.name,
+                'entries': len(self._values),
+                'bytes': self.size,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+            }
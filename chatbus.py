@@ -0,0 +1,281 @@
+import fcntl
+import json
+import logging
+import os
+import random
+import socket
+import struct
+import threading
+import time
+from urllib.parse import urlparse
+
+log = logging.getLogger(__name__)
+
+
+# ----------------------------------------
+# Chat message bus
+# ----------------------------------------
+# A bus carries chat events between worker processes so a message sent to a
+# socket on one worker reaches room members connected to any other worker.
+# Messages are plain JSON-able dicts; the app decides what they mean.
+#
+#   memory://                 single process, delivered inline
+#   unix:///tmp/chat.sock     local socket hub shared by all workers on a box
+#   tcp://127.0.0.1:7301      same, over loopback TCP
+
+class MessageBus:
+    def start(self, handler):
+        """Begin delivering every published message to `handler(message)`."""
+        raise NotImplementedError
+
+    def publish(self, message):
+        raise NotImplementedError
+
+    def stop(self):
+        pass
+
+
+class InProcessBus(MessageBus):
+    def __init__(self):
+        self._handler = None
+
+    def start(self, handler):
+        self._handler = handler
+
+    def publish(self, message):
+        if self._handler is not None:
+            self._handler(message)
+
+
+_HEADER = struct.Struct('!I')
+
+
+def _send_frame(sock, payload):
+    sock.sendall(_HEADER.pack(len(payload)) + payload)
+
+
+def _recv_exact(sock, size):
+    data = b''
+    while len(data) < size:
+        chunk = sock.recv(size - len(data))
+        if not chunk:
+            return None
+        data += chunk
+    return data
+
+
+def _recv_frame(sock):
+    header = _recv_exact(sock, _HEADER.size)
+    if header is None:
+        return None
+    return _recv_exact(sock, _HEADER.unpack(header)[0])
+
+
+class LocalSocketBus(MessageBus):
+    """Hub-and-spoke fan-out over a local socket, no external broker needed.
+
+    The first worker to start binds the socket and becomes the hub; the rest
+    connect to it. The hub relays every frame it receives to all connected
+    workers and to its own handler. If the hub goes away, the survivors race
+    to take over the address.
+    """
+
+    def __init__(self, url):
+        parsed = urlparse(url)
+        if parsed.scheme == 'unix':
+            self.family, self.address = socket.AF_UNIX, parsed.path
+        elif parsed.scheme == 'tcp':
+            self.family, self.address = socket.AF_INET, (parsed.hostname, parsed.port)
+        else:
+            raise ValueError(f"unsupported bus url: {url}")
+
+        self.is_hub = False
+        self._handler = None
+        self._lock = threading.Lock()
+        self._send_lock = threading.Lock()  # keeps frames from interleaving
+        self._peers = []
+        self._server = None
+        self._upstream = None
+        self._hub_lock = None
+        self._stopped = threading.Event()
+
+    # -- lifecycle -----------------------------------------------------
+
+    def start(self, handler):
+        self._handler = handler
+        self._attach()
+
+    def stop(self):
+        self._stopped.set()
+        if self.is_hub and self.family == socket.AF_UNIX:
+            # Unlink first so re-attaching workers can't connect to us again.
+            try:
+                os.unlink(self.address)
+            except OSError:
+                pass
+        with self._lock:
+            sockets = self._peers + [s for s in (self._server, self._upstream) if s]
+            self._peers, self._server, self._upstream = [], None, None
+        for sock in sockets:
+            # shutdown() wakes threads blocked in accept()/recv() on the
+            # socket; close() alone would leave them hanging.
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+            sock.close()
+        if self._hub_lock is not None:
+            self._hub_lock.close()
+            self._hub_lock = None
+
+    def _attach(self):
+        for _ in range(20):
+            if self._stopped.is_set():
+                return
+            if self._try_connect() or self._try_serve():
+                return
+            time.sleep(random.uniform(0.01, 0.1))
+        log.error("chat bus could not attach to %s; delivering locally only", self.address)
+
+    def _try_connect(self):
+        sock = socket.socket(self.family, socket.SOCK_STREAM)
+        try:
+            sock.connect(self.address)
+        except OSError:
+            sock.close()
+            return False
+        with self._lock:
+            self._upstream = sock
+        self.is_hub = False
+        threading.Thread(target=self._read_upstream, args=(sock,), daemon=True,
+                         name='chat-bus-upstream').start()
+        return True
+
+    def _try_serve(self):
+        if self.family == socket.AF_UNIX:
+            # Binding a unix path is not exclusive once a stale file has to be
+            # removed, so the hub role is decided by an flock instead. The
+            # kernel drops it when the hub process dies.
+            lock = open(self.address + '.lock', 'w')
+            try:
+                fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                lock.close()
+                return False
+            try:
+                os.unlink(self.address)
+            except OSError:
+                pass
+            self._hub_lock = lock
+        server = socket.socket(self.family, socket.SOCK_STREAM)
+        if self.family == socket.AF_INET:
+            server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        try:
+            server.bind(self.address)
+            server.listen(128)
+        except OSError:
+            server.close()
+            if self._hub_lock is not None:
+                self._hub_lock.close()
+                self._hub_lock = None
+            return False
+        with self._lock:
+            self._server = server
+        self.is_hub = True
+        threading.Thread(target=self._accept_loop, args=(server,), daemon=True,
+                         name='chat-bus-hub').start()
+        return True
+
+    # -- hub side ------------------------------------------------------
+
+    def _accept_loop(self, server):
+        while not self._stopped.is_set():
+            try:
+                peer, _ = server.accept()
+            except OSError:
+                return
+            if self._stopped.is_set():
+                peer.close()
+                return
+            with self._lock:
+                self._peers.append(peer)
+            threading.Thread(target=self._read_peer, args=(peer,), daemon=True,
+                             name='chat-bus-peer').start()
+
+    def _read_peer(self, peer):
+        while True:
+            try:
+                payload = _recv_frame(peer)
+            except OSError:
+                payload = None
+            if payload is None:
+                with self._lock:
+                    if peer in self._peers:
+                        self._peers.remove(peer)
+                peer.close()
+                return
+            self._fan_out(payload)
+
+    def _fan_out(self, payload):
+        with self._lock:
+            peers = list(self._peers)
+        with self._send_lock:
+            for peer in peers:
+                try:
+                    _send_frame(peer, payload)
+                except OSError:
+                    with self._lock:
+                        if peer in self._peers:
+                            self._peers.remove(peer)
+        self._deliver(payload)
+
+    # -- worker side ---------------------------------------------------
+
+    def _read_upstream(self, sock):
+        while True:
+            try:
+                payload = _recv_frame(sock)
+            except OSError:
+                payload = None
+            if payload is None:
+                break
+            self._deliver(payload)
+
+        with self._lock:
+            if self._upstream is sock:
+                self._upstream = None
+        sock.close()
+        if not self._stopped.is_set():
+            log.warning("chat bus hub went away; re-attaching")
+            self._attach()
+
+    def publish(self, message):
+        payload = json.dumps(message, separators=(',', ':')).encode()
+        if self.is_hub:
+            self._fan_out(payload)
+            return
+        with self._lock:
+            upstream = self._upstream
+        if upstream is not None:
+            try:
+                with self._send_lock:
+                    _send_frame(upstream, payload)
+                return
+            except OSError:
+                pass
+        # No hub reachable right now; at least reach our own clients.
+        self._deliver(payload)
+
+    def _deliver(self, payload):
+        if self._stopped.is_set():
+            return
+        try:
+            self._handler(json.loads(payload))
+        except Exception:
+            log.exception("chat bus handler failed")
+
+
+def create_bus(url):
+    if not url or url.startswith('memory:'):
+        return InProcessBus()
+    return LocalSocketBus(url)
@@ -0,0 +1,179 @@
+import logging
+import queue
+import threading
+import time
+from collections import defaultdict
+
+log = logging.getLogger(__name__)
+
+
+# ----------------------------------------
+# Chat message pipeline
+# ----------------------------------------
+# Socket handlers submit messages and return immediately. One writer thread
+# drains the queue in micro-batches, persists each batch with a single
+# commit, and then publishes the stored messages. Rooms receiving more than
+# `coalesce_rate` messages a second stop getting one emit per message:
+# their messages are collected into frames sent every `frame_interval`
+# seconds as a single "<event>_batch" event. Once a room has an open frame,
+# its messages keep going into it until the frame is sent, even if the rate
+# drops in between, so clients see them in order.
+
+class RoomStats:
+    __slots__ = ('submitted', 'persisted', 'failed', 'emitted_messages', 'emitted_frames',
+                 '_bucket', '_count', '_prev_count')
+
+    def __init__(self):
+        self.submitted = 0
+        self.persisted = 0
+        self.failed = 0
+        self.emitted_messages = 0
+        self.emitted_frames = 0
+        self._bucket = 0
+        self._count = 0
+        self._prev_count = 0
+
+    def tick(self, now):
+        # Two one-second buckets give a cheap sliding rate estimate.
+        bucket = int(now)
+        if bucket != self._bucket:
+            self._prev_count = self._count if bucket == self._bucket + 1 else 0
+            self._count = 0
+            self._bucket = bucket
+        self._count += 1
+
+    def rate(self, now):
+        bucket = int(now)
+        if bucket == self._bucket:
+            return self._count + self._prev_count * (1 - (now - bucket))
+        if bucket == self._bucket + 1:
+            return self._count * (1 - (now - bucket))
+        return 0.0
+
+
+class ChatPipeline:
+    def __init__(self, persist, publish, batch_size=200, max_delay=0.02,
+                 coalesce_rate=20, frame_interval=0.1):
+        # persist(items) -> list of payload dicts, one per item, in order
+        # publish(event, room, data) -> fans the event out to the room
+        self.persist = persist
+        self.publish = publish
+        self.batch_size = batch_size
+        self.max_delay = max_delay
+        self.coalesce_rate = coalesce_rate
+        self.frame_interval = frame_interval
+
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._stats = defaultdict(RoomStats)
+        self._frames = {}  # (event, room) -> [payload, ...]
+        self._next_frame_flush = time.monotonic() + frame_interval
+        self._stopped = threading.Event()
+        self._thread = None
+        self.batches = 0
+
+    def submit(self, room, event, **fields):
+        with self._lock:
+            self._stats[room].submitted += 1
+        self._queue.put(dict(fields, room=room, event=event))
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='chat-pipeline', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join(timeout=10)
+            self._thread = None
+        # Drain whatever is still queued and send any partial frames.
+        while self._process(self._take_batch(block=False)):
+            pass
+        self._flush_frames(force=True)
+
+    def _run(self):
+        while not self._stopped.is_set():
+            self._process(self._take_batch(block=True))
+            self._flush_frames()
+
+    def _take_batch(self, block):
+        batch = []
+        try:
+            batch.append(self._queue.get(block=block, timeout=self.frame_interval if block else None))
+        except queue.Empty:
+            return batch
+        deadline = time.monotonic() + self.max_delay
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                batch.append(self._queue.get(timeout=remaining) if remaining > 0
+                             else self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _process(self, batch):
+        if not batch:
+            return 0
+        try:
+            payloads = self.persist(batch)
+        except Exception:
+            log.exception("chat pipeline failed to persist %d messages", len(batch))
+            with self._lock:
+                for item in batch:
+                    self._stats[item['room']].failed += 1
+            return len(batch)
+
+        self.batches += 1
+        now = time.monotonic()
+        immediate = []
+        with self._lock:
+            for item, data in zip(batch, payloads):
+                room, event = item['room'], item['event']
+                stats = self._stats[room]
+                stats.persisted += 1
+                stats.tick(now)
+                frame = self._frames.get((event, room))
+                if frame is None and stats.rate(now) > self.coalesce_rate:
+                    frame = self._frames[event, room] = []
+                if frame is not None:
+                    frame.append(data)
+                else:
+                    stats.emitted_messages += 1
+                    immediate.append((event, room, data))
+        for event, room, data in immediate:
+            self.publish(event, room, data)
+        return len(batch)
+
+    def _flush_frames(self, force=False):
+        now = time.monotonic()
+        if not force and now < self._next_frame_flush:
+            return
+        self._next_frame_flush = now + self.frame_interval
+        with self._lock:
+            frames, self._frames = self._frames, {}
+            for (event, room), messages in frames.items():
+                stats = self._stats[room]
+                stats.emitted_frames += 1
+                stats.emitted_messages += len(messages)
+        for (event, room), messages in frames.items():
+            self.publish(f"{event}_batch", room, {'room': room, 'messages': messages})
+
+    def metrics(self):
+        now = time.monotonic()
+        with self._lock:
+            rooms = {
+                room: {
+                    'submitted': s.submitted,
+                    'persisted': s.persisted,
+                    'failed': s.failed,
+                    'queued': s.submitted - s.persisted - s.failed,
+                    'emitted_messages': s.emitted_messages,
+                    'emitted_frames': s.emitted_frames,
+                    'messages_per_sec': round(s.rate(now), 2),
+                    'coalescing': s.rate(now) > self.coalesce_rate,
+                }
+                for room, s in self._stats.items()
+            }
+        return {'queue_depth': self._queue.qsize(), 'batches': self.batches, 'rooms': rooms}
@@ -0,0 +1,72 @@
+import os
+
+from passwords import DEFAULT_METHOD
+
+
+# ----------------------------------------
+# Default configuration
+# ----------------------------------------
+# create_app() loads this, then applies the mapping or object it was given,
+# so tests and benchmarks override only what they need. Values that depend
+# on others (engine options, replica bind, search index path) are filled in
+# by create_app() afterwards.
+class Config:
+    SECRET_KEY = 'supersecretkey'
+    SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL', 'mysql+pymysql://root:@localhost/flaskbook_db')
+    SQLALCHEMY_TRACK_MODIFICATIONS = False
+    DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', 10))
+    DB_MAX_OVERFLOW = int(os.environ.get('DB_MAX_OVERFLOW', 20))
+    DB_POOL_RECYCLE = int(os.environ.get('DB_POOL_RECYCLE', 280))  # below MySQL's wait_timeout
+    DB_POOL_PRE_PING = os.environ.get('DB_POOL_PRE_PING', '1') == '1'
+    # Optional read replica for GET list/detail views (see dbrouting.py).
+    DATABASE_REPLICA_URL = os.environ.get('DATABASE_REPLICA_URL')
+    DB_REPLICA_LAG = float(os.environ.get('DB_REPLICA_LAG', 5))  # read-your-writes window
+    UPLOAD_FOLDER = 'static/uploads'
+    UPLOAD_MAX_BYTES = 25 * 1024 * 1024
+    UPLOAD_VARIANT_WORKERS = 2
+    # Leave room for the form fields around the file part.
+    MAX_CONTENT_LENGTH = UPLOAD_MAX_BYTES + 1024 * 1024
+    SEARCH_BACKEND = 'fts5'  # 'fts5' (falls back to 'memory' if unavailable) or 'memory'
+    SEARCH_INDEX_PATH = None  # default: <instance>/search.db
+    SEARCH_MAX_RESULTS = 500
+    # Precomputed home timelines (views/feed.py): 'sqlite' (shared by the
+    # workers on one host), 'memory' (per process; dropped whenever another
+    # worker writes a post) or None to query Post.
+    TIMELINE_BACKEND = os.environ.get('TIMELINE_BACKEND', 'sqlite') or None
+    TIMELINE_PATH = None         # default: <instance>/timelines.db
+    TIMELINE_LENGTH = 800        # post ids kept per timeline
+    TIMELINE_MAX_KEYS = 10000    # timelines kept per store
+    LIKE_WRITE_BEHIND = os.environ.get('LIKE_WRITE_BEHIND') == '1'
+    LIKE_FLUSH_SIZE = 500       # flush once this many likes are buffered...
+    LIKE_FLUSH_INTERVAL = 1.0   # ...or after this many seconds
+    CHAT_BUS = os.environ.get('CHAT_BUS', 'memory://')  # or unix:///path, tcp://host:port
+    CHAT_HISTORY_PAGE = 50
+    CHAT_MAX_LENGTH = 2000
+    CHAT_PIPELINE = os.environ.get('CHAT_PIPELINE', '1') == '1'
+    CHAT_BATCH_SIZE = 200        # messages per INSERT batch / commit
+    CHAT_BATCH_DELAY = 0.02      # seconds to wait for a batch to fill
+    CHAT_COALESCE_RATE = 20      # msgs/sec per room before emits are framed
+    CHAT_FRAME_INTERVAL = 0.1
+    PRESENCE_HEARTBEAT = 25      # seconds between client heartbeats
+    PRESENCE_TIMEOUT = 60        # drop connections/workers silent this long
+    USER_SUGGEST_LIMIT = 10
+    PRINCIPAL_CACHE_SIZE = 10000
+    PRINCIPAL_CACHE_TTL = 60     # seconds a cached login identity stays valid
+    FRAGMENT_CACHE_BYTES = 32 * 1024 * 1024
+    TASK_STATS_CACHE_SIZE = 10000
+    TASK_STATS_CACHE_TTL = 300   # superseded entries also expire
+    PROFILE_RECENT_ITEMS = 20   # blogs/posts shown on a profile page
+    FEED_PAGE_SIZE = 5
+    HELP_REPLIES_PAGE = 20
+    USER_SUGGEST_MAX_AGE = 300   # reload to pick up users registered by other workers
+    PASSWORD_HASH_METHOD = os.environ.get('PASSWORD_HASH_METHOD', DEFAULT_METHOD)
+    PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS', 2))  # 0 = hash inline
+    # Keep workers + queue below the server's request threads so a login burst
+    # can never hold all of them.
+    PASSWORD_HASH_QUEUE = int(os.environ.get('PASSWORD_HASH_QUEUE', 2))
+    PASSWORD_HASH_TIMEOUT = 10   # seconds
+    CONDITIONAL_GET = True       # weak ETags + 304s on list/detail pages
+    COMPRESS_MIN_BYTES = 1024    # gzip HTML/JSON bodies at least this big; None disables
+    COMPRESS_LEVEL = 6
+    INSTRUMENTATION = os.environ.get('INSTRUMENTATION') == '1'  # Server-Timing + /_metrics
+    INSTRUMENT_N_PLUS_ONE = 5    # same statement more often than this per request is logged
@@ -0,0 +1,56 @@
+import sys
+
+
+# ----------------------------------------
+# Cooperative (green thread) serving
+# ----------------------------------------
+# serve.py monkey-patches the standard library with gevent or eventlet
+# before the app is imported. After that every request, socket and
+# background "thread" is a greenlet: an idle chat socket costs a few KB
+# instead of an OS thread, and pure-Python I/O (sockets, PyMySQL, the chat
+# bus) yields to other greenlets while it waits.
+#
+# C code that blocks or burns CPU (hashing uploads, Pillow resizing,
+# password hashes, the sqlite3 driver) does not yield, and would freeze
+# every connection in the process. offload() runs such calls on the hub's
+# pool of real OS threads and parks only the calling greenlet. Without
+# monkey-patching it just calls the function.
+
+MODES = ('threading', 'gevent', 'eventlet')
+
+
+def patch(mode):
+    """Monkey-patch for `mode`; must run before anything else is imported."""
+    if mode not in MODES:
+        raise ValueError(f"unknown async mode: {mode!r} (expected one of {', '.join(MODES)})")
+    if mode == 'gevent':
+        from gevent import monkey
+        if not monkey.is_module_patched('socket'):
+            monkey.patch_all()
+    elif mode == 'eventlet':
+        import eventlet
+        eventlet.monkey_patch()
+
+
+def async_mode():
+    """The green-thread library the process has been patched with, else 'threading'."""
+    if 'gevent.monkey' in sys.modules:
+        from gevent import monkey
+        if monkey.is_module_patched('socket'):
+            return 'gevent'
+    if 'eventlet.patcher' in sys.modules:
+        from eventlet import patcher
+        if patcher.is_monkey_patched('socket'):
+            return 'eventlet'
+    return 'threading'
+
+
+def offload(fn, *args, **kwargs):
+    mode = async_mode()
+    if mode == 'gevent':
+        from gevent import get_hub
+        return get_hub().threadpool.apply(fn, args, kwargs)
+    if mode == 'eventlet':
+        from eventlet import tpool
+        return tpool.execute(fn, *args, **kwargs)
+    return fn(*args, **kwargs)
@@ -0,0 +1,100 @@
+import functools
+import time
+from contextlib import contextmanager
+
+from flask import current_app, g, has_request_context, request, session
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+
+
+# ----------------------------------------
+# Engine options
+# ----------------------------------------
+def engine_options(url, pool_size=10, max_overflow=20, pool_recycle=280, pool_pre_ping=True):
+    # SQLite's file/memory pools don't take sizing or recycling; everything
+    # else (MySQL, PostgreSQL) gets the full set.
+    options = {'pool_pre_ping': pool_pre_ping}
+    if make_url(url).get_backend_name() != 'sqlite':
+        options.update(pool_size=pool_size, max_overflow=max_overflow, pool_recycle=pool_recycle)
+    return options
+
+
+# ----------------------------------------
+# Read replica routing
+# ----------------------------------------
+# Views decorated with @use_replica send their SELECTs to the 'replica' bind
+# when one is configured. Anything that writes (flushes, UPDATE/DELETE
+# statements) always goes to the primary. After a request that wrote, the
+# client is pinned to the primary for `lag` seconds (stored in the signed
+# session cookie), so users always see their own writes even when the
+# replica is behind.
+
+REPLICA_BIND = 'replica'
+
+
+class RoutingSession(Session):
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if (bind is None and not self._flushing
+                and has_request_context() and g.get('db_use_replica')
+                and getattr(clause, 'is_select', False)):
+            replica = self._db.engines.get(REPLICA_BIND)
+            if replica is not None:
+                return replica
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+class ReplicaRouter:
+    def __init__(self, app=None, db=None, lag=5.0):
+        self.lag = lag   # default for apps that don't set DB_REPLICA_LAG
+        if app is not None:
+            self.init_app(app, db)
+
+    def init_app(self, app, db):
+        # Settings are per app; the session listeners are shared by every app
+        # using this `db`, so they are added once.
+        app.extensions['db_replica_lag'] = app.config.get('DB_REPLICA_LAG', self.lag)
+        if not event.contains(db.session, 'after_flush', self._mark_flush):
+            event.listen(db.session, 'after_flush', self._mark_flush)
+            event.listen(db.session, 'do_orm_execute', self._mark_statement)
+        app.after_request(self._pin_to_primary)
+
+    @staticmethod
+    def _mark_flush(session_, flush_context):
+        if has_request_context():
+            g.db_wrote = True
+
+    @staticmethod
+    def _mark_statement(state):
+        # Bulk INSERT/UPDATE/DELETE statements bypass the flush.
+        if has_request_context() and (state.is_insert or state.is_update or state.is_delete):
+            g.db_wrote = True
+
+    @staticmethod
+    def _pin_to_primary(response):
+        if g.get('db_wrote'):
+            session['db_write_at'] = time.time()
+        return response
+
+    def recently_wrote(self):
+        lag = current_app.extensions.get('db_replica_lag', self.lag)
+        return time.time() - session.get('db_write_at', 0) < lag
+
+    def use_replica(self, view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            g.db_use_replica = request.method in ('GET', 'HEAD') and not self.recently_wrote()
+            return view(*args, **kwargs)
+        return wrapper
+
+
+@contextmanager
+def primary():
+    # Force reads in the block onto the primary, e.g. when the result is
+    # cached and must not capture replica lag.
+    previous = g.get('db_use_replica', False)
+    g.db_use_replica = False
+    try:
+        yield
+    finally:
+        g.db_use_replica = previous
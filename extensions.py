@@ -0,0 +1,34 @@
+from flask import current_app
+from flask_login import LoginManager
+from flask_sqlalchemy import SQLAlchemy
+from werkzeug.local import LocalProxy
+
+from assets import StaticAssets
+from dbrouting import ReplicaRouter, RoutingSession
+from httpcache import ResponseCompression
+from instrumentation import Instrumentation
+
+
+# ----------------------------------------
+# Extensions
+# ----------------------------------------
+# Created unbound here and attached to each app by create_app(), so models
+# and blueprints can import them without importing (or building) the app.
+db = SQLAlchemy(session_options={'class_': RoutingSession})
+replica_router = ReplicaRouter()
+use_replica = replica_router.use_replica
+instrumentation = Instrumentation()
+static_assets = StaticAssets()
+compression = ResponseCompression()
+login_manager = LoginManager()
+login_manager.login_view = 'accounts.login'
+
+
+# ----------------------------------------
+# Per-app services
+# ----------------------------------------
+# Caches, indexes and worker pools depend on the app's config, so each
+# blueprint builds its own when it is registered and stores them in
+# app.extensions. Views reach them through these proxies.
+def app_local(name):
+    return LocalProxy(lambda: current_app.extensions[name])
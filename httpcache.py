@@ -0,0 +1,113 @@
+import functools
+import gzip
+import hashlib
+import os
+
+from flask import current_app, make_response, request, session
+
+
+# ----------------------------------------
+# Conditional GET
+# ----------------------------------------
+# @conditional(stamp) gives a view a weak ETag built from `stamp()`: a few
+# cheap values (version counters, the viewer's id) that change whenever
+# the page could. A request whose If-None-Match still matches is answered
+# 304 before the view runs, so none of its queries or template rendering
+# happen. The stamp is taken before the view, so a write that lands while
+# the page renders can only make the ETag older than the page, never newer.
+#
+# Responses are marked private and no-cache: browsers keep them but
+# revalidate every time. Pages with a pending flash message skip all of
+# this, since the message must be shown; CONDITIONAL_GET = False turns it
+# off for the whole app.
+
+def weak_etag(parts):
+    return hashlib.blake2b(repr(tuple(parts)).encode(), digest_size=8).hexdigest()
+
+
+def conditional(stamp):
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            if (request.method not in ('GET', 'HEAD') or '_flashes' in session
+                    or not current_app.config.get('CONDITIONAL_GET', True)):
+                return view(*args, **kwargs)
+
+            etag = weak_etag(stamp())
+            if request.if_none_match.contains_weak(etag):
+                response = current_app.response_class(status=304)
+            else:
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+            response.set_etag(etag, weak=True)
+            response.cache_control.private = True
+            response.cache_control.no_cache = True
+            return response
+        return wrapper
+    return decorator
+
+
+def directory_stamp(*folders, skip=()):
+    """Digest of the names, sizes and mtimes of every file under `folders`.
+
+    Goes into page ETags so a deploy that changes templates or static files
+    doesn't leave browsers holding pages built from the old ones."""
+    skip = {os.path.abspath(path) for path in skip}
+    hasher = hashlib.blake2b(digest_size=8)
+    for folder in folders:
+        for dirpath, dirnames, filenames in os.walk(folder):
+            dirnames[:] = sorted(d for d in dirnames if os.path.abspath(os.path.join(dirpath, d)) not in skip)
+            for name in sorted(filenames):
+                path = os.path.join(dirpath, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                hasher.update(f"{os.path.relpath(path, folder)}:{stat.st_size}:{stat.st_mtime_ns}\n".encode())
+    return hasher.hexdigest()
+
+
+# ----------------------------------------
+# Response compression
+# ----------------------------------------
+# Gzips HTML and JSON responses of at least `min_size` bytes for clients
+# that accept it. Smaller bodies gain little and cost a round of zlib per
+# request. Static files are left to StaticAssets (precompressed siblings),
+# as are streamed responses and anything already encoded. Weak ETags stay
+# valid across encodings, so @conditional works on compressed pages too.
+
+COMPRESSIBLE_TYPES = {'text/html', 'application/json', 'text/plain', 'text/css',
+                      'text/javascript', 'application/javascript', 'image/svg+xml'}
+
+
+class ResponseCompression:
+    def __init__(self, app=None, min_size=1024, level=6):
+        self.min_size = min_size
+        self.level = level
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        # Settings are bound per app; several apps may share this instance.
+        min_size = app.config.get('COMPRESS_MIN_BYTES', self.min_size)
+        level = app.config.get('COMPRESS_LEVEL', self.level)
+        if min_size is not None:
+            app.after_request(functools.partial(self._compress, min_size, level))
+
+    @staticmethod
+    def _compress(min_size, level, response):
+        if (response.direct_passthrough or response.is_streamed
+                or response.status_code < 200 or response.status_code in (204, 304)
+                or 'Content-Encoding' in response.headers
+                or response.mimetype not in COMPRESSIBLE_TYPES):
+            return response
+        data = response.get_data()
+        if len(data) < min_size:
+            return response
+
+        response.vary.add('Accept-Encoding')
+        if request.accept_encodings['gzip']:
+            response.set_data(gzip.compress(data, compresslevel=level, mtime=0))
+            response.headers['Content-Encoding'] = 'gzip'
+        return response
@@ -0,0 +1,257 @@
+import logging
+import re
+import threading
+import time
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+
+from flask import Response, before_render_template, current_app, g, has_request_context, request, template_rendered
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+log = logging.getLogger(__name__)
+
+
+# ----------------------------------------
+# Per-request instrumentation
+# ----------------------------------------
+# Opt-in (INSTRUMENTATION=1). Every request records how many SQL statements
+# it ran and how long they took, how long template rendering took (lazy
+# loads fired from a template count towards both), and time spent in any
+# phase wrapped with `timed()` (e.g. upload storage), and events counted
+# with `counted()` (e.g. user-table loads the principal cache saved). The
+# numbers go out
+# as a Server-Timing header, so the browser's network panel shows them per
+# response, and are summed per endpoint for the Prometheus scrape at
+# /_metrics.
+#
+# N+1 detection: a statement shape (the SQL text, with IN lists collapsed)
+# that runs more than INSTRUMENT_N_PLUS_ONE times in one request is logged
+# with the endpoint and counted in flaskbook_n_plus_one_total.
+#
+# One Instrumentation instance serves every app it is attached to; the
+# threshold and the totals are kept per app, in app.extensions.
+
+_PLACEHOLDER = r'(?:\?|%s|%\(\w+\)s|:\w+)'
+_PLACEHOLDER_LIST = re.compile(rf'{_PLACEHOLDER}(?:\s*,\s*{_PLACEHOLDER})+')
+_WHITESPACE = re.compile(r'\s+')
+
+# Request duration histogram buckets, in seconds.
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def statement_shape(statement):
+    # "IN (?, ?, ?)" and "IN (?, ?)" are the same query.
+    return _PLACEHOLDER_LIST.sub('?', _WHITESPACE.sub(' ', statement.strip()))
+
+
+class RequestStats:
+    __slots__ = ('started', 'queries', 'sql_time', 'render_time', 'render_depth',
+                 'render_started', 'phases', 'counts', 'shapes')
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.sql_time = 0.0
+        self.render_time = 0.0
+        self.render_depth = 0
+        self.render_started = 0.0
+        self.phases = defaultdict(float)
+        self.counts = Counter()
+        self.shapes = Counter()
+
+
+class _EndpointTotals:
+    __slots__ = ('requests', 'seconds', 'queries', 'sql_seconds', 'render_seconds',
+                 'n_plus_one', 'buckets')
+
+    def __init__(self):
+        self.requests = 0
+        self.seconds = 0.0
+        self.queries = 0
+        self.sql_seconds = 0.0
+        self.render_seconds = 0.0
+        self.n_plus_one = 0
+        self.buckets = [0] * len(BUCKETS)
+
+
+class _AppMetrics:
+    def __init__(self, n_plus_one):
+        self.n_plus_one = n_plus_one
+        self.lock = threading.Lock()
+        self.totals = defaultdict(_EndpointTotals)
+        self.phases = Counter()
+        self.counts = Counter()
+
+
+def _current():
+    return g.get('request_stats') if has_request_context() else None
+
+
+@contextmanager
+def timed(phase):
+    """Add the block's wall time to `phase` in the current request's Server-Timing."""
+    stats = _current()
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        if stats is not None:
+            stats.phases[phase] += time.perf_counter() - started
+
+
+def counted(name, n=1):
+    """Add `n` to `name` in the current request's Server-Timing and endpoint totals."""
+    stats = _current()
+    if stats is not None:
+        stats.counts[name] += n
+
+
+class Instrumentation:
+    def __init__(self, app=None, n_plus_one=5):
+        self.n_plus_one = n_plus_one
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        if not app.config.get('INSTRUMENTATION'):
+            return
+        app.extensions['instrumentation'] = _AppMetrics(
+            app.config.get('INSTRUMENT_N_PLUS_ONE', self.n_plus_one))
+
+        # Engine class events cover every engine, including the replica bind
+        # (and every app this instance is attached to).
+        if not event.contains(Engine, 'before_cursor_execute', self._before_execute):
+            event.listen(Engine, 'before_cursor_execute', self._before_execute)
+            event.listen(Engine, 'after_cursor_execute', self._after_execute)
+        before_render_template.connect(self._before_render, app)
+        template_rendered.connect(self._after_render, app)
+        app.before_request(self._start)
+        app.after_request(self._finish)
+        app.add_url_rule('/_metrics', 'instrumentation_metrics', self.metrics_view)
+
+    # -- collection ----------------------------------------------------
+
+    def _start(self):
+        g.request_stats = RequestStats()
+
+    def _before_execute(self, conn, cursor, statement, parameters, context, executemany):
+        if _current() is not None:
+            conn.info.setdefault('query_started', []).append(time.perf_counter())
+
+    def _after_execute(self, conn, cursor, statement, parameters, context, executemany):
+        stats = _current()
+        if stats is None or not conn.info.get('query_started'):
+            return
+        stats.sql_time += time.perf_counter() - conn.info['query_started'].pop()
+        stats.queries += 1
+        stats.shapes[statement_shape(statement)] += 1
+
+    def _before_render(self, sender, template, context, **extra):
+        stats = _current()
+        if stats is None:
+            return
+        # Only the outermost render is timed; fragments render inside pages.
+        if stats.render_depth == 0:
+            stats.render_started = time.perf_counter()
+        stats.render_depth += 1
+
+    def _after_render(self, sender, template, context, **extra):
+        stats = _current()
+        if stats is None or stats.render_depth == 0:
+            return
+        stats.render_depth -= 1
+        if stats.render_depth == 0:
+            stats.render_time += time.perf_counter() - stats.render_started
+
+    def _finish(self, response):
+        stats = g.pop('request_stats', None)
+        if stats is None or request.endpoint == 'instrumentation_metrics':
+            return response
+        elapsed = time.perf_counter() - stats.started
+        endpoint = request.endpoint or 'unmatched'
+        metrics = current_app.extensions['instrumentation']
+
+        repeated = [(shape, count) for shape, count in stats.shapes.items() if count > metrics.n_plus_one]
+        for shape, count in repeated:
+            log.warning("possible N+1 in %s %s: %d x %s", request.method, endpoint, count, shape)
+
+        timing = [f'db;dur={stats.sql_time * 1000:.1f};desc="{stats.queries} queries"',
+                  f'render;dur={stats.render_time * 1000:.1f}']
+        timing += [f'{phase};dur={seconds * 1000:.1f}' for phase, seconds in stats.phases.items()]
+        timing += [f'{name};desc="{n}"' for name, n in stats.counts.items()]
+        timing.append(f'total;dur={elapsed * 1000:.1f}')
+        response.headers.add('Server-Timing', ', '.join(timing))
+
+        with metrics.lock:
+            totals = metrics.totals[(endpoint, request.method)]
+            totals.requests += 1
+            totals.seconds += elapsed
+            totals.queries += stats.queries
+            totals.sql_seconds += stats.sql_time
+            totals.render_seconds += stats.render_time
+            totals.n_plus_one += len(repeated)
+            for i, bound in enumerate(BUCKETS):
+                if elapsed <= bound:
+                    totals.buckets[i] += 1
+            for phase, seconds in stats.phases.items():
+                metrics.phases[(endpoint, request.method, phase)] += seconds
+            for name, n in stats.counts.items():
+                metrics.counts[(endpoint, request.method, name)] += n
+        return response
+
+    # -- exposition ----------------------------------------------------
+
+    def metrics_view(self):
+        return Response(self.render_metrics(), mimetype='text/plain; version=0.0.4')
+
+    def render_metrics(self):
+        # The current app's totals.
+        metrics = current_app.extensions['instrumentation']
+        with metrics.lock:
+            totals = [(key, t.requests, t.seconds, t.queries, t.sql_seconds, t.render_seconds,
+                       t.n_plus_one, list(t.buckets)) for key, t in sorted(metrics.totals.items())]
+            phases = sorted(metrics.phases.items())
+            counts = sorted(metrics.counts.items())
+
+        def labels(endpoint, method, **extra):
+            pairs = dict(endpoint=endpoint, method=method, **extra)
+            return '{' + ','.join(f'{k}="{v}"' for k, v in pairs.items()) + '}'
+
+        lines = []
+
+        def family(name, kind, help_text, samples):
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} {kind}')
+            lines.extend(samples)
+
+        family('flaskbook_request_duration_seconds', 'histogram', 'Request wall time.', [
+            sample
+            for (endpoint, method), count, seconds, *_, buckets in totals
+            for sample in (
+                [f'flaskbook_request_duration_seconds_bucket{labels(endpoint, method, le=bound)} {n}'
+                 for bound, n in zip(BUCKETS, buckets)]
+                + [f'flaskbook_request_duration_seconds_bucket{labels(endpoint, method, le="+Inf")} {count}',
+                   f'flaskbook_request_duration_seconds_sum{labels(endpoint, method)} {seconds:.6f}',
+                   f'flaskbook_request_duration_seconds_count{labels(endpoint, method)} {count}'])
+        ])
+        family('flaskbook_sql_queries_total', 'counter', 'SQL statements executed.', [
+            f'flaskbook_sql_queries_total{labels(*key)} {queries}'
+            for key, _, _, queries, *_ in totals])
+        family('flaskbook_sql_seconds_total', 'counter', 'Time spent executing SQL.', [
+            f'flaskbook_sql_seconds_total{labels(*key)} {sql_seconds:.6f}'
+            for key, _, _, _, sql_seconds, *_ in totals])
+        family('flaskbook_render_seconds_total', 'counter', 'Time spent rendering templates.', [
+            f'flaskbook_render_seconds_total{labels(*key)} {render_seconds:.6f}'
+            for key, _, _, _, _, render_seconds, *_ in totals])
+        family('flaskbook_n_plus_one_total', 'counter',
+               'Statement shapes repeated more than the N+1 threshold within one request.', [
+                   f'flaskbook_n_plus_one_total{labels(*key)} {n_plus_one}'
+                   for key, *_, n_plus_one, _ in totals])
+        family('flaskbook_phase_seconds_total', 'counter', 'Time spent in timed() phases.', [
+            f'flaskbook_phase_seconds_total{labels(endpoint, method, phase=phase)} {seconds:.6f}'
+            for (endpoint, method, phase), seconds in phases])
+        family('flaskbook_events_total', 'counter', 'Events recorded with counted().', [
+            f'flaskbook_events_total{labels(endpoint, method, event=name)} {n}'
+            for (endpoint, method, name), n in counts])
+        return '\n'.join(lines) + '\n'
@@ -0,0 +1,136 @@
+import logging
+import threading
+from collections import Counter
+
+log = logging.getLogger(__name__)
+
+
+# ----------------------------------------
+# Write-behind like buffer
+# ----------------------------------------
+# Like toggles are recorded in memory as "desired state" per (kind, target,
+# user) and written by a background thread in batches. Repeated toggles of
+# the same like coalesce: only the final state is written, and a like that
+# ends up back where the database has it is dropped without touching it.
+#
+# Anything still buffered is flushed by stop(), which the app registers with
+# atexit. A hard kill (SIGKILL, OOM, power loss) loses at most the toggles of
+# the last flush interval; that is the trade-off of turning this mode on.
+
+class LikeBuffer:
+    def __init__(self, flush_fn, max_pending=500, interval=1.0):
+        self.flush_fn = flush_fn
+        self.max_pending = max_pending
+        self.interval = interval
+
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._pending = {}      # (kind, target_id, user_id) -> [persisted, desired]
+        self._inflight = {}     # same shape, being written by flush()
+        self._delta = Counter() # (kind, target_id) -> optimistic counter delta
+        self._wake = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = None
+
+        self.flushes = 0
+        self.flushed_rows = 0
+
+    # -- request side --------------------------------------------------
+
+    def set(self, kind, target_id, user_id, liked, is_liked):
+        """Record a like/unlike (liked=None toggles) and return the new state.
+
+        `is_liked` is only called when nothing about this like is buffered
+        yet, to learn what the database currently holds.
+        """
+        key = (kind, target_id, user_id)
+        with self._lock:
+            entry = self._lookup(key)
+        if entry is None:
+            persisted = bool(is_liked())
+
+        with self._lock:
+            entry = self._lookup(key)
+            if entry is None:
+                entry = [persisted, persisted]
+            persisted, current = entry
+            desired = (not current) if liked is None else bool(liked)
+
+            self._delta[(kind, target_id)] += int(desired) - int(current)
+            if key in self._inflight or desired != persisted:
+                self._pending[key] = [persisted, desired]
+            else:
+                self._pending.pop(key, None)
+            size = len(self._pending)
+
+        if size >= self.max_pending:
+            self._wake.set()
+        return desired
+
+    def pending_delta(self, kind, target_id):
+        with self._lock:
+            return self._delta.get((kind, target_id), 0)
+
+    def _lookup(self, key):
+        entry = self._pending.get(key)
+        if entry is None and key in self._inflight:
+            desired = self._inflight[key][1]
+            entry = [desired, desired]
+        return entry
+
+    # -- flushing ------------------------------------------------------
+
+    def flush(self):
+        with self._flush_lock:
+            with self._lock:
+                if not self._pending:
+                    return 0
+                self._inflight, self._pending = self._pending, {}
+
+            changes = [(kind, target_id, user_id, desired)
+                       for (kind, target_id, user_id), (persisted, desired) in self._inflight.items()
+                       if persisted != desired]
+            try:
+                if changes:
+                    self.flush_fn(changes)
+            except Exception:
+                log.exception("like buffer flush failed; re-queueing %d changes", len(changes))
+                with self._lock:
+                    for key, (persisted, desired) in self._inflight.items():
+                        # Newer toggles assumed the in-flight state had been
+                        # written; rebase them on what the database really has.
+                        entry = self._pending.setdefault(key, [persisted, desired])
+                        entry[0] = persisted
+                    self._inflight = {}
+                return 0
+
+            with self._lock:
+                for (kind, target_id, _), (persisted, desired) in self._inflight.items():
+                    target = (kind, target_id)
+                    self._delta[target] -= int(desired) - int(persisted)
+                    if not self._delta[target]:
+                        del self._delta[target]
+                self._inflight = {}
+
+            self.flushes += 1
+            self.flushed_rows += len(changes)
+            return len(changes)
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='like-buffer', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout=10)
+            self._thread = None
+        self.flush()
+
+    def _run(self):
+        while not self._stopped.is_set():
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            self.flush()
@@ -0,0 +1,341 @@
+import logging
+from datetime import datetime
+
+import sqlalchemy as sa
+
+log = logging.getLogger(__name__)
+
+
+# ----------------------------------------
+# Schema migrations
+# ----------------------------------------
+# Numbered steps that bring an existing database (including one loaded from
+# flaskbook_db.sql) in line with the models. Applied versions are recorded
+# in the schema_migrations table; `flask migrate` runs whatever is pending,
+# in order, one transaction per step where the database supports
+# transactional DDL. Steps check the live schema before changing it, so
+# they are safe on a database that create_all() already built.
+#
+# Each step spells out the tables, columns and indexes it creates instead
+# of reading them from the models, so it does the same thing whenever it
+# runs: a column added to a model later needs a step of its own.
+
+MIGRATIONS = []
+
+
+def migration(version, name):
+    def register(fn):
+        MIGRATIONS.append((version, name, fn))
+        MIGRATIONS.sort(key=lambda m: m[0])
+        return fn
+    return register
+
+
+class Operations:
+    """Schema helpers handed to each migration step."""
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.dialect = conn.dialect
+
+    def _inspect(self):
+        # Fresh inspector each time: earlier operations change the schema.
+        return sa.inspect(self.conn)
+
+    def has_table(self, table):
+        return self._inspect().has_table(table)
+
+    def columns(self, table):
+        return {c['name'] for c in self._inspect().get_columns(table)}
+
+    def indexes(self, table):
+        return {i['name'] for i in self._inspect().get_indexes(table)}
+
+    def quote(self, name):
+        return self.dialect.identifier_preparer.quote(name)
+
+    def rename_column(self, table, old, column):
+        if self.dialect.name in ('mysql', 'mariadb'):
+            # RENAME COLUMN needs MySQL 8 or MariaDB 10.5.2; CHANGE restates the column.
+            ddl = f"{self.quote(column.name)} {column.type.compile(self.dialect)}"
+            ddl += " NULL" if column.nullable else " NOT NULL"
+            self.conn.exec_driver_sql(
+                f"ALTER TABLE {self.quote(table)} CHANGE {self.quote(old)} {ddl}")
+        else:
+            self.conn.exec_driver_sql(f"ALTER TABLE {self.quote(table)} "
+                                      f"RENAME COLUMN {self.quote(old)} TO {self.quote(column.name)}")
+
+    def add_column(self, table, column):
+        ddl = f"{self.quote(column.name)} {column.type.compile(self.dialect)}"
+        # A server default, or else a plain Python-side one, fills existing rows.
+        default = None
+        if column.server_default is not None:
+            default = column.server_default.arg
+            default = default.text if hasattr(default, 'text') else default
+        elif column.default is not None and column.default.is_scalar:
+            default = column.default.arg
+        if default is not None:
+            literal = sa.literal(default, column.type).compile(
+                dialect=self.dialect, compile_kwargs={'literal_binds': True})
+            ddl += f" DEFAULT {literal}"
+        if not column.nullable:
+            if default is not None:
+                ddl += " NOT NULL"
+            else:
+                # Existing rows have no value to give it.
+                log.warning("adding %s.%s as NULL-able; backfill it before tightening",
+                            table, column.name)
+        self.conn.exec_driver_sql(f"ALTER TABLE {self.quote(table)} ADD COLUMN {ddl}")
+
+    def create_table(self, table):
+        table.create(self.conn, checkfirst=True)
+
+    def unique_constraints(self, table):
+        return {c['name'] for c in self._inspect().get_unique_constraints(table)}
+
+    def create_index(self, name, table, *columns, unique=False):
+        if name in self.indexes(table):
+            return False
+        target = sa.Table(table, sa.MetaData(), *(sa.Column(column) for column in columns))
+        sa.Index(name, *target.c, unique=unique).create(self.conn)
+        return True
+
+    def add_unique_constraint(self, table, name, columns):
+        if name in self.unique_constraints(table):
+            return False
+        if self.dialect.name != 'sqlite':
+            self.conn.exec_driver_sql(
+                f"ALTER TABLE {self.quote(table)} ADD CONSTRAINT {self.quote(name)} "
+                f"UNIQUE ({', '.join(self.quote(column) for column in columns)})")
+            return True
+        # SQLite can't add a constraint to an existing table: copy the rows
+        # into a new one that has it and swap them, as Alembic's batch mode does.
+        indexes = self._inspect().get_indexes(table)
+        metadata = sa.MetaData()
+        old = sa.Table(table, metadata, autoload_with=self.conn)
+        new = old.to_metadata(metadata, name=f"_batch_{table}")
+        new.indexes.clear()
+        new.append_constraint(sa.UniqueConstraint(*columns, name=name))
+        new.create(self.conn)
+        self.conn.execute(new.insert().from_select([c.name for c in old.c], sa.select(old)))
+        old.drop(self.conn)
+        self.conn.exec_driver_sql(f"ALTER TABLE {self.quote(new.name)} RENAME TO {self.quote(table)}")
+        for index in indexes:
+            self.create_index(index['name'], table, *index['column_names'], unique=bool(index['unique']))
+        return True
+
+
+# -- steps -------------------------------------------------------------
+
+# The models as of step 1. flaskbook_db.sql has user, post, task,
+# help_request and help_reply; the rest are new.
+baseline = sa.MetaData()
+
+sa.Table(
+    'user', baseline,
+    sa.Column('id', sa.Integer, primary_key=True),
+    sa.Column('username', sa.String(100), unique=True, nullable=False),
+    sa.Column('email', sa.String(120), unique=True, nullable=False),
+    sa.Column('password', sa.String(200), nullable=False),
+    sa.Column('profile_pic', sa.String(200), default='default.png'),
+    sa.Column('bio', sa.Text, default='No bio yet.'),
+)
+sa.Table(
+    'post', baseline,
+    sa.Column('id', sa.Integer, primary_key=True),
+    sa.Column('content', sa.Text, nullable=False),
+    sa.Column('file', sa.String(200)),
+    sa.Column('date_posted', sa.DateTime),
+    sa.Column('user_id', sa.Integer, sa.ForeignKey('user.id'), nullable=False),
+    sa.Column('like_count', sa.Integer, nullable=False, server_default='0'),
+)
+sa.Table(
+    'task', baseline,
+    sa.Column('id', sa.Integer, primary_key=True),
+    sa.Column('title', sa.String(200), nullable=False),
+    sa.Column('description', sa.Text),
+    sa.Column('category', sa.String(100)),
+    sa.Column('due_date', sa.Date),
+    sa.Column('is_completed', sa.Boolean),
+    sa.Column('user_id', sa.Integer, sa.ForeignKey('user.id'), nullable=False),
+)
+sa.Table(
+    'task_facet', baseline,
+    sa.Column('user_id', sa.Integer, sa.ForeignKey('user.id'), primary_key=True),
+    sa.Column('category', sa.String(100), primary_key=True),
+    sa.Column('total', sa.Integer, nullable=False),
+    sa.Column('completed', sa.Integer, nullable=False),
+)
+sa.Table(
+    'help_request', baseline,
+    sa.Column('id', sa.Integer, primary_key=True),
+    sa.Column('title', sa.String(200), nullable=False),
+    sa.Column('description', sa.Text, nullable=False),
+    sa.Column('subject', sa.String(100)),
+    sa.Column('date_posted', sa.DateTime),
+    sa.Column('user_id', sa.Integer, sa.ForeignKey('user.id'), nullable=False),
+    sa.Column('reply_count', sa.Integer, nullable=False, server_default='0'),
+)
+sa.Table(
+    'help_reply', baseline,
+    sa.Column('id', sa.Integer, primary_key=True),
+    sa.Column('content', sa.Text, nullable=False),
+    sa.Column('date_posted', sa.DateTime),
+    sa.Column('user_id', sa.Integer, sa.ForeignKey('user.id'), nullable=False),
+    sa.Column('request_id', sa.Integer, sa.ForeignKey('help_request.id'), nullable=False),
+)
+sa.Table(
+    'blog', baseline,
+    sa.Column('id', sa.Integer, primary_key=True),
+    sa.Column('title', sa.String(200), nullable=False),
+    sa.Column('content', sa.Text, nullable=False),
+    sa.Column('date_posted', sa.DateTime),
+    sa.Column('author_id', sa.Integer, sa.ForeignKey('user.id'), nullable=False),
+    sa.Column('like_count', sa.Integer, nullable=False, server_default='0'),
+)
+sa.Table(
+    'like', baseline,
+    sa.Column('id', sa.Integer, primary_key=True),
+    sa.Column('user_id', sa.Integer, sa.ForeignKey('user.id')),
+    sa.Column('post_id', sa.Integer, sa.ForeignKey('post.id')),
+    sa.Column('blog_id', sa.Integer, sa.ForeignKey('blog.id')),
+    sa.UniqueConstraint('user_id', 'post_id', name='uq_like_user_post'),
+    sa.UniqueConstraint('user_id', 'blog_id', name='uq_like_user_blog'),
+)
+sa.Table(
+    'chat_message', baseline,
+    sa.Column('id', sa.Integer, primary_key=True),
+    sa.Column('room', sa.String(64), nullable=False),
+    sa.Column('body', sa.Text, nullable=False),
+    sa.Column('date_posted', sa.DateTime),
+    sa.Column('user_id', sa.Integer, sa.ForeignKey('user.id'), nullable=False),
+)
+
+
+@migration(1, 'align tables and columns with the models')
+def align_with_models(ops):
+    # Tables the dump never had (blog, like, chat_message, task_facet).
+    for table in baseline.sorted_tables:
+        ops.create_table(table)
+
+    # The dump calls the upload column post.image; the model says file.
+    columns = ops.columns('post')
+    if 'image' in columns and 'file' not in columns:
+        ops.rename_column('post', 'image', baseline.tables['post'].c.file)
+
+    # Columns the models had gained since the dump was taken.
+    for table in baseline.sorted_tables:
+        existing = ops.columns(table.name)
+        for column in table.columns:
+            if column.name not in existing:
+                ops.add_column(table.name, column)
+
+
+@migration(2, 'indexes for the hot list/detail queries')
+def hot_query_indexes(ops):
+    for name, table, *columns in (
+        ('ix_post_date', 'post', 'date_posted', 'id'),
+        ('ix_post_user_date', 'post', 'user_id', 'date_posted'),
+        ('ix_blog_date', 'blog', 'date_posted', 'id'),
+        ('ix_blog_author_date', 'blog', 'author_id', 'date_posted'),
+        ('ix_help_request_date', 'help_request', 'date_posted', 'id'),
+        ('ix_help_request_subject', 'help_request', 'subject'),
+        ('ix_help_reply_request_date', 'help_reply', 'request_id', 'date_posted', 'id'),
+        ('ix_like_post', 'like', 'post_id'),
+        ('ix_like_blog', 'like', 'blog_id'),
+        ('ix_task_user_category_status_due', 'task', 'user_id', 'category', 'is_completed', 'due_date'),
+        ('ix_task_user_status_due', 'task', 'user_id', 'is_completed', 'due_date'),
+        ('ix_chat_message_room_date', 'chat_message', 'room', 'date_posted', 'id'),
+    ):
+        ops.create_index(name, table, *columns)
+
+
+@migration(3, 'version stamps for conditional GET')
+def list_versions(ops):
+    ops.create_table(sa.Table(
+        'list_version', sa.MetaData(),
+        sa.Column('name', sa.String(32), primary_key=True),
+        sa.Column('version', sa.Integer, nullable=False),
+    ))
+
+
+@migration(4, 'help request subject counts')
+def help_subjects(ops):
+    table = sa.Table(
+        'help_subject', sa.MetaData(),
+        sa.Column('subject', sa.String(100), primary_key=True),
+        sa.Column('total', sa.Integer, nullable=False),
+    )
+    if ops.has_table(table.name):
+        return
+    ops.create_table(table)
+    requests = sa.table('help_request', sa.column('subject'))
+    subject = sa.func.coalesce(requests.c.subject, '')
+    ops.conn.execute(table.insert().from_select(
+        ['subject', 'total'], sa.select(subject, sa.func.count()).group_by(subject)))
+
+
+@migration(5, 'unique likes and backfilled counters')
+def unique_likes(ops):
+    # Databases built by create_all() before the constraints existed may hold
+    # duplicate likes, and the counter columns step 1 added start at 0.
+    like = ops.quote('like')
+    for column, constraint in (('post_id', 'uq_like_user_post'), ('blog_id', 'uq_like_user_blog')):
+        # The derived table lets MySQL read the table it deletes from.
+        ops.conn.exec_driver_sql(f"""
+            DELETE FROM {like} WHERE {column} IS NOT NULL AND id NOT IN (
+                SELECT id FROM (SELECT min(id) AS id FROM {like} WHERE {column} IS NOT NULL
+                                GROUP BY user_id, {column}) AS keep)""")
+        ops.add_unique_constraint('like', constraint, ['user_id', column])
+
+    posts = sa.table('post', sa.column('id'), sa.column('like_count'))
+    blogs = sa.table('blog', sa.column('id'), sa.column('like_count'))
+    requests = sa.table('help_request', sa.column('id'), sa.column('reply_count'))
+    likes = sa.table('like', sa.column('post_id'), sa.column('blog_id'))
+    replies = sa.table('help_reply', sa.column('request_id'))
+
+    def count(where):
+        return sa.select(sa.func.count()).where(where).scalar_subquery()
+
+    ops.conn.execute(posts.update().values(like_count=count(likes.c.post_id == posts.c.id)))
+    ops.conn.execute(blogs.update().values(like_count=count(likes.c.blog_id == blogs.c.id)))
+    ops.conn.execute(requests.update().values(reply_count=count(replies.c.request_id == requests.c.id)))
+    # Cached pages showed the old counts.
+    ops.conn.exec_driver_sql("UPDATE list_version SET version = version + 1")
+
+
+# -- runner ------------------------------------------------------------
+
+schema_migrations = sa.Table(
+    'schema_migrations', sa.MetaData(),
+    sa.Column('version', sa.Integer, primary_key=True),
+    sa.Column('name', sa.String(200), nullable=False),
+    sa.Column('applied_at', sa.DateTime, nullable=False),
+)
+
+
+def applied_versions(engine):
+    with engine.begin() as conn:
+        schema_migrations.create(conn, checkfirst=True)
+        return {row.version for row in conn.execute(sa.select(schema_migrations.c.version))}
+
+
+def pending(engine):
+    done = applied_versions(engine)
+    return [(version, name) for version, name, _ in MIGRATIONS if version not in done]
+
+
+def upgrade(engine):
+    """Apply pending migrations in order; returns the (version, name) pairs applied."""
+    done = applied_versions(engine)
+    applied = []
+    for version, name, fn in MIGRATIONS:
+        if version in done:
+            continue
+        with engine.begin() as conn:
+            fn(Operations(conn))
+            conn.execute(schema_migrations.insert().values(
+                version=version, name=name, applied_at=datetime.utcnow()))
+        log.info("applied migration %04d %s", version, name)
+        applied.append((version, name))
+    return applied
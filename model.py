@@ -0,0 +1,162 @@
+from datetime import datetime
+
+from flask_login import UserMixin
+
+from extensions import db
+
+
+# ----------------------------------------
+# Models
+# ----------------------------------------
+class User(UserMixin, db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    username = db.Column(db.String(100), unique=True, nullable=False)
+    email = db.Column(db.String(120), unique=True, nullable=False)
+    password = db.Column(db.String(200), nullable=False)
+    profile_pic = db.Column(db.String(200), default='default.png')
+    bio = db.Column(db.Text, default='No bio yet.')
+
+    posts = db.relationship('Post', backref='author', lazy=True)
+    tasks = db.relationship('Task', backref='user', lazy=True)
+    help_requests = db.relationship('HelpRequest', backref='user', lazy=True)
+    replies = db.relationship('HelpReply', backref='user', lazy=True)
+    blogs = db.relationship('Blog', backref='author', lazy=True)
+    likes = db.relationship('Like', backref='user', lazy=True)  # ✅ Added Like relationship
+
+
+class Post(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    content = db.Column(db.Text, nullable=False)
+    file = db.Column(db.String(200))
+    date_posted = db.Column(db.DateTime, default=datetime.utcnow)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    like_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+
+    likes = db.relationship('Like', backref='post', lazy=True)  # ✅ Add Like relationship
+
+    __table_args__ = (
+        db.Index('ix_post_date', 'date_posted', 'id'),              # feed pages
+        db.Index('ix_post_user_date', 'user_id', 'date_posted'),    # dashboard, profile
+    )
+
+
+class Task(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    title = db.Column(db.String(200), nullable=False)
+    description = db.Column(db.Text)
+    category = db.Column(db.String(100))
+    due_date = db.Column(db.Date)
+    is_completed = db.Column(db.Boolean, default=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+
+    # Every task list is per user, filtered by category and/or status and
+    # ordered by due date; these serve each combination from an index.
+    __table_args__ = (
+        db.Index('ix_task_user_category_status_due', 'user_id', 'category', 'is_completed', 'due_date'),
+        db.Index('ix_task_user_status_due', 'user_id', 'is_completed', 'due_date'),
+    )
+
+
+class TaskFacet(db.Model):
+    # Per-user task counts by category, maintained by the task views, so the
+    # category and status filters never have to scan Task.
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    category = db.Column(db.String(100), primary_key=True)
+    total = db.Column(db.Integer, nullable=False, default=0)
+    completed = db.Column(db.Integer, nullable=False, default=0)
+
+
+class HelpRequest(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    title = db.Column(db.String(200), nullable=False)
+    description = db.Column(db.Text, nullable=False)
+    subject = db.Column(db.String(100))
+    date_posted = db.Column(db.DateTime, default=datetime.utcnow)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    reply_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+
+    replies = db.relationship('HelpReply', backref='request', cascade="all, delete", lazy=True)
+
+    __table_args__ = (
+        db.Index('ix_help_request_date', 'date_posted', 'id'),
+        db.Index('ix_help_request_subject', 'subject'),   # subject filter dropdown
+    )
+
+
+class HelpSubject(db.Model):
+    # Help requests per subject, maintained by create_help_request, so the
+    # subject dropdown reads one row per subject instead of scanning
+    # HelpRequest for its distinct values.
+    subject = db.Column(db.String(100), primary_key=True)
+    total = db.Column(db.Integer, nullable=False, default=0)
+
+
+class HelpReply(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    content = db.Column(db.Text, nullable=False)
+    date_posted = db.Column(db.DateTime, default=datetime.utcnow)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    request_id = db.Column(db.Integer, db.ForeignKey('help_request.id'), nullable=False)
+
+    # Threads are read oldest-first, one page at a time.
+    __table_args__ = (
+        db.Index('ix_help_reply_request_date', 'request_id', 'date_posted', 'id'),
+    )
+
+
+# ✅ Blog model
+class Blog(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    title = db.Column(db.String(200), nullable=False)
+    content = db.Column(db.Text, nullable=False)
+    date_posted = db.Column(db.DateTime, default=datetime.utcnow)
+    author_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    like_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+
+    likes = db.relationship('Like', backref='blog', lazy=True)  # ✅ Add Like relationship
+
+    __table_args__ = (
+        db.Index('ix_blog_date', 'date_posted', 'id'),
+        db.Index('ix_blog_author_date', 'author_id', 'date_posted'),
+    )
+
+
+# ✅ Like model
+class Like(db.Model):
+    # One like per user per target; NULL post_id/blog_id never collide.
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'post_id', name='uq_like_user_post'),
+        db.UniqueConstraint('user_id', 'blog_id', name='uq_like_user_blog'),
+        # Per-target lookups (recounts, unlike-by-target) can't use the
+        # (user_id, ...) keys above.
+        db.Index('ix_like_post', 'post_id'),
+        db.Index('ix_like_blog', 'blog_id'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'))
+    post_id = db.Column(db.Integer, db.ForeignKey('post.id'))
+    blog_id = db.Column(db.Integer, db.ForeignKey('blog.id'))
+
+
+class ListVersion(db.Model):
+    # One counter per kind of content ('posts', 'post_likes', 'blogs', ...),
+    # bumped in the same transaction as every write that changes what its
+    # pages show. Page ETags are built from these (see views/shared.py).
+    name = db.Column(db.String(32), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+
+
+# ✅ Chat message model
+class ChatMessage(db.Model):
+    __table_args__ = (
+        db.Index('ix_chat_message_room_date', 'room', 'date_posted', 'id'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    room = db.Column(db.String(64), nullable=False)
+    body = db.Column(db.Text, nullable=False)
+    date_posted = db.Column(db.DateTime, default=datetime.utcnow)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+
+    user = db.relationship('User')
@@ -0,0 +1,103 @@
+import base64
+import binascii
+import json
+from datetime import datetime
+
+from sqlalchemy import and_, or_
+
+
+# ----------------------------------------
+# Keyset (cursor) pagination
+# ----------------------------------------
+# Pages are addressed by the (date_posted, id) of the row at their edge
+# instead of an OFFSET, so page 500 costs the same index range scan as page 1
+# and no COUNT(*) is needed.
+
+class KeysetPage:
+    def __init__(self, items, next_cursor=None, prev_cursor=None):
+        self.items = items
+        self.next_cursor = next_cursor
+        self.prev_cursor = prev_cursor
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_prev(self):
+        return self.prev_cursor is not None
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+    def __bool__(self):
+        return bool(self.items)
+
+
+def encode_cursor(date_posted, row_id, direction):
+    payload = json.dumps([date_posted.isoformat(), row_id, direction], separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    # Returns (date_posted, id, direction) or None for anything malformed,
+    # which callers treat as "first page".
+    if not cursor:
+        return None
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        date_posted, row_id, direction = json.loads(base64.urlsafe_b64decode(padded))
+        if direction not in ('next', 'prev'):
+            return None
+        return datetime.fromisoformat(date_posted), int(row_id), direction
+    except (ValueError, TypeError, binascii.Error):
+        return None
+
+
+def keyset_paginate(query, date_col, id_col, cursor=None, per_page=10, descending=True):
+    key = decode_cursor(cursor)
+    direction = key[2] if key else 'next'
+
+    # Walking backwards means scanning in the opposite order from the edge
+    # and flipping the rows afterwards.
+    scan_desc = descending if direction == 'next' else not descending
+
+    if key:
+        date_posted, row_id, _ = key
+        if scan_desc:
+            query = query.filter(or_(date_col < date_posted,
+                                     and_(date_col == date_posted, id_col < row_id)))
+        else:
+            query = query.filter(or_(date_col > date_posted,
+                                     and_(date_col == date_posted, id_col > row_id)))
+
+    if scan_desc:
+        query = query.order_by(date_col.desc(), id_col.desc())
+    else:
+        query = query.order_by(date_col.asc(), id_col.asc())
+
+    rows = query.limit(per_page + 1).all()
+    has_more = len(rows) > per_page
+    rows = rows[:per_page]
+    if direction == 'prev':
+        rows.reverse()
+
+    if not rows:
+        return KeysetPage(rows)
+
+    date_attr, id_attr = date_col.key, id_col.key
+    first, last = rows[0], rows[-1]
+
+    if direction == 'next':
+        more_after, more_before = has_more, key is not None
+    else:
+        more_after, more_before = True, has_more
+
+    next_cursor = (encode_cursor(getattr(last, date_attr), getattr(last, id_attr), 'next')
+                   if more_after else None)
+    prev_cursor = (encode_cursor(getattr(first, date_attr), getattr(first, id_attr), 'prev')
+                   if more_before else None)
+    return KeysetPage(rows, next_cursor=next_cursor, prev_cursor=prev_cursor)
@@ -0,0 +1,130 @@
+import threading
+from concurrent.futures import TimeoutError as FutureTimeout
+
+from werkzeug.exceptions import ServiceUnavailable
+from werkzeug.security import check_password_hash, generate_password_hash
+
+from cooperative import async_mode, offload
+
+
+# ----------------------------------------
+# Password hashing service
+# ----------------------------------------
+# Hashes are CPU-bound on purpose. Running them on the request thread lets a
+# burst of logins occupy every worker thread and every core, and page views
+# queue up behind them. PasswordHasher runs them in a small process pool
+# instead. At most `workers + max_queue` hashes can be running or waiting;
+# past that, callers get HasherBusy (a 503 with Retry-After) straight away,
+# so the request thread is freed rather than joining an ever-longer queue.
+#
+# `method` is the full werkzeug method string, e.g. "scrypt:32768:8:1" or
+# "pbkdf2:sha256:600000". On a successful verify, a hash made with any
+# other parameters is recomputed in the same worker call, and the caller
+# stores the new one. That way a change of cost settings rolls out as
+# users log in.
+#
+# workers=0 hashes inline on the calling thread, as before. Under eventlet,
+# whose patching doesn't get along with ProcessPoolExecutor, hashes run on
+# its OS thread pool instead (hashlib releases the GIL), with the same cap.
+
+DEFAULT_METHOD = 'scrypt:32768:8:1'  # werkzeug's default
+
+
+class HasherBusy(ServiceUnavailable):
+    description = 'Too many sign-ins are being processed right now. Please try again in a moment.'
+
+    def __init__(self):
+        super().__init__(retry_after=1)
+
+
+def needs_rehash(pwhash, method):
+    return pwhash.split('$', 1)[0] != method
+
+
+def _hash(password, method):
+    return generate_password_hash(password, method=method)
+
+
+def _verify(pwhash, password, method):
+    # Returns (matches, replacement hash or None).
+    if not check_password_hash(pwhash, password):
+        return False, None
+    if needs_rehash(pwhash, method):
+        return True, generate_password_hash(password, method=method)
+    return True, None
+
+
+class PasswordHasher:
+    def __init__(self, workers=2, max_queue=2, method=DEFAULT_METHOD, timeout=10.0):
+        self.workers = workers
+        self.max_queue = max_queue
+        self.method = method
+        self.timeout = timeout
+        self._slots = threading.BoundedSemaphore(workers + max_queue) if workers else None
+        self._pool = None
+        self._lock = threading.Lock()
+
+        self.completed = 0
+        self.rejected = 0
+
+    def hash(self, password):
+        return self._run(_hash, password, self.method)
+
+    def verify(self, pwhash, password):
+        """(matches, new hash to store or None)."""
+        return self._run(_verify, pwhash, password, self.method)
+
+    def _run(self, fn, *args):
+        if not self.workers:
+            return fn(*args)
+        if not self._slots.acquire(blocking=False):
+            self.rejected += 1
+            raise HasherBusy()
+        if async_mode() == 'eventlet':
+            try:
+                result = offload(fn, *args)
+            finally:
+                self._slots.release()
+            self.completed += 1
+            return result
+        try:
+            future = self._executor().submit(fn, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(self._release)
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeout:
+            future.cancel()
+            self.rejected += 1
+            raise HasherBusy() from None
+
+    def _release(self, future):
+        self._slots.release()
+        if not future.cancelled():
+            self.completed += 1
+
+    def _executor(self):
+        with self._lock:
+            if self._pool is None:
+                # Imported here: it pulls in multiprocessing, which most
+                # processes (CLI commands, tests) never need.
+                from concurrent.futures import ProcessPoolExecutor
+                self._pool = ProcessPoolExecutor(max_workers=self.workers)
+            return self._pool
+
+    def stats(self):
+        return {
+            'workers': self.workers,
+            'max_queue': self.max_queue,
+            'method': self.method,
+            'completed': self.completed,
+            'rejected': self.rejected,
+        }
+
+    def shutdown(self, wait=False):
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=wait, cancel_futures=True)
+                self._pool = None
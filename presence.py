@@ -0,0 +1,153 @@
+import threading
+import time
+from collections import defaultdict
+
+
+# ----------------------------------------
+# Presence registry
+# ----------------------------------------
+# Tracks which users are online in which room. A user may have several
+# connections (tabs, devices); they are online in a room while at least one
+# of those connections is in it. Every mutating call returns the resulting
+# diffs as {room: {'joined': [user, ...], 'left': [user, ...]}}, so callers
+# push only what changed instead of whole rosters.
+#
+# Connections are tagged with the worker ("origin") that owns them. Workers
+# replicate their changes to each other and send a periodic beat; when a
+# worker's beat goes stale, forget_origin() drops all of its connections.
+
+class _Connection:
+    __slots__ = ('user_id', 'username', 'origin', 'rooms', 'last_seen')
+
+    def __init__(self, user_id, username, origin, now):
+        self.user_id = user_id
+        self.username = username
+        self.origin = origin
+        self.rooms = set()
+        self.last_seen = now
+
+
+class PresenceRegistry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._connections = {}                       # conn id -> _Connection
+        self._rooms = defaultdict(dict)              # room -> {user_id: [conn count, username]}
+        self._origins = {}                           # origin -> last beat
+
+    # -- mutations -----------------------------------------------------
+
+    def connect(self, conn_id, user_id, username, origin=None, now=None):
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            if conn_id not in self._connections:
+                self._connections[conn_id] = _Connection(user_id, username, origin, now)
+            if origin is not None:
+                self._origins.setdefault(origin, now)
+        return {}
+
+    def join(self, conn_id, room):
+        diffs = defaultdict(lambda: {'joined': [], 'left': []})
+        with self._lock:
+            conn = self._connections.get(conn_id)
+            if conn is not None and room not in conn.rooms:
+                conn.rooms.add(room)
+                self._enter(room, conn, diffs)
+        return dict(diffs)
+
+    def leave(self, conn_id, room):
+        diffs = defaultdict(lambda: {'joined': [], 'left': []})
+        with self._lock:
+            conn = self._connections.get(conn_id)
+            if conn is not None and room in conn.rooms:
+                conn.rooms.discard(room)
+                self._exit(room, conn, diffs)
+        return dict(diffs)
+
+    def disconnect(self, conn_id):
+        diffs = defaultdict(lambda: {'joined': [], 'left': []})
+        with self._lock:
+            self._drop(conn_id, diffs)
+        return dict(diffs)
+
+    def touch(self, conn_id, now=None):
+        with self._lock:
+            conn = self._connections.get(conn_id)
+            if conn is not None:
+                conn.last_seen = time.monotonic() if now is None else now
+
+    def beat(self, origin, now=None):
+        with self._lock:
+            self._origins[origin] = time.monotonic() if now is None else now
+
+    def forget_origin(self, origin):
+        diffs = defaultdict(lambda: {'joined': [], 'left': []})
+        with self._lock:
+            for conn_id in [c for c, conn in self._connections.items() if conn.origin == origin]:
+                self._drop(conn_id, diffs)
+            self._origins.pop(origin, None)
+        return dict(diffs)
+
+    # -- expiry --------------------------------------------------------
+
+    def stale_connections(self, timeout, origin=None, now=None):
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            return [conn_id for conn_id, conn in self._connections.items()
+                    if (origin is None or conn.origin == origin)
+                    and now - conn.last_seen > timeout]
+
+    def stale_origins(self, timeout, now=None):
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            return [origin for origin, seen in self._origins.items() if now - seen > timeout]
+
+    # -- queries -------------------------------------------------------
+
+    def snapshot(self, origin):
+        # [(conn id, user id, username, rooms), ...] for one worker's connections,
+        # used to bring a newly started worker up to date.
+        with self._lock:
+            return [(conn_id, conn.user_id, conn.username, sorted(conn.rooms))
+                    for conn_id, conn in self._connections.items() if conn.origin == origin]
+
+    def online(self, room):
+        # O(users online in the room), no database access.
+        with self._lock:
+            members = self._rooms.get(room, {})
+            return sorted(({'id': user_id, 'username': entry[1]}
+                           for user_id, entry in members.items()),
+                          key=lambda user: user['username'].lower())
+
+    def is_online(self, user_id, room):
+        with self._lock:
+            return user_id in self._rooms.get(room, {})
+
+    # -- internals (lock held) -----------------------------------------
+
+    def _enter(self, room, conn, diffs):
+        members = self._rooms[room]
+        entry = members.get(conn.user_id)
+        if entry is None:
+            members[conn.user_id] = [1, conn.username]
+            diffs[room]['joined'].append({'id': conn.user_id, 'username': conn.username})
+        else:
+            entry[0] += 1
+
+    def _exit(self, room, conn, diffs):
+        members = self._rooms.get(room)
+        entry = members.get(conn.user_id) if members else None
+        if entry is None:
+            return
+        entry[0] -= 1
+        if entry[0] <= 0:
+            del members[conn.user_id]
+            if not members:
+                del self._rooms[room]
+            diffs[room]['left'].append({'id': conn.user_id, 'username': conn.username})
+
+    def _drop(self, conn_id, diffs):
+        conn = self._connections.pop(conn_id, None)
+        if conn is None:
+            return
+        for room in conn.rooms:
+            self._exit(room, conn, diffs)
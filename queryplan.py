@@ -0,0 +1,48 @@
+import re
+
+
+# ----------------------------------------
+# Query plan checks
+# ----------------------------------------
+# Runs EXPLAIN on a statement and reports the tables the database would read
+# in full: either row by row ('table') or through every entry of an index
+# ('index'). Used by `flask check-query-plans` to keep the hot queries on
+# their indexes as the schema and the queries evolve.
+#
+# SQLite: EXPLAIN QUERY PLAN "SCAN <table>" rows, with or without an index.
+# MySQL/MariaDB: EXPLAIN rows with access type ALL or index.
+# PostgreSQL: "Seq Scan on <table>" nodes.
+
+_SQLITE_SCAN = re.compile(r'^SCAN (?:TABLE )?(\w+)(?: AS \w+)?( USING .*INDEX)?')
+_PG_SEQ_SCAN = re.compile(r'Seq Scan on (\w+)')
+
+
+def explain(conn, statement):
+    dialect = conn.dialect.name
+    compiled = statement.compile(dialect=conn.dialect, compile_kwargs={'render_postcompile': True})
+    params = compiled.construct_params()
+    if compiled.positional:
+        params = tuple(params[name] for name in compiled.positiontup)
+
+    prefix = {'sqlite': 'EXPLAIN QUERY PLAN ', 'postgresql': 'EXPLAIN '}.get(dialect, 'EXPLAIN ')
+    result = conn.exec_driver_sql(prefix + compiled.string, params)
+    return [dict(row._mapping) for row in result]
+
+
+def full_scans(conn, statement):
+    """(table, 'table' | 'index') for each full scan in the plan, in plan order."""
+    dialect = conn.dialect.name
+    rows = explain(conn, statement)
+    scans = []
+    for row in rows:
+        if dialect == 'sqlite':
+            match = _SQLITE_SCAN.match(row.get('detail', ''))
+            if match:
+                scans.append((match.group(1), 'index' if match.group(2) else 'table'))
+        elif dialect == 'postgresql':
+            scans.extend((table, 'table') for table in _PG_SEQ_SCAN.findall(next(iter(row.values()))))
+        else:
+            access = str(row.get('type', '')).upper()
+            if access in ('ALL', 'INDEX'):
+                scans.append((row.get('table'), 'table' if access == 'ALL' else 'index'))
+    return scans
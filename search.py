@@ -0,0 +1,246 @@
+import bisect
+import math
+import re
+import sqlite3
+import threading
+from collections import Counter, defaultdict
+
+
+# ----------------------------------------
+# Full-text search backends
+# ----------------------------------------
+# Documents are grouped by kind ('post', 'blog', 'help') and identified by
+# their primary key. Queries match documents containing every query token
+# and come back best match first. Tokens passed as `prefix` match any word
+# they start ("bio" finds "biology"), so a subject filter can use the index
+# instead of a leading-wildcard LIKE scan.
+
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def tokenize(text):
+    return [t.lower() for t in TOKEN_RE.findall(text or '')]
+
+
+class SearchBackend:
+    def add(self, kind, doc_id, text):
+        raise NotImplementedError
+
+    def remove(self, kind, doc_id):
+        raise NotImplementedError
+
+    def search(self, kind, query, limit=100, prefix=''):
+        """Return [(doc_id, score), ...] ordered by descending relevance."""
+        raise NotImplementedError
+
+    def count(self, kind):
+        raise NotImplementedError
+
+    def clear(self):
+        raise NotImplementedError
+
+    def add_many(self, kind, docs):
+        for doc_id, text in docs:
+            self.add(kind, doc_id, text)
+
+    def search_ids(self, kind, query, limit=100, prefix=''):
+        return [doc_id for doc_id, _ in self.search(kind, query, limit, prefix)]
+
+
+class MemoryIndex(SearchBackend):
+    """Pure-Python inverted index scored with BM25."""
+
+    K1 = 1.2
+    B = 0.75
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._postings = defaultdict(lambda: defaultdict(dict))  # kind -> term -> {doc_id: tf}
+        self._vocab = defaultdict(list)                           # kind -> sorted terms
+        self._doc_terms = defaultdict(dict)                       # kind -> doc_id -> Counter
+        self._doc_len = defaultdict(dict)
+        self._total_len = defaultdict(int)
+
+    def add(self, kind, doc_id, text):
+        terms = Counter(tokenize(text))
+        with self._lock:
+            self._remove_locked(kind, doc_id)
+            postings = self._postings[kind]
+            vocab = self._vocab[kind]
+            for term, tf in terms.items():
+                if term not in postings:
+                    bisect.insort(vocab, term)
+                postings[term][doc_id] = tf
+            self._doc_terms[kind][doc_id] = terms
+            self._doc_len[kind][doc_id] = sum(terms.values())
+            self._total_len[kind] += self._doc_len[kind][doc_id]
+
+    def remove(self, kind, doc_id):
+        with self._lock:
+            self._remove_locked(kind, doc_id)
+
+    def _remove_locked(self, kind, doc_id):
+        terms = self._doc_terms[kind].pop(doc_id, None)
+        if terms is None:
+            return
+        postings = self._postings[kind]
+        for term in terms:
+            docs = postings.get(term)
+            if docs is not None:
+                docs.pop(doc_id, None)
+                if not docs:
+                    del postings[term]
+                    vocab = self._vocab[kind]
+                    del vocab[bisect.bisect_left(vocab, term)]
+        self._total_len[kind] -= self._doc_len[kind].pop(doc_id)
+
+    def _prefix_postings(self, kind, prefix):
+        # One posting list for every term starting with `prefix`: the
+        # matching terms are a contiguous run of the sorted vocabulary.
+        postings = self._postings[kind]
+        vocab = self._vocab[kind]
+        merged = {}
+        for i in range(bisect.bisect_left(vocab, prefix), len(vocab)):
+            if not vocab[i].startswith(prefix):
+                break
+            for doc_id, tf in postings[vocab[i]].items():
+                merged[doc_id] = merged.get(doc_id, 0) + tf
+        return merged
+
+    def search(self, kind, query, limit=100, prefix=''):
+        terms = set(tokenize(query))
+        prefixes = set(tokenize(prefix))
+        if not terms and not prefixes:
+            return []
+
+        with self._lock:
+            postings = self._postings[kind]
+            doc_len = self._doc_len[kind]
+            lists = [postings.get(term) for term in terms]
+            lists += [self._prefix_postings(kind, p) for p in prefixes]
+            if not all(lists):
+                return []
+
+            n_docs = len(doc_len)
+            avg_len = self._total_len[kind] / n_docs if n_docs else 0
+            # Intersect starting from the rarest term.
+            lists.sort(key=len)
+            candidates = set(lists[0])
+            for docs in lists[1:]:
+                candidates.intersection_update(docs)
+                if not candidates:
+                    return []
+
+            scores = {}
+            for docs in lists:
+                idf = math.log(1 + (n_docs - len(docs) + 0.5) / (len(docs) + 0.5))
+                for doc_id in candidates:
+                    tf = docs[doc_id]
+                    norm = tf + self.K1 * (1 - self.B + self.B * doc_len[doc_id] / avg_len)
+                    scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (self.K1 + 1) / norm
+
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], -item[0]))
+        return ranked[:limit]
+
+    def count(self, kind):
+        with self._lock:
+            return len(self._doc_terms[kind])
+
+    def clear(self):
+        with self._lock:
+            self._postings.clear()
+            self._vocab.clear()
+            self._doc_terms.clear()
+            self._doc_len.clear()
+            self._total_len.clear()
+
+
+class Fts5Index(SearchBackend):
+    """SQLite FTS5 side index, one virtual table per kind keyed by rowid."""
+
+    KINDS = ('post', 'blog', 'help')
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        conn = self._conn()
+        for kind in self.KINDS:
+            conn.execute(f"CREATE VIRTUAL TABLE IF NOT EXISTS search_{kind} "
+                         f"USING fts5(body, tokenize='unicode61')")
+        conn.commit()
+
+    def _conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10)
+            conn.execute('PRAGMA journal_mode=WAL')
+            self._local.conn = conn
+        return conn
+
+    def _table(self, kind):
+        if kind not in self.KINDS:
+            raise ValueError(f"unknown search kind: {kind}")
+        return f"search_{kind}"
+
+    def add(self, kind, doc_id, text):
+        conn = self._conn()
+        table = self._table(kind)
+        conn.execute(f"DELETE FROM {table} WHERE rowid = ?", (doc_id,))
+        conn.execute(f"INSERT INTO {table} (rowid, body) VALUES (?, ?)", (doc_id, text or ''))
+        conn.commit()
+
+    def add_many(self, kind, docs):
+        conn = self._conn()
+        table = self._table(kind)
+        docs = [(doc_id, text or '') for doc_id, text in docs]
+        conn.executemany(f"DELETE FROM {table} WHERE rowid = ?", [(doc_id,) for doc_id, _ in docs])
+        conn.executemany(f"INSERT INTO {table} (rowid, body) VALUES (?, ?)", docs)
+        conn.commit()
+
+    def remove(self, kind, doc_id):
+        conn = self._conn()
+        conn.execute(f"DELETE FROM {self._table(kind)} WHERE rowid = ?", (doc_id,))
+        conn.commit()
+
+    def search(self, kind, query, limit=100, prefix=''):
+        # Quote every token so user input can never be parsed as FTS syntax;
+        # a trailing * outside the quotes makes it a prefix query.
+        match = ['"%s"' % term.replace('"', '""') for term in tokenize(query)]
+        match += ['"%s"*' % term.replace('"', '""') for term in tokenize(prefix)]
+        if not match:
+            return []
+        match = ' AND '.join(match)
+        table = self._table(kind)
+        rows = self._conn().execute(
+            f"SELECT rowid, bm25({table}) FROM {table} WHERE {table} MATCH ? "
+            f"ORDER BY bm25({table}) LIMIT ?", (match, limit)
+        ).fetchall()
+        # bm25() is "lower is better"; flip it so scores read like MemoryIndex.
+        return [(rowid, -score) for rowid, score in rows]
+
+    def count(self, kind):
+        return self._conn().execute(f"SELECT count(*) FROM {self._table(kind)}").fetchone()[0]
+
+    def clear(self):
+        conn = self._conn()
+        for kind in self.KINDS:
+            conn.execute(f"DELETE FROM search_{kind}")
+        conn.commit()
+
+
+def fts5_available():
+    try:
+        conn = sqlite3.connect(':memory:')
+        conn.execute('CREATE VIRTUAL TABLE t USING fts5(body)')
+        conn.close()
+        return True
+    except sqlite3.OperationalError:
+        return False
+
+
+def create_backend(name, path=None):
+    if name == 'fts5' and fts5_available():
+        return Fts5Index(path)
+    if name in ('fts5', 'memory'):
+        return MemoryIndex()
+    raise ValueError(f"unknown search backend: {name}")
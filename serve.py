@@ -0,0 +1,50 @@
+"""Production entry point.
+
+    ASYNC_MODE=gevent HOST=0.0.0.0 PORT=8000 python serve.py
+
+ASYNC_MODE is gevent (default), eventlet or threading. Green modes hold
+each chat socket on a greenlet instead of an OS thread; see cooperative.py
+for what that means for blocking calls. Use a pure-Python database driver
+(mysql+pymysql://, the default) so queries yield too; the sqlite3 driver
+blocks the whole process while a query runs.
+
+Under gunicorn, run one green worker per process and link processes with
+CHAT_BUS (Socket.IO needs sticky sessions in front of several):
+
+    gunicorn -k geventwebsocket.gunicorn.workers.GeventWebSocketWorker -w 1 serve:app
+    gunicorn -k eventlet -w 1 serve:app
+"""
+import os
+
+from cooperative import patch
+
+ASYNC_MODE = os.environ.get('ASYNC_MODE', 'gevent')
+patch(ASYNC_MODE)  # before anything imports socket, threading, ...
+
+import logging  # noqa: E402
+
+from app import create_app, db, init_socketio, migrations  # noqa: E402
+
+app = create_app()
+socketio = init_socketio(app)
+
+log = logging.getLogger(__name__)
+
+
+def main():
+    with app.app_context():
+        migrations.upgrade(db.engine)
+        if ASYNC_MODE != 'threading' and db.engine.dialect.name == 'sqlite':
+            log.warning("sqlite3 queries block every connection under %s; use PyMySQL in production",
+                        ASYNC_MODE)
+    options = {}
+    if ASYNC_MODE == 'eventlet':
+        # eventlet.wsgi otherwise stops accepting at 1024 open connections.
+        options['max_size'] = int(os.environ.get('MAX_CONNECTIONS', 10000))
+    socketio.run(app, host=os.environ.get('HOST', '127.0.0.1'), port=int(os.environ.get('PORT', 5000)),
+                 debug=False, use_reloader=False, log_output=os.environ.get('ACCESS_LOG') == '1',
+                 allow_unsafe_werkzeug=ASYNC_MODE == 'threading', **options)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+"""Chat over the in-process bus (CHAT_BUS=memory://): a lobby message from one
+socket reaches every other socket, and malformed payloads are dropped
+without an error or a stored message."""
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from app import create_app, db  # noqa: E402
+from views.chat import init_socketio  # noqa: E402
+
+import migrations  # noqa: E402
+from chatbus import InProcessBus  # noqa: E402
+from model import ChatMessage  # noqa: E402
+
+
+@pytest.fixture
+def chat(tmp_path):
+    app = create_app({
+        'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / 'chat.db'}",
+        'SEARCH_BACKEND': 'memory', 'TIMELINE_BACKEND': None,
+        'UPLOAD_FOLDER': str(tmp_path / 'uploads'),
+        'CHAT_BUS': 'memory://', 'CHAT_PIPELINE': False,
+    })
+    with app.app_context():
+        migrations.upgrade(db.engine)
+    socketio = init_socketio(app)
+
+    def connect(username):
+        client = app.test_client()
+        client.post('/register', data={'username': username, 'email': f'{username}@example.com',
+                                       'password': 'pw'})
+        client.post('/login', data={'login_field': username, 'password': 'pw'})
+        socket = socketio.test_client(app, flask_test_client=client)
+        assert socket.is_connected()
+        return socket
+
+    return app, connect
+
+
+def received(socket, name):
+    return [event['args'][0] for event in socket.get_received() if event['name'] == name]
+
+
+def test_in_process_bus_delivers_inline():
+    bus = InProcessBus()
+    bus.publish({'dropped': True})   # no handler yet
+    seen = []
+    bus.start(seen.append)
+    bus.publish({'event': 'message'})
+    assert seen == [{'event': 'message'}]
+
+
+def test_lobby_message_reaches_other_sockets(chat):
+    app, connect = chat
+    alice, bob = connect('alice'), connect('bob')
+    bob.get_received()
+
+    alice.emit('send_message', {'message': '  hello lobby  '})
+
+    messages = received(bob, 'receive_message')
+    assert [(m['username'], m['message']) for m in messages] == [('alice', 'hello lobby')]
+
+
+@pytest.mark.parametrize('event, payload', [
+    ('send_message', None),
+    ('send_message', ['hello']),
+    ('send_message', {'message': 42}),
+    ('message', 'lobby'),
+    ('message', {'room': 'lobby', 'msg': {'text': 'hi'}}),
+    ('join', None),
+    ('join', {'room': ['lobby']}),
+    ('leave', 7),
+    ('history', None),
+    ('history', {'room': 'lobby', 'before': 5}),
+])
+def test_malformed_payloads_are_dropped(chat, event, payload):
+    app, connect = chat
+    alice, bob = connect('alice'), connect('bob')
+    bob.get_received()
+
+    alice.emit(event, payload)
+
+    assert alice.is_connected()
+    assert [e for e in bob.get_received() if e['name'] != 'presence'] == []
+    with app.app_context():
+        assert db.session.query(ChatMessage).count() == 0
@@ -0,0 +1,76 @@
+"""The feed page costs the same number of SQL statements however many posts
+it shows: authors and like state are loaded per page, never per post.
+
+FEED_PAGE_SIZE is set to 5, 50 and 500 in turn, with twice that many posts
+in the database. Every other post is by user1 (so their own page is full
+too); the rest cycle through 99 other authors, so a per-author or per-post
+lazy load shows up as extra statements on the bigger pages."""
+import os
+import sys
+from datetime import datetime, timedelta
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from app import create_app, db  # noqa: E402
+
+import migrations  # noqa: E402
+import model  # noqa: E402
+
+PAGES = ['/', '/?sort=oldest', '/?user=user1']
+
+
+def feed_statements(tmp_path, per_page, timelines):
+    tmp_path.mkdir()
+    app = create_app({
+        'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / 'feed.db'}",
+        'SEARCH_BACKEND': 'memory', 'TIMELINE_BACKEND': timelines,
+        'TIMELINE_PATH': str(tmp_path / 'timelines.db'),
+        'UPLOAD_FOLDER': str(tmp_path / 'uploads'),
+        'CONDITIONAL_GET': False, 'FEED_PAGE_SIZE': per_page,
+    })
+    posts = 2 * per_page
+    with app.app_context():
+        migrations.upgrade(db.engine)
+        client = app.test_client()
+        client.post('/register', data={'username': 'user1', 'email': 'user1@example.com',
+                                       'password': 'pw'})
+        db.session.execute(db.insert(model.User), [
+            {'username': f'user{i}', 'email': f'user{i}@example.com', 'password': 'x'}
+            for i in range(2, 101)
+        ])
+        start = datetime(2025, 1, 1)
+        db.session.execute(db.insert(model.Post), [
+            {'content': f'post {i}', 'date_posted': start + timedelta(minutes=i),
+             'user_id': 1 if i % 2 else i // 2 % 99 + 2}
+            for i in range(posts)
+        ])
+        db.session.execute(db.insert(model.Like), [
+            {'user_id': user_id, 'post_id': post_id}
+            for post_id in range(1, posts + 1) for user_id in (1, 2, 3)
+        ])
+        db.session.commit()
+        app.test_cli_runner().invoke(args=['recount-likes'])
+
+        statements = [0]
+        db.event.listen(db.engine, 'before_cursor_execute',
+                        lambda *a, **k: statements.__setitem__(0, statements[0] + 1))
+
+    client.post('/login', data={'login_field': 'user1', 'password': 'pw'})
+    counts = {}
+    for path in PAGES:
+        client.get(path)   # builds the timeline, if any
+        before = statements[0]
+        response = client.get(path)
+        assert response.status_code == 200
+        assert response.get_data(as_text=True).count('data-type="post"') == per_page
+        counts[path] = statements[0] - before
+    return counts
+
+
+@pytest.mark.parametrize('timelines', [None, 'sqlite'])
+def test_feed_statements_do_not_grow_with_page_size(tmp_path, timelines):
+    counts = {n: feed_statements(tmp_path / str(n), n, timelines) for n in (5, 50, 500)}
+    assert counts[5] == counts[50] == counts[500], counts
@@ -0,0 +1,68 @@
+"""Read-replica routing with a primary and a replica in two SQLite files: the
+replica is a copy of the primary taken before the write under test, i.e. a
+replica that has not caught up yet."""
+import os
+import sqlite3
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from app import create_app, db  # noqa: E402
+
+import migrations  # noqa: E402
+
+
+def make_app(tmp_path, **config):
+    return create_app(dict({
+        'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / 'primary.db'}",
+        'DATABASE_REPLICA_URL': f"sqlite:///{tmp_path / 'replica.db'}",
+        'SEARCH_BACKEND': 'memory', 'TIMELINE_BACKEND': None,
+        'UPLOAD_FOLDER': str(tmp_path / 'uploads'),
+        'CONDITIONAL_GET': False, 'DB_REPLICA_LAG': 60,
+    }, **config))
+
+
+def replicate(tmp_path):
+    with sqlite3.connect(tmp_path / 'primary.db') as primary, \
+            sqlite3.connect(tmp_path / 'replica.db') as replica:
+        primary.backup(replica)
+
+
+def login(app, username):
+    client = app.test_client()
+    client.post('/register', data={'username': username, 'email': f'{username}@example.com',
+                                   'password': 'pw'})
+    client.post('/login', data={'login_field': username, 'password': 'pw'})
+    client.get('/')   # consumes the welcome flash
+    return client
+
+
+def test_author_reads_own_write_from_primary(tmp_path):
+    app = make_app(tmp_path)
+    with app.app_context():
+        migrations.upgrade(db.engine)
+    author, reader = login(app, 'author'), login(app, 'reader')
+    with reader.session_transaction() as session:
+        session.pop('db_write_at')   # signed up long enough ago
+    replicate(tmp_path)
+
+    # A later app with another lag must not change this one's.
+    make_app(tmp_path, DB_REPLICA_LAG=0)
+
+    author.post('/create_post', data={'content': 'fresh from the primary'})
+    assert 'fresh from the primary' in author.get('/').get_data(as_text=True)
+    assert 'fresh from the primary' not in reader.get('/').get_data(as_text=True)
+
+    replicate(tmp_path)
+    assert 'fresh from the primary' in reader.get('/').get_data(as_text=True)
+
+
+def test_session_listeners_registered_once(tmp_path):
+    app = make_app(tmp_path)
+    with app.app_context():
+        before = len(db.session().dispatch.do_orm_execute)
+    make_app(tmp_path)
+    make_app(tmp_path)
+    with app.app_context():
+        assert len(db.session().dispatch.do_orm_execute) == before
@@ -0,0 +1,322 @@
+import bisect
+import sqlite3
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+
+# ----------------------------------------
+# Timeline stores
+# ----------------------------------------
+# A timeline is a bounded list of (score, member) entries under a string
+# key, kept newest first: post ids scored by their date_posted, for
+# instance. Keys are created by begin() and become readable once fill()
+# has loaded them; push() only ever adds to keys that exist, so a missing
+# key means "not materialized", never "empty". Entries pushed between
+# begin() and fill() are kept, which lets a reader build a timeline from
+# the database while writers keep pushing to it.
+#
+# Each key keeps at most `max_len` entries. Once any have been dropped, or
+# fill() was told its entries were cut short, the key is truncated() and
+# readers paging past its end have to fall back to the database. The
+# operations map onto Redis sorted sets (ZADD, ZREM, ZREVRANGEBYSCORE,
+# ZREMRANGEBYRANK) for a store shared between hosts.
+#
+# Callers also pass the store a version that moves with every write to the
+# underlying data: sync() on read drops everything when the version moved
+# without the store (a write through another worker or host, or behind the
+# app's back), and advance() after a write the store has been given moves
+# its version along without dropping anything. `shared` stores are seen by
+# every worker on the host, per-process ones only by their own.
+
+EPOCH = datetime(1970, 1, 1)
+
+
+def date_score(value):
+    # Microseconds since the epoch: exact, and orders like the datetime.
+    return (value - EPOCH) // timedelta(microseconds=1)
+
+
+def score_date(score):
+    return EPOCH + timedelta(microseconds=score)
+
+
+class TimelineStore:
+    shared = True
+
+    def __init__(self, max_len=800):
+        self.max_len = max_len
+
+    def sync(self, version):
+        raise NotImplementedError
+
+    def advance(self, version):
+        raise NotImplementedError
+
+    def ready(self, key):
+        raise NotImplementedError
+
+    def begin(self, key):
+        raise NotImplementedError
+
+    def fill(self, key, entries, truncated=False):
+        """Add `entries` to a begun key and make it readable."""
+        raise NotImplementedError
+
+    def push(self, keys, entry):
+        """Add `entry` to each of `keys` that exists; others are skipped."""
+        raise NotImplementedError
+
+    def discard(self, entry):
+        """Remove `entry` from every key."""
+        raise NotImplementedError
+
+    def page(self, key, bound=None, limit=10, newer=False):
+        """Up to `limit` entries older than `bound`, newest first, or with
+        newer=True the ones just newer than it, oldest first."""
+        raise NotImplementedError
+
+    def truncated(self, key):
+        raise NotImplementedError
+
+    def clear(self):
+        raise NotImplementedError
+
+
+class MemoryTimelines(TimelineStore):
+    """Sorted lists in a dict, least recently read keys evicted past `max_keys`.
+
+    Per process: a post pushed in one worker is not seen by the others."""
+
+    shared = False
+
+    def __init__(self, max_len=800, max_keys=10000):
+        super().__init__(max_len)
+        self.max_keys = max_keys
+        self.version = None
+        self._lock = threading.Lock()
+        self._lists = OrderedDict()   # key -> ascending [(score, member)]
+        self._ready = set()
+        self._truncated = set()
+
+    def sync(self, version):
+        with self._lock:
+            if version != self.version:
+                self._clear_locked()
+                self.version = version
+
+    def advance(self, version):
+        # Only if no other worker's write came in between.
+        with self._lock:
+            if self.version == version - 1:
+                self.version = version
+
+    def ready(self, key):
+        with self._lock:
+            return key in self._ready
+
+    def begin(self, key):
+        with self._lock:
+            self._lists.setdefault(key, [])
+            self._lists.move_to_end(key)
+            while len(self._lists) > self.max_keys:
+                evicted, _ = self._lists.popitem(last=False)
+                self._ready.discard(evicted)
+                self._truncated.discard(evicted)
+
+    def fill(self, key, entries, truncated=False):
+        with self._lock:
+            items = self._lists.get(key)
+            if items is None:
+                return
+            merged = sorted(set(items).union(entries))
+            if truncated or len(merged) > self.max_len:
+                self._truncated.add(key)
+            items[:] = merged[-self.max_len:]
+            self._ready.add(key)
+
+    def push(self, keys, entry):
+        with self._lock:
+            for key in keys:
+                items = self._lists.get(key)
+                if items is None:
+                    continue
+                at = bisect.bisect_left(items, entry)
+                if at < len(items) and items[at] == entry:
+                    continue
+                items.insert(at, entry)
+                if len(items) > self.max_len:
+                    del items[0]
+                    self._truncated.add(key)
+
+    def discard(self, entry):
+        with self._lock:
+            for items in self._lists.values():
+                at = bisect.bisect_left(items, entry)
+                if at < len(items) and items[at] == entry:
+                    del items[at]
+
+    def page(self, key, bound=None, limit=10, newer=False):
+        with self._lock:
+            items = self._lists.get(key)
+            if items is None or key not in self._ready:
+                return []
+            self._lists.move_to_end(key)
+            if newer:
+                start = bisect.bisect_right(items, bound) if bound else 0
+                return items[start:start + limit]
+            end = bisect.bisect_left(items, bound) if bound else len(items)
+            return items[max(0, end - limit):end][::-1]
+
+    def truncated(self, key):
+        with self._lock:
+            return key in self._truncated
+
+    def clear(self):
+        with self._lock:
+            self._clear_locked()
+
+    def _clear_locked(self):
+        self._lists.clear()
+        self._ready.clear()
+        self._truncated.clear()
+
+
+class SqliteTimelines(TimelineStore):
+    """Side database shared by every worker process on the host.
+
+    Lists are trimmed back to `max_len` in bulk after every max_len / 4
+    pushes rather than on each one, so they may briefly run a little over.
+    Past `max_keys` keys, the oldest built are evicted when a new one begins."""
+
+    def __init__(self, path, max_len=800, max_keys=10000):
+        super().__init__(max_len)
+        self.path = path
+        self.max_keys = max_keys
+        self._local = threading.local()
+        self._pushes = 0
+        conn = self._conn()
+        conn.executescript("""
+            CREATE TABLE IF NOT EXISTS timeline_key (
+                key TEXT PRIMARY KEY, ready INTEGER NOT NULL DEFAULT 0,
+                truncated INTEGER NOT NULL DEFAULT 0);
+            CREATE TABLE IF NOT EXISTS timeline_entry (
+                key TEXT NOT NULL, score INTEGER NOT NULL, member INTEGER NOT NULL,
+                PRIMARY KEY (key, score, member)) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS ix_timeline_entry_member ON timeline_entry (member, score);
+            CREATE TABLE IF NOT EXISTS timeline_version (
+                id INTEGER PRIMARY KEY CHECK (id = 1), version INTEGER);
+        """)
+        conn.commit()
+
+    def _conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10)
+            conn.execute('PRAGMA journal_mode=WAL')
+            self._local.conn = conn
+        return conn
+
+    def sync(self, version):
+        conn = self._conn()
+        row = conn.execute("SELECT version FROM timeline_version").fetchone()
+        if row is None or row[0] != version:
+            self._clear(conn)
+            conn.execute("INSERT OR REPLACE INTO timeline_version (id, version) VALUES (1, ?)", (version,))
+            conn.commit()
+
+    def advance(self, version):
+        # Only if no other write came in between.
+        conn = self._conn()
+        conn.execute("UPDATE timeline_version SET version = ? WHERE version = ?", (version, version - 1))
+        conn.commit()
+
+    def ready(self, key):
+        row = self._conn().execute("SELECT ready FROM timeline_key WHERE key = ?", (key,)).fetchone()
+        return bool(row and row[0])
+
+    def begin(self, key):
+        conn = self._conn()
+        conn.execute("INSERT OR IGNORE INTO timeline_key (key) VALUES (?)", (key,))
+        evicted = """SELECT key FROM timeline_key ORDER BY rowid
+                     LIMIT max(0, (SELECT count(*) FROM timeline_key) - ?)"""
+        conn.execute(f"DELETE FROM timeline_entry WHERE key IN ({evicted})", (self.max_keys,))
+        conn.execute(f"DELETE FROM timeline_key WHERE key IN ({evicted})", (self.max_keys,))
+        conn.commit()
+
+    def fill(self, key, entries, truncated=False):
+        conn = self._conn()
+        conn.executemany("INSERT OR IGNORE INTO timeline_entry (key, score, member) "
+                         "SELECT key, ?, ? FROM timeline_key WHERE key = ?",
+                         [(score, member, key) for score, member in entries])
+        conn.execute("UPDATE timeline_key SET ready = 1, truncated = max(truncated, ?) WHERE key = ?",
+                     (int(truncated), key))
+        self._trim(conn, [key])
+        conn.commit()
+
+    def push(self, keys, entry):
+        conn = self._conn()
+        score, member = entry
+        conn.executemany("INSERT OR IGNORE INTO timeline_entry (key, score, member) "
+                         "SELECT key, ?, ? FROM timeline_key WHERE key = ?",
+                         [(score, member, key) for key in keys])
+        self._pushes += 1
+        if self._pushes >= max(1, self.max_len // 4):
+            self._pushes = 0
+            self._trim(conn)
+        conn.commit()
+
+    def _trim(self, conn, keys=None):
+        where = f"WHERE key IN ({','.join('?' * len(keys))})" if keys else ''
+        conn.execute(f"""
+            UPDATE timeline_key SET truncated = 1 WHERE key IN (
+                SELECT key FROM timeline_entry {where} GROUP BY key HAVING count(*) > ?)""",
+                     (*(keys or ()), self.max_len))
+        conn.execute(f"""
+            DELETE FROM timeline_entry WHERE (key, score, member) IN (
+                SELECT key, score, member FROM (
+                    SELECT key, score, member, row_number() OVER (
+                        PARTITION BY key ORDER BY score DESC, member DESC) AS position
+                    FROM timeline_entry {where})
+                WHERE position > ?)""", (*(keys or ()), self.max_len))
+
+    def discard(self, entry):
+        conn = self._conn()
+        conn.execute("DELETE FROM timeline_entry WHERE member = ? AND score = ?", entry[::-1])
+        conn.commit()
+
+    def page(self, key, bound=None, limit=10, newer=False):
+        if not self.ready(key):
+            return []
+        if newer:
+            after, params = ("AND (score, member) > (?, ?)", bound) if bound else ('', ())
+            order = 'ASC'
+        else:
+            after, params = ("AND (score, member) < (?, ?)", bound) if bound else ('', ())
+            order = 'DESC'
+        rows = self._conn().execute(
+            f"SELECT score, member FROM timeline_entry WHERE key = ? {after} "
+            f"ORDER BY score {order}, member {order} LIMIT ?", (key, *params, limit)
+        ).fetchall()
+        return [tuple(row) for row in rows]
+
+    def truncated(self, key):
+        row = self._conn().execute("SELECT truncated FROM timeline_key WHERE key = ?", (key,)).fetchone()
+        return bool(row and row[0])
+
+    def clear(self):
+        conn = self._conn()
+        self._clear(conn)
+        conn.commit()
+
+    def _clear(self, conn):
+        conn.execute("DELETE FROM timeline_entry")
+        conn.execute("DELETE FROM timeline_key")
+
+
+def create_store(name, path=None, max_len=800, max_keys=10000):
+    if name == 'sqlite':
+        return SqliteTimelines(path, max_len=max_len, max_keys=max_keys)
+    if name == 'memory':
+        return MemoryTimelines(max_len=max_len, max_keys=max_keys)
+    raise ValueError(f"unknown timeline store: {name}")
@@ -0,0 +1,88 @@
+import bisect
+import threading
+import time
+
+
+# ----------------------------------------
+# Prefix index for typeahead
+# ----------------------------------------
+# A sorted array of (folded key, value) pairs. A prefix lookup is two
+# bisects, so it costs O(log n + limit) no matter how large the array is.
+# The owner fills it with load() (or lets it load lazily through `loader`),
+# adds new values as they are created, and can set `max_age` so that values
+# added by other processes show up after a periodic reload. The loader runs
+# outside the lock; values add()ed while it runs are merged into its result,
+# since its snapshot may predate them.
+
+class PrefixIndex:
+    def __init__(self, loader=None, max_age=None):
+        self.loader = loader
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self._entries = []
+        self._loaded_at = None
+        self._reloads = 0     # loader() calls in progress
+        self._added = []      # entries add()ed while any are
+
+    @staticmethod
+    def fold(value):
+        return value.casefold()
+
+    @staticmethod
+    def _insert(entries, entry):
+        i = bisect.bisect_left(entries, entry)
+        if i == len(entries) or entries[i] != entry:
+            entries.insert(i, entry)
+
+    def load(self, values):
+        entries = sorted({(self.fold(v), v) for v in values})
+        with self._lock:
+            self._entries = entries
+            self._loaded_at = time.monotonic()
+
+    def add(self, value):
+        entry = (self.fold(value), value)
+        with self._lock:
+            self._insert(self._entries, entry)
+            if self._reloads:
+                self._added.append(entry)
+
+    def complete(self, prefix, limit=10):
+        self._ensure_loaded()
+        key = self.fold(prefix)
+        with self._lock:
+            start = bisect.bisect_left(self._entries, (key,))
+            matches = []
+            for folded, value in self._entries[start:start + limit]:
+                if not folded.startswith(key):
+                    break
+                matches.append(value)
+            return matches
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _ensure_loaded(self):
+        if self.loader is None:
+            return
+        loaded_at = self._loaded_at
+        if loaded_at is None or (self.max_age is not None
+                                 and time.monotonic() - loaded_at > self.max_age):
+            self._reload()
+
+    def _reload(self):
+        with self._lock:
+            self._reloads += 1
+            start = len(self._added)
+        try:
+            entries = sorted({(self.fold(v), v) for v in self.loader()})
+            with self._lock:
+                for entry in self._added[start:]:
+                    self._insert(entries, entry)
+                self._entries = entries
+                self._loaded_at = time.monotonic()
+        finally:
+            with self._lock:
+                self._reloads -= 1
+                if not self._reloads:
+                    self._added = []
@@ -0,0 +1,172 @@
+import hashlib
+import io
+import logging
+import os
+import shutil
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from werkzeug.exceptions import RequestEntityTooLarge
+
+from cooperative import offload
+
+log = logging.getLogger(__name__)
+
+
+# ----------------------------------------
+# Content-addressed upload store
+# ----------------------------------------
+# Files are stored once per distinct content under <root>/<h[:2]>/<h>.<ext>,
+# where h is the SHA-256 of the bytes. The request body is streamed straight
+# into a temp file inside the store (hashing as it goes and enforcing the
+# size cap), so saving is a rename rather than a second copy.
+
+IMAGE_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif', 'webp'}
+
+# Resized WebP variants generated for images, by name -> max edge in pixels.
+IMAGE_VARIANTS = {'thumb': 320, 'feed': 960}
+
+
+class IncomingFile(io.FileIO):
+    """Temp file that hashes and size-checks everything written to it."""
+
+    def __init__(self, path, max_bytes):
+        super().__init__(path, 'w+b')
+        self.path = path
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.hasher = hashlib.sha256()
+        self.kept = False
+
+    def write(self, data):
+        self.size += len(data)
+        if self.max_bytes is not None and self.size > self.max_bytes:
+            raise RequestEntityTooLarge()
+        self.hasher.update(data)
+        return super().write(data)
+
+    def close(self):
+        super().close()
+        if not self.kept:
+            try:
+                os.unlink(self.path)
+            except OSError:
+                pass
+
+
+class UploadStore:
+    def __init__(self, root, max_bytes=None, chunk_size=64 * 1024):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.chunk_size = chunk_size
+        self.incoming_dir = os.path.join(root, '.incoming')
+        self._created = False  # directories are made on the first upload, not at startup
+
+    def open_incoming(self):
+        if not self._created:
+            os.makedirs(self.incoming_dir, exist_ok=True)
+            self._created = True
+        fd, path = tempfile.mkstemp(dir=self.incoming_dir)
+        os.close(fd)
+        return IncomingFile(path, self.max_bytes)
+
+    def store(self, file_storage, ext):
+        """Persist an uploaded file and return its path relative to the root."""
+        incoming = file_storage.stream
+        owned = not isinstance(incoming, IncomingFile)
+        if owned:
+            # Not streamed by UploadRequest (e.g. a small in-memory part):
+            # copy it through an IncomingFile in chunks.
+            incoming = self.open_incoming()
+        try:
+            if owned:
+                shutil.copyfileobj(file_storage.stream, incoming, self.chunk_size)
+            return self._commit(incoming, ext)
+        finally:
+            if owned:
+                incoming.close()
+
+    def _commit(self, incoming, ext):
+        digest = incoming.hasher.hexdigest()
+        relative = f"{digest[:2]}/{digest}.{ext.lower()}"
+        target = os.path.join(self.root, relative)
+        if os.path.exists(target):
+            # Same content already stored; the temp file is discarded on close.
+            return relative
+
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        os.replace(incoming.path, target)
+        incoming.kept = True
+        return relative
+
+    def path(self, relative):
+        return os.path.join(self.root, relative)
+
+
+# ----------------------------------------
+# Image variants
+# ----------------------------------------
+def variant_name(relative, variant):
+    stem = relative.rsplit('.', 1)[0]
+    return f"{stem}_{variant}.webp"
+
+
+def is_image(relative):
+    return relative.rsplit('.', 1)[-1].lower() in IMAGE_EXTENSIONS
+
+
+def make_variants(source, variants=IMAGE_VARIANTS):
+    # Pillow is optional: without it, pages keep serving the original image.
+    try:
+        from PIL import Image, ImageOps
+    except ImportError:
+        return []
+
+    made = []
+    with Image.open(source) as original:
+        image = ImageOps.exif_transpose(original)
+        if image.mode not in ('RGB', 'RGBA'):
+            image = image.convert('RGBA' if 'transparency' in image.info else 'RGB')
+        for variant, edge in variants.items():
+            target = variant_name(source, variant)
+            if os.path.exists(target):
+                continue
+            resized = image.copy()
+            resized.thumbnail((edge, edge))
+            tmp = f"{target}.{os.getpid()}.{threading.get_ident()}.tmp"
+            resized.save(tmp, 'WEBP', quality=80, method=4)
+            os.replace(tmp, target)
+            made.append(target)
+    return made
+
+
+class VariantWorker:
+    """Generates image variants on a small background thread pool."""
+
+    def __init__(self, max_workers=2):
+        self.max_workers = max_workers
+        self._pool = None
+        self._lock = threading.Lock()
+
+    def submit(self, source):
+        if not is_image(source):
+            return None
+        with self._lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=self.max_workers,
+                                                thread_name_prefix='upload-variants')
+        # offload(): real OS threads even when served by green threads.
+        future = self._pool.submit(offload, make_variants, source)
+        future.add_done_callback(self._log_failure)
+        return future
+
+    def shutdown(self, wait=False):
+        if self._pool is not None:
+            self._pool.shutdown(wait=wait)
+            self._pool = None
+
+    @staticmethod
+    def _log_failure(future):
+        if future.exception() is not None:
+            log.error("image variant generation failed", exc_info=future.exception())
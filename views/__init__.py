@@ -0,0 +1,4 @@
+from views import accounts, admin, blogs, chat, feed, help, shared, tasks
+
+# One blueprint per subsystem, registered in this order by create_app().
+BLUEPRINTS = (shared.bp, accounts.bp, feed.bp, tasks.bp, help.bp, blogs.bp, chat.bp, admin.bp)
@@ -0,0 +1,244 @@
+import atexit
+
+from flask import Blueprint, abort, current_app, flash, redirect, render_template, request, url_for
+from flask_login import current_user, login_required, login_user, logout_user
+
+from cache import TTLCache
+from extensions import app_local, db, login_manager, use_replica
+from instrumentation import counted
+from model import Blog, Post, User
+from passwords import PasswordHasher
+from typeahead import PrefixIndex
+from views.shared import (allowed_file, bump_versions, cached_fragment, list_conditional, profile_scope,
+                          save_upload)
+
+bp = Blueprint('accounts', __name__)
+
+principal_cache = app_local('principal_cache')
+username_index = app_local('username_index')
+password_hasher = app_local('password_hasher')
+
+
+@bp.record_once
+def setup(state):
+    app = state.app
+    app.extensions['principal_cache'] = TTLCache('principal', max_entries=app.config['PRINCIPAL_CACHE_SIZE'],
+                                                 ttl=app.config['PRINCIPAL_CACHE_TTL'])
+    app.extensions['username_index'] = PrefixIndex(
+        loader=lambda: [name for (name,) in db.session.query(User.username)],
+        max_age=app.config['USER_SUGGEST_MAX_AGE'],
+    )
+    # Hashing runs on a bounded process pool (see passwords.py); when it is
+    # saturated register and login answer 503 with Retry-After instead of
+    # queueing. The pool itself starts on first use.
+    hasher = PasswordHasher(app.config['PASSWORD_HASH_WORKERS'],
+                            max_queue=app.config['PASSWORD_HASH_QUEUE'],
+                            method=app.config['PASSWORD_HASH_METHOD'],
+                            timeout=app.config['PASSWORD_HASH_TIMEOUT'])
+    atexit.register(hasher.shutdown)
+    app.extensions['password_hasher'] = hasher
+
+
+# ----------------------------------------
+# Session principal
+# ----------------------------------------
+# current_user is a small cached Principal rather than a User row, so an
+# authenticated request (each like toggle, each socket connect) doesn't have
+# to query the user table. Views that need the full row use
+# current_user.user. Entries expire after PRINCIPAL_CACHE_TTL and are
+# dropped on edit_profile and logout.
+class Principal:
+    __slots__ = ('id', 'username', 'profile_pic')
+
+    is_authenticated = True
+    is_active = True
+    is_anonymous = False
+
+    def __init__(self, id, username, profile_pic):
+        self.id = id
+        self.username = username
+        self.profile_pic = profile_pic
+
+    def get_id(self):
+        return str(self.id)
+
+    @property
+    def user(self):
+        # The session's identity map makes repeated access within a request free.
+        return db.session.get(User, self.id)
+
+    # Compares equal to the matching User row, e.g. `post.author == current_user`.
+    def __eq__(self, other):
+        if hasattr(other, 'get_id'):
+            return self.get_id() == other.get_id()
+        return NotImplemented
+
+    def __ne__(self, other):
+        equal = self.__eq__(other)
+        return equal if equal is NotImplemented else not equal
+
+    def __hash__(self):
+        return hash(self.id)
+
+
+@login_manager.user_loader
+def load_user(user_id):
+    user_id = int(user_id)
+    principal = principal_cache.get(user_id)
+    if principal is not None:
+        counted('db_loads_avoided')   # a user-table query this request didn't make
+        return principal
+    row = db.session.query(User.id, User.username, User.profile_pic).filter_by(id=user_id).first()
+    if row is None:
+        return None
+    principal = Principal(*row)
+    principal_cache.set(user_id, principal)
+    return principal
+
+
+@bp.route('/auth/metrics')
+@login_required
+def auth_metrics():
+    # Process-wide totals; every hit is a user-table query a request didn't
+    # make. Per request they show up as db_loads_avoided in Server-Timing,
+    # and per endpoint in /_metrics (INSTRUMENTATION=1).
+    stats = principal_cache.stats()
+    return dict(stats, db_loads_avoided=stats['hits'])
+
+
+# ----------------------------------------
+# Username typeahead
+# ----------------------------------------
+# The feed's user filter asks this endpoint for matches as the user types,
+# instead of rendering every user into a <select>. Lookups are served from a
+# sorted in-memory array of usernames (only that column is ever loaded);
+# register() adds new names to it.
+@bp.route('/users/suggest')
+def suggest_users():
+    prefix = request.args.get('q', '', type=str).strip()
+    if not prefix:
+        return {'users': []}
+    return {'users': username_index.complete(prefix, current_app.config['USER_SUGGEST_LIMIT'])}
+
+
+# ----------------------------------------
+# Register / Login / Logout
+# ----------------------------------------
+@bp.route('/register', methods=['GET', 'POST'])
+def register():
+    if request.method == 'POST':
+        username = request.form['username'].strip()
+        email = request.form['email'].strip().lower()
+        password = request.form['password'].strip()
+
+        # Validate input
+        if not username or not email or not password:
+            flash('All fields are required (username, email, and password).', 'danger')
+            return redirect(url_for('accounts.register'))
+
+        # Check for duplicates
+        if User.query.filter_by(username=username).first():
+            flash('Username already exists.', 'warning')
+            return redirect(url_for('accounts.register'))
+        if User.query.filter_by(email=email).first():
+            flash('Email already registered.', 'warning')
+            return redirect(url_for('accounts.register'))
+
+        # Hash password and save user
+        hashed_pw = password_hasher.hash(password)
+        new_user = User(username=username, email=email, password=hashed_pw)
+        db.session.add(new_user)
+        db.session.commit()
+        username_index.add(username)
+
+        flash('✅ Account created successfully! You can now log in.', 'success')
+        return redirect(url_for('accounts.login'))
+
+    return render_template('register.html')
+
+
+@bp.route('/login', methods=['GET', 'POST'])
+def login():
+    if request.method == 'POST':
+        login_field = request.form['login_field'].strip().lower()  # 👈 matches the HTML name
+        password = request.form['password'].strip()
+
+        # Try finding by email first, then username
+        user = User.query.filter(
+            (User.email == login_field) | (User.username == login_field)
+        ).first()
+
+        matches, new_hash = password_hasher.verify(user.password, password) if user else (False, None)
+        if matches:
+            if new_hash:
+                # Hash settings changed since this one was made.
+                user.password = new_hash
+                db.session.commit()
+            login_user(user)
+            flash(f'Welcome back, {user.username}!', 'success')
+            return redirect(url_for('feed.index'))
+
+        flash('Invalid username/email or password.', 'danger')
+
+    return render_template('login.html')
+
+
+@bp.route('/auth/hashing')
+@login_required
+def hashing_metrics():
+    return password_hasher.stats()
+
+
+@bp.route('/logout')
+@login_required
+def logout():
+    principal_cache.invalidate(current_user.id)
+    logout_user()
+    return redirect(url_for('accounts.login'))
+
+
+# ----------------------------------------
+# Profile
+# ----------------------------------------
+@bp.route('/profile/<username>')
+@use_replica
+@login_required
+@list_conditional('posts', 'blogs', 'users')
+def profile(username):
+    user_id = db.session.query(User.id).filter_by(username=username).scalar()
+    if user_id is None:
+        abort(404)
+
+    def load():
+        user = User.query.get_or_404(user_id)
+        limit = current_app.config['PROFILE_RECENT_ITEMS']
+        user_blogs = Blog.query.filter_by(author_id=user.id).order_by(
+            Blog.date_posted.desc()).limit(limit).all()
+        user_posts = Post.query.filter_by(user_id=user.id).order_by(
+            Post.date_posted.desc()).limit(limit).all()
+        return {'user': user, 'blogs': user_blogs, 'posts': user_posts}
+
+    body = cached_fragment(('profile', user_id), 'fragments/profile.html', load,
+                           scopes=[profile_scope(user_id)])
+    return render_template('profile.html', body=body, username=username)
+
+
+@bp.route('/edit_profile', methods=['GET', 'POST'])
+@login_required
+def edit_profile():
+    user = current_user.user
+    if request.method == 'POST':
+        bio = request.form.get('bio', '').strip()
+        file = request.files.get('profile_pic')
+
+        if file and allowed_file(file.filename):
+            user.profile_pic = save_upload(file)
+
+        user.bio = bio
+        bump_versions('users', profile_scope(user.id))
+        db.session.commit()
+        principal_cache.invalidate(user.id)
+        flash('✅ Profile updated successfully!', 'success')
+        return redirect(url_for('accounts.profile', username=current_user.username))
+
+    return render_template('edit_profile.html', user=user)
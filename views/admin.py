@@ -0,0 +1,140 @@
+from datetime import datetime
+
+from flask import Blueprint
+
+import migrations
+from extensions import db
+from model import Blog, ChatMessage, HelpReply, HelpRequest, Like, Post, Task, TaskFacet, User
+from queryplan import full_scans
+from views.chat import LOBBY
+
+# Maintenance commands only; no routes.
+bp = Blueprint('admin', __name__, cli_group=None)
+
+
+# ----------------------------------------
+# Schema migrations & query plans
+# ----------------------------------------
+@bp.cli.command('migrate')
+def migrate_command():
+    # Bring the database in line with the models (see migrations.py).
+    applied = migrations.upgrade(db.engine)
+    for version, name in applied:
+        print(f"applied {version:04d} {name}")
+    print(f"{len(applied)} migration(s) applied.")
+
+
+@bp.cli.command('migration-status')
+def migration_status_command():
+    pending = migrations.pending(db.engine)
+    for version, name in pending:
+        print(f"pending {version:04d} {name}")
+    print("Schema is up to date." if not pending else f"{len(pending)} pending.")
+
+
+# Representative statements for the queries every page load depends on.
+# `flask check-query-plans` EXPLAINs each one and fails on a full table scan,
+# or on a full index scan unless the query is marked ordered_scan (it walks
+# an index in ORDER BY order and stops at its LIMIT). Small lookup tables
+# read whole, such as HelpSubject (one row per subject, however many help
+# requests there are), are left out.
+HOT_QUERIES = {}
+
+
+def hot_query(name, ordered_scan=False):
+    def register(fn):
+        HOT_QUERIES[name] = (fn, ordered_scan)
+        return fn
+    return register
+
+
+@hot_query('feed page', ordered_scan=True)
+def _feed_page_query():
+    edge = datetime(2025, 1, 1)
+    return Post.query.filter(db.or_(Post.date_posted < edge,
+                                    db.and_(Post.date_posted == edge, Post.id < 100))
+                             ).order_by(Post.date_posted.desc(), Post.id.desc()).limit(6)
+
+
+@hot_query('recent posts by user')
+def _user_posts_query():
+    return Post.query.filter_by(user_id=1).order_by(Post.date_posted.desc()).limit(5)
+
+
+@hot_query('liked ids')
+def _liked_ids_query():
+    return db.session.query(Like.post_id).filter(Like.user_id == 1, Like.post_id.in_([1, 2, 3]))
+
+
+@hot_query('likes of a post')
+def _post_likes_query():
+    return db.session.query(db.func.count(Like.id)).filter(Like.post_id == 1)
+
+
+@hot_query('blogs page', ordered_scan=True)
+def _blogs_page_query():
+    return Blog.query.order_by(Blog.date_posted.desc(), Blog.id.desc()).limit(11)
+
+
+@hot_query('blogs by author')
+def _author_blogs_query():
+    return Blog.query.filter_by(author_id=1).order_by(Blog.date_posted.desc()).limit(20)
+
+
+@hot_query('help requests page', ordered_scan=True)
+def _help_page_query():
+    return HelpRequest.query.order_by(HelpRequest.date_posted.desc(), HelpRequest.id.desc()).limit(11)
+
+
+@hot_query('help requests by subject')
+def _help_subject_page_query():
+    return HelpRequest.query.filter(HelpRequest.subject == 'Math').order_by(
+        HelpRequest.date_posted.desc(), HelpRequest.id.desc()).limit(11)
+
+
+@hot_query('help replies page')
+def _help_replies_query():
+    return HelpReply.query.filter_by(request_id=1).order_by(
+        HelpReply.date_posted, HelpReply.id).limit(21)
+
+
+@hot_query('task list')
+def _task_list_query():
+    return Task.query.filter_by(user_id=1, category='work', is_completed=False).order_by(Task.due_date)
+
+
+@hot_query('task stats')
+def _task_stats_query():
+    return db.session.query(db.func.count(Task.id)).filter(Task.user_id == 1)
+
+
+@hot_query('task facets')
+def _task_facets_query():
+    return TaskFacet.query.filter(TaskFacet.user_id == 1, TaskFacet.total > 0)
+
+
+@hot_query('chat history')
+def _chat_history_query():
+    return ChatMessage.query.filter_by(room=LOBBY).order_by(
+        ChatMessage.date_posted.desc(), ChatMessage.id.desc()).limit(51)
+
+
+@hot_query('user by username')
+def _user_by_name_query():
+    return User.query.filter_by(username='someone')
+
+
+@bp.cli.command('check-query-plans')
+def check_query_plans_command():
+    failed = 0
+    with db.engine.connect() as conn:
+        for name, (build, ordered_scan) in HOT_QUERIES.items():
+            scans = [f"{table} ({kind})" for table, kind in full_scans(conn, build().statement)
+                     if kind == 'table' or not ordered_scan]
+            if scans:
+                failed += 1
+                print(f"FULL SCAN  {name}: {', '.join(scans)}")
+            else:
+                print(f"ok         {name}")
+    if failed:
+        raise SystemExit(f"{failed} hot quer{'y' if failed == 1 else 'ies'} fall back to a full scan.")
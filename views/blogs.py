@@ -0,0 +1,71 @@
+from flask import Blueprint, abort, flash, redirect, render_template, request, url_for
+from flask_login import current_user, login_required
+
+from extensions import db, use_replica
+from model import Blog, Like
+from pagination import keyset_paginate
+from views.shared import bump_versions, cached_fragment, liked_ids, list_conditional, profile_scope, set_like
+
+bp = Blueprint('blogs', __name__)
+
+
+# ----------------------------------------
+# Blogs
+# ----------------------------------------
+@bp.route('/blogs')
+@use_replica
+@login_required
+@list_conditional('blogs', 'blog_likes', 'users')
+def blogs():
+    cursor = request.args.get('cursor', '', type=str)
+    page = keyset_paginate(Blog.query.options(db.joinedload(Blog.author)),
+                           Blog.date_posted, Blog.id, cursor=cursor, per_page=10)
+    liked_blog_ids = liked_ids(Like.blog_id, [blog.id for blog in page.items])
+    return render_template('blogs.html', blogs=page, liked_blog_ids=liked_blog_ids)
+
+
+@bp.route('/blog/<int:blog_id>')
+@use_replica
+@login_required
+@list_conditional('blogs', 'blog_likes', 'users')
+def blog_detail(blog_id):
+    body = cached_fragment(('blog', blog_id), 'fragments/blog.html', lambda: {
+        'blog': Blog.query.options(db.joinedload(Blog.author)).get_or_404(blog_id)})
+
+    # The like count changes far more often than the blog, so it stays out
+    # of the fragment and is read by primary key on every view.
+    like_count = db.session.query(Blog.like_count).filter_by(id=blog_id).scalar()
+    if like_count is None:
+        abort(404)
+    liked_blog_ids = liked_ids(Like.blog_id, [blog_id])
+    return render_template('blog_detail.html', body=body, blog_id=blog_id,
+                           like_count=like_count, liked_blog_ids=liked_blog_ids)
+
+
+@bp.route('/create_blog', methods=['GET', 'POST'])
+@login_required
+def create_blog():
+    if request.method == 'POST':
+        title = request.form['title']
+        content = request.form['content']
+
+        if not title or not content:
+            flash('Title and content are required.', 'warning')
+            return redirect(url_for('blogs.create_blog'))
+
+        new_blog = Blog(title=title, content=content, author_id=current_user.id)
+        db.session.add(new_blog)
+        bump_versions('blogs', profile_scope(current_user.id))
+        db.session.commit()
+        flash('📝 Blog published successfully!', 'success')
+        return redirect(url_for('blogs.blogs'))
+
+    return render_template('create_blog.html')
+
+
+@bp.route('/like_blog/<int:blog_id>', methods=['POST'])
+@login_required
+def like_blog(blog_id):
+    if not db.session.query(Blog.query.filter_by(id=blog_id).exists()).scalar():
+        abort(404)
+    return set_like(Blog, blog_id, blog_id=blog_id)
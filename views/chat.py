@@ -0,0 +1,338 @@
+import atexit
+import functools
+import threading
+import time
+import uuid
+from datetime import datetime
+
+from flask import Blueprint, current_app, render_template, request
+from flask_login import current_user, login_required
+
+from chatbus import create_bus
+from chatpipeline import ChatPipeline
+from cooperative import async_mode
+from extensions import app_local, db
+from model import ChatMessage
+from pagination import keyset_paginate
+from presence import PresenceRegistry
+
+bp = Blueprint('chat', __name__)
+
+# Every socket joins the lobby; direct-message rooms are "dm-<low id>-<high id>"
+# so both participants end up in the same room whichever side opens it.
+# Messages are stored, then published on the chat bus; every worker's bus
+# handler emits them to its own sockets in that room.
+LOBBY = 'lobby'
+chat_bus = app_local('chat_bus')
+presence = app_local('presence')
+socketio = app_local('socketio')
+_chat_bus_lock = threading.Lock()
+
+
+@bp.record_once
+def setup(state):
+    app = state.app
+    bus = create_bus(app.config['CHAT_BUS'])
+    app.extensions['chat_bus'] = bus
+    app.extensions['chat_bus_started'] = False
+    app.extensions['presence'] = PresenceRegistry()
+    app.extensions['chat_pipeline'] = None
+    if app.config['CHAT_PIPELINE']:
+        app.extensions['chat_pipeline'] = ChatPipeline(functools.partial(persist_chat_messages, app),
+                                                       functools.partial(publish_chat, bus),
+                                                       batch_size=app.config['CHAT_BATCH_SIZE'],
+                                                       max_delay=app.config['CHAT_BATCH_DELAY'],
+                                                       coalesce_rate=app.config['CHAT_COALESCE_RATE'],
+                                                       frame_interval=app.config['CHAT_FRAME_INTERVAL'])
+
+
+# ----------------------------------------
+# Chat Route
+# ----------------------------------------
+@bp.route('/chat')
+@login_required
+def chat():
+    users = [u for u in presence.online(LOBBY) if u['id'] != current_user.id]
+    return render_template('chat.html', username=current_user.username, users=users,
+                           heartbeat=current_app.config['PRESENCE_HEARTBEAT'])
+
+
+@bp.route('/chat/metrics')
+@login_required
+def chat_metrics():
+    chat_pipeline = current_app.extensions['chat_pipeline']
+    if chat_pipeline is None:
+        return {'pipeline': False}
+    return dict(chat_pipeline.metrics(), pipeline=True)
+
+
+# ----------------------------------------
+# Socket.IO
+# ----------------------------------------
+# Socket.IO is attached by init_socketio(), not create_app(): only the
+# processes that serve sockets (serve.py, `python app.py`) import
+# flask_socketio and its server stack. CLI commands, benchmarks and tests
+# that only speak HTTP never load it.
+SOCKET_EVENTS = {}
+
+
+def socket_event(name):
+    def register(fn):
+        SOCKET_EVENTS[name] = fn
+        return fn
+    return register
+
+
+def init_socketio(app):
+    from flask_socketio import SocketIO
+    # Matches however the process was started: gevent/eventlet under serve.py
+    # (or a gunicorn green worker), otherwise plain threads.
+    socketio = SocketIO(app, cors_allowed_origins="*", async_mode=async_mode())
+    for name, handler in SOCKET_EVENTS.items():
+        socketio.on_event(name, handler)
+    return socketio
+
+
+def ensure_chat_bus():
+    app = current_app._get_current_object()
+    with _chat_bus_lock:
+        if not app.extensions['chat_bus_started']:
+            chat_bus.start(functools.partial(deliver_chat, app))
+            atexit.register(chat_bus.stop)
+            chat_pipeline = app.extensions['chat_pipeline']
+            if chat_pipeline is not None:
+                chat_pipeline.start()
+                # atexit runs LIFO: drain the pipeline before the bus closes.
+                atexit.register(chat_pipeline.stop)
+            threading.Thread(target=sweep_presence, args=(app,), name='presence-sweeper', daemon=True).start()
+            publish_presence('sync')
+            app.extensions['chat_bus_started'] = True
+
+
+def deliver_chat(app, message):
+    # Runs on the bus thread.
+    with app.app_context():
+        if 'presence' in message:
+            apply_presence(message['presence'])
+            return
+        socketio.emit(message['event'], message['data'], to=message['room'])
+
+
+# ----------------------------------------
+# Presence
+# ----------------------------------------
+# Every worker keeps a full PresenceRegistry. Changes are published on the
+# chat bus as small ops and applied by all workers (including the sender),
+# and each worker pushes the resulting diffs to its own sockets. Connections
+# are keyed "<worker id>:<sid>"; a worker whose beat stops is forgotten.
+WORKER_ID = uuid.uuid4().hex[:12]
+
+
+def presence_conn_id():
+    return f"{WORKER_ID}:{request.sid}"
+
+
+def publish_presence(op, **fields):
+    chat_bus.publish({'presence': dict(fields, op=op, origin=WORKER_ID)})
+
+
+def emit_presence(diffs):
+    for room, diff in diffs.items():
+        socketio.emit('presence', dict(diff, room=room), to=room)
+
+
+def apply_presence(op):
+    kind, origin = op['op'], op['origin']
+    presence.beat(origin)
+    diffs = {}
+    if kind == 'connect':
+        presence.connect(op['conn'], op['user_id'], op['username'], origin)
+        for room in op['rooms']:
+            for room_name, diff in presence.join(op['conn'], room).items():
+                diffs[room_name] = diff
+    elif kind == 'join':
+        diffs = presence.join(op['conn'], op['room'])
+    elif kind == 'leave':
+        diffs = presence.leave(op['conn'], op['room'])
+    elif kind == 'disconnect':
+        diffs = presence.disconnect(op['conn'])
+    elif kind == 'sync' and origin != WORKER_ID:
+        # A worker just started: replay our own connections for it.
+        for conn_id, user_id, username, rooms in presence.snapshot(WORKER_ID):
+            publish_presence('connect', conn=conn_id, user_id=user_id,
+                             username=username, rooms=rooms)
+    emit_presence(diffs)
+
+
+def sweep_presence(app):
+    with app.app_context():
+        interval = app.config['PRESENCE_HEARTBEAT']
+        timeout = app.config['PRESENCE_TIMEOUT']
+        while True:
+            time.sleep(interval)
+            publish_presence('beat')
+            for conn_id in presence.stale_connections(timeout, origin=WORKER_ID):
+                publish_presence('disconnect', conn=conn_id)
+            for origin in presence.stale_origins(timeout):
+                if origin != WORKER_ID:
+                    emit_presence(presence.forget_origin(origin))
+
+
+# ----------------------------------------
+# Messages
+# ----------------------------------------
+def chat_room(room):
+    # Normalize a room name from the client; None if the user may not use
+    # it. Every room, the lobby included, is for logged-in users only.
+    if not current_user.is_authenticated or not isinstance(room, str):
+        return None
+    if room == LOBBY:
+        return LOBBY
+    try:
+        ids = sorted({int(part) for part in room.removeprefix('dm-').split('-')})
+    except ValueError:
+        return None
+    if len(ids) != 2 or current_user.id not in ids:
+        return None
+    return f"dm-{ids[0]}-{ids[1]}"
+
+
+def serialize_chat_message(message, username):
+    return {'id': message.id,
+            'room': message.room,
+            'username': username,
+            'msg': message.body,
+            'date_posted': message.date_posted.isoformat()}
+
+
+def chat_event_data(event, message, username):
+    data = serialize_chat_message(message, username)
+    if event == 'receive_message':
+        # Lobby broadcasts keep their original {username, message} shape.
+        return {'username': username, 'message': data['msg']}
+    return data
+
+
+def publish_chat(bus, event, room, data):
+    bus.publish({'event': event, 'room': room, 'data': data})
+
+
+def persist_chat_messages(app, items):
+    # Called by the pipeline thread with a micro-batch: one flush, one commit.
+    with app.app_context():
+        messages = [ChatMessage(room=item['room'], body=item['body'], user_id=item['user_id'],
+                                date_posted=item['date_posted'])
+                    for item in items]
+        db.session.add_all(messages)
+        db.session.flush()
+        payloads = [chat_event_data(item['event'], message, item['username'])
+                    for item, message in zip(items, messages)]
+        db.session.commit()
+        return payloads
+
+
+def post_chat_message(room, body, event):
+    body = body[:current_app.config['CHAT_MAX_LENGTH']]
+    chat_pipeline = current_app.extensions['chat_pipeline']
+    if chat_pipeline is not None:
+        chat_pipeline.submit(room, event, body=body, user_id=current_user.id,
+                             username=current_user.username, date_posted=datetime.utcnow())
+        return
+    publish_chat(chat_bus, event, room, persist_chat_messages(current_app._get_current_object(), [{
+        'room': room, 'event': event, 'body': body, 'user_id': current_user.id,
+        'username': current_user.username, 'date_posted': datetime.utcnow(),
+    }])[0])
+
+
+def chat_history(room, before=None):
+    # Newest page first; `before` is the cursor for the next older page.
+    page = keyset_paginate(ChatMessage.query.filter_by(room=room)
+                           .options(db.joinedload(ChatMessage.user)),
+                           ChatMessage.date_posted, ChatMessage.id,
+                           cursor=before, per_page=current_app.config['CHAT_HISTORY_PAGE'])
+    messages = [serialize_chat_message(m, m.user.username) for m in reversed(page.items)]
+    return {'room': room, 'messages': messages, 'before': page.next_cursor}
+
+
+# ----------------------------------------
+# ✅ SocketIO Events for Real-Time Chat
+# ----------------------------------------
+# Payloads come straight from the client: anything that isn't an object
+# with string fields is dropped without a reply.
+@socket_event('connect')
+def handle_connect():
+    from flask_socketio import join_room
+    if not current_user.is_authenticated:
+        return False   # refuses the connection
+    ensure_chat_bus()
+    join_room(LOBBY)
+    publish_presence('connect', conn=presence_conn_id(), user_id=current_user.id,
+                     username=current_user.username, rooms=[LOBBY])
+
+
+@socket_event('disconnect')
+def handle_disconnect(*args):
+    if current_user.is_authenticated:
+        publish_presence('disconnect', conn=presence_conn_id())
+
+
+@socket_event('heartbeat')
+def handle_heartbeat(*args):
+    presence.touch(presence_conn_id())
+
+
+@socket_event('join')
+def handle_join(data):
+    from flask_socketio import emit, join_room
+    if not isinstance(data, dict):
+        return
+    room = chat_room(data.get('room'))
+    if room is None:
+        return
+    join_room(room)
+    publish_presence('join', conn=presence_conn_id(), room=room)
+    emit('history', chat_history(room))
+
+
+@socket_event('leave')
+def handle_leave(data):
+    from flask_socketio import leave_room
+    if not isinstance(data, dict):
+        return
+    room = chat_room(data.get('room'))
+    if room is not None and room != LOBBY:
+        leave_room(room)
+        publish_presence('leave', conn=presence_conn_id(), room=room)
+
+
+@socket_event('history')
+def handle_history(data):
+    from flask_socketio import emit
+    if not isinstance(data, dict):
+        return
+    room = chat_room(data.get('room'))
+    before = data.get('before')
+    if room is not None and (before is None or isinstance(before, str)):
+        emit('history', chat_history(room, before))
+
+
+@socket_event('message')
+def handle_message(data):
+    if not isinstance(data, dict) or not isinstance(data.get('msg'), str):
+        return
+    room = chat_room(data.get('room'))
+    msg = data['msg'].strip()
+    if room is None or not msg:
+        return
+    post_chat_message(room, msg, 'message')
+
+
+@socket_event('send_message')
+def handle_send_message(data):
+    # Lobby broadcast. The sender's name comes from the session, not the payload.
+    if not isinstance(data, dict) or not isinstance(data.get('message'), str):
+        return
+    message = data['message'].strip()
+    if not message or not current_user.is_authenticated:
+        return
+    post_chat_message(LOBBY, message, 'receive_message')
@@ -0,0 +1,282 @@
+
+from flask import Blueprint, abort, current_app, flash, redirect, render_template, request, url_for
+from flask_login import current_user, login_required
+
+from dbrouting import primary
+from extensions import app_local, db, use_replica
+from model import Like, Post, User
+from pagination import KeysetPage, decode_cursor, encode_cursor, keyset_paginate
+from timelines import create_store, date_score, score_date
+from views.shared import (allowed_file, bump_versions, liked_ids, list_conditional, list_versions,
+                          profile_scope, save_upload, search_page, set_like)
+
+bp = Blueprint('feed', __name__, cli_group=None)
+
+timeline_store = app_local('timeline_store')
+
+
+@bp.record_once
+def setup(state):
+    app = state.app
+    app.extensions['timeline_store'] = None
+    if app.config['TIMELINE_BACKEND']:
+        app.extensions['timeline_store'] = create_store(
+            app.config['TIMELINE_BACKEND'], app.config['TIMELINE_PATH'],
+            max_len=app.config['TIMELINE_LENGTH'], max_keys=app.config['TIMELINE_MAX_KEYS'])
+
+
+# ----------------------------------------
+# Feed queries
+# ----------------------------------------
+def feed_page(query, cursor, per_page, descending=True):
+    # Authors come from the join already present in `query`, like counts from
+    # Post.like_count, and the viewer's own likes for the page in one query.
+    posts = keyset_paginate(query.options(db.contains_eager(Post.author)),
+                            Post.date_posted, Post.id,
+                            cursor=cursor, per_page=per_page, descending=descending)
+    liked_post_ids = liked_ids(Like.post_id, [post.id for post in posts.items])
+    return posts, liked_post_ids
+
+
+# ----------------------------------------
+# Home timelines (TIMELINE_BACKEND)
+# ----------------------------------------
+# Fan-out on write: create_post() pushes the new post's id into the home
+# timeline and into its author's ('author:<user id>'). There is no follow
+# model, so every viewer's home feed is the same and one 'home' key serves
+# them all; a post costs two pushes however many people read the feed.
+# Reading the unfiltered or per-author feed is then a page from the store
+# plus one primary-key query. Timelines are built from Post on first read;
+# only materialized ones receive pushes.
+#
+# Every post write moves the 'posts' version (views/shared.py). Readers
+# sync() the store to it and writers advance() it along with their own
+# writes, so a post written anywhere else (another worker or host, a
+# restore) makes the store start over on its next read.
+HOME = 'home'
+
+
+def bump_posts(author_id):
+    # Part of the caller's transaction; returns the version it moves to.
+    bump_versions('posts', profile_scope(author_id))
+    return list_versions(['posts'])[0]
+
+
+def post_entry(post):
+    return date_score(post.date_posted), post.id
+
+
+def ensure_timeline(key):
+    # False if the store dropped the key again before it was filled.
+    if timeline_store.ready(key):
+        return True
+    timeline_store.begin(key)
+    query = db.session.query(Post.date_posted, Post.id)
+    if key.startswith('author:'):
+        query = query.filter(Post.user_id == int(key.split(':', 1)[1]))
+    with primary():
+        rows = query.order_by(Post.date_posted.desc(), Post.id.desc()).limit(timeline_store.max_len).all()
+    timeline_store.fill(key, [(date_score(date_posted), post_id) for date_posted, post_id in rows],
+                        truncated=len(rows) == timeline_store.max_len)
+    return timeline_store.ready(key)
+
+
+def fan_out(post, version):
+    timeline_store.push([HOME, f"author:{post.user_id}"], post_entry(post))
+    timeline_store.advance(version)
+
+
+def timeline_page(key, cursor, per_page):
+    # Same pages and cursors as feed_page() on the newest-first feed, or
+    # None when they have to come from Post after all (paging past the end
+    # of a full timeline, or a timeline evicted while being built).
+    position = decode_cursor(cursor)
+    newer = position is not None and position[2] == 'prev'
+    bound = (date_score(position[0]), position[1]) if position else None
+
+    if not ensure_timeline(key):
+        return None
+    entries = timeline_store.page(key, bound, per_page + 1, newer)
+    # A truncated timeline lacks its oldest entries; pages reaching past its
+    # end come from Post.
+    if newer:
+        past_end = bound is not None and not timeline_store.page(key, bound, 1)
+    else:
+        past_end = len(entries) <= per_page
+    if past_end and timeline_store.truncated(key):
+        return None
+
+    has_more = len(entries) > per_page
+    entries = entries[:per_page]
+    if newer:
+        entries.reverse()
+    if not entries:
+        return KeysetPage([])
+
+    # Ids whose post is gone (deleted while the timeline was being built)
+    # are skipped.
+    ids = [post_id for _, post_id in entries]
+    found = {post.id: post for post in Post.query.join(User).options(db.contains_eager(Post.author))
+             .filter(Post.id.in_(ids))}
+    items = [found[post_id] for post_id in ids if post_id in found]
+
+    more_after, more_before = (True, has_more) if newer else (has_more, position is not None)
+    first, last = entries[0], entries[-1]
+    return KeysetPage(
+        items,
+        next_cursor=encode_cursor(score_date(last[0]), last[1], 'next') if more_after else None,
+        prev_cursor=encode_cursor(score_date(first[0]), first[1], 'prev') if more_before else None)
+
+
+def feed_timeline(filter_user, cursor, per_page):
+    timeline_store.sync(list_versions(['posts'])[0])
+    if not filter_user:
+        return timeline_page(HOME, cursor, per_page)
+    author_id = db.session.query(User.id).filter_by(username=filter_user).scalar()
+    return timeline_page(f"author:{author_id}", cursor, per_page) if author_id else KeysetPage([])
+
+
+@bp.cli.command('rebuild-timelines')
+def rebuild_timelines_command():
+    # Needed after posts are written behind the app's back without moving
+    # the 'posts' version. Moving it makes every store start over on its
+    # next read; a shared one is cleared here as well.
+    bump_versions('posts')
+    db.session.commit()
+    store = current_app.extensions['timeline_store']
+    if store is None:
+        print("Timelines are disabled (TIMELINE_BACKEND).")
+    elif store.shared:
+        store.clear()
+        print("Timelines cleared.")
+    else:
+        print("Timelines are per worker ('memory'): each drops its own on its next feed read.")
+
+
+# ----------------------------------------
+# Index / Feed
+# ----------------------------------------
+@bp.route('/')
+@use_replica
+@list_conditional('posts', 'post_likes', 'users')
+def index():
+    search_query = request.args.get('search', '', type=str)
+    filter_user = request.args.get('user', '', type=str)
+    filter_subject = request.args.get('subject', '', type=str)
+    sort_order = request.args.get('sort', 'newest', type=str)
+    cursor = request.args.get('cursor', '', type=str)
+    per_page = current_app.config['FEED_PAGE_SIZE']
+
+    posts = None
+    if (current_app.extensions['timeline_store'] is not None and sort_order == 'newest'
+            and not search_query and not filter_subject):
+        posts = feed_timeline(filter_user, cursor, per_page)
+
+    if posts is not None:
+        liked_post_ids = liked_ids(Like.post_id, [post.id for post in posts.items])
+    else:
+        query = Post.query.join(User)
+
+        if filter_user:
+            query = query.filter(User.username == filter_user)
+
+        if search_query or filter_subject:
+            # Best matches first, whatever the sort order. The subject is a
+            # prefix query on the search index ("bio" finds "biology"), not
+            # a LIKE '%...%' scan of every post.
+            posts = search_page(query.options(db.contains_eager(Post.author)), Post, 'post',
+                                search_query, cursor, per_page, prefix=filter_subject)
+            liked_post_ids = liked_ids(Like.post_id, [post.id for post in posts.items])
+        else:
+            posts, liked_post_ids = feed_page(query, cursor, per_page,
+                                              descending=(sort_order == 'newest'))
+
+    return render_template('index.html',
+                           posts=posts,
+                           liked_post_ids=liked_post_ids,
+                           search_query=search_query,
+                           filter_user=filter_user,
+                           filter_subject=filter_subject,
+                           sort_order=sort_order)
+
+
+# ----------------------------------------
+# Create Post
+# ----------------------------------------
+@bp.route('/create_post', methods=['GET', 'POST'])
+@login_required
+def create_post():
+    if request.method == 'POST':
+        content = request.form['content']
+        uploaded = request.files.get('file')
+        filename = None
+
+        if uploaded and allowed_file(uploaded.filename):
+            filename = save_upload(uploaded)
+
+        new_post = Post(content=content, file=filename, user_id=current_user.id)
+        db.session.add(new_post)
+        version = bump_posts(current_user.id)
+        db.session.commit()
+        if current_app.extensions['timeline_store'] is not None:
+            fan_out(new_post, version)
+
+        flash('Post created!', 'success')
+        return redirect(url_for('feed.index'))
+
+    return render_template('create_post.html')
+
+
+# ----------------------------------------
+# Edit / Delete Post
+# ----------------------------------------
+@bp.route('/edit_post/<int:post_id>', methods=['GET', 'POST'])
+@login_required
+def edit_post(post_id):
+    post = Post.query.get_or_404(post_id)
+
+    if post.author != current_user:
+        flash('You cannot edit this post.', 'danger')
+        return redirect(url_for('feed.index'))
+
+    if request.method == 'POST':
+        post.content = request.form['content']
+        version = bump_posts(post.user_id)
+        db.session.commit()
+        if current_app.extensions['timeline_store'] is not None:
+            timeline_store.advance(version)   # timelines hold ids only
+        flash('Post updated!', 'success')
+        return redirect(url_for('feed.index'))
+
+    return render_template('edit_post.html', post=post)
+
+
+@bp.route('/delete_post/<int:post_id>')
+@login_required
+def delete_post(post_id):
+    post = Post.query.get_or_404(post_id)
+
+    if post.author != current_user:
+        flash('Unauthorized.', 'danger')
+        return redirect(url_for('feed.index'))
+
+    entry = post_entry(post)
+    db.session.delete(post)
+    version = bump_posts(post.user_id)
+    db.session.commit()
+    if current_app.extensions['timeline_store'] is not None:
+        timeline_store.discard(entry)
+        timeline_store.advance(version)
+    flash('Post deleted!', 'info')
+    return redirect(url_for('feed.index'))
+
+
+# ----------------------------------------
+# Likes
+# ----------------------------------------
+@bp.route('/like_post/<int:post_id>', methods=['POST'])
+@login_required
+def like_post(post_id):
+    if not db.session.query(Post.query.filter_by(id=post_id).exists()).scalar():
+        abort(404)
+    return set_like(Post, post_id, post_id=post_id)
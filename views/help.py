@@ -0,0 +1,184 @@
+from flask import Blueprint, abort, current_app, flash, redirect, render_template, request, url_for
+from flask_login import current_user, login_required
+from markupsafe import Markup
+
+from extensions import db, use_replica
+from model import HelpReply, HelpRequest, HelpSubject
+from pagination import encode_cursor, keyset_paginate
+from views.shared import bump_versions, cached_fragment, insert_ignore, list_conditional, search_page
+
+bp = Blueprint('help', __name__, cli_group=None)
+
+
+def help_scope(help_id):
+    # Version of one thread's cached fragment (the request and its replies).
+    return f"help:{help_id}"
+
+
+# ----------------------------------------
+# Help Requests
+# ----------------------------------------
+@bp.route('/help')
+@use_replica
+@login_required
+@list_conditional('help', 'users')
+def help_requests():
+    subject = request.args.get('subject', '', type=str)
+    search = request.args.get('search', '', type=str)
+    cursor = request.args.get('cursor', '', type=str)
+
+    query = HelpRequest.query.options(db.joinedload(HelpRequest.user))
+
+    if subject:
+        query = query.filter(HelpRequest.subject == subject)
+
+    if search:
+        help_requests = search_page(query, HelpRequest, 'help', search, cursor, per_page=10)
+    else:
+        help_requests = keyset_paginate(query, HelpRequest.date_posted, HelpRequest.id,
+                                        cursor=cursor, per_page=10)
+    subjects = [s for s, in db.session.query(HelpSubject.subject).filter(HelpSubject.total > 0)
+                .order_by(HelpSubject.subject)]
+
+    return render_template('help_requests.html',
+                           help_requests=help_requests,
+                           subjects=subjects,
+                           search_query=search,
+                           filter_subject=subject)
+
+
+def bump_help_subject(subject, total=1):
+    # Runs in the caller's transaction, so the count commits with the request.
+    db.session.execute(insert_ignore(HelpSubject.__table__), [{'subject': subject or '', 'total': 0}])
+    db.session.execute(db.update(HelpSubject).where(HelpSubject.subject == (subject or ''))
+                       .values(total=HelpSubject.total + total))
+
+
+@bp.route('/create_help_request', methods=['GET', 'POST'])
+@login_required
+def create_help_request():
+    if request.method == 'POST':
+        title = request.form['title']
+        description = request.form['description']
+        subject = request.form.get('subject', '')
+
+        req = HelpRequest(title=title, description=description,
+                          subject=subject, user_id=current_user.id)
+        db.session.add(req)
+        bump_help_subject(subject)
+        bump_versions('help')
+        db.session.commit()
+
+        flash('Help request posted!', 'success')
+        return redirect(url_for('help.help_requests'))
+
+    return render_template('create_help_request.html')
+
+
+# ----------------------------------------
+# Help Request Detail + Reply Posting
+# ----------------------------------------
+@bp.route('/help/<int:help_id>')
+@use_replica
+@login_required
+@list_conditional('help', 'users')
+def help_detail(help_id):
+    cursor = request.args.get('cursor', '', type=str)
+
+    def load():
+        help_request = HelpRequest.query.options(db.joinedload(HelpRequest.user)).get_or_404(help_id)
+        replies = reply_page(help_id, cursor)
+        last = replies.items[-1] if replies else None
+        newer_cursor = encode_cursor(last.date_posted, last.id, 'next') if last else cursor
+        return {'help_request': help_request, 'replies': replies, 'newer_cursor': newer_cursor}
+
+    # Only the first page is cached; it is the one nearly every visit starts on.
+    if cursor:
+        body = Markup(render_template('fragments/help.html', **load()))
+    else:
+        body = cached_fragment(('help', help_id), 'fragments/help.html', load, scopes=[help_scope(help_id)])
+    return render_template('help_detail.html', body=body, help_id=help_id)
+
+
+def reply_page(help_id, cursor=None):
+    # Oldest first; authors come in the same query.
+    query = HelpReply.query.options(db.joinedload(HelpReply.user)).filter_by(request_id=help_id)
+    return keyset_paginate(query, HelpReply.date_posted, HelpReply.id, cursor=cursor,
+                           per_page=current_app.config['HELP_REPLIES_PAGE'], descending=False)
+
+
+def serialize_reply(reply):
+    return {
+        'id': reply.id,
+        'content': reply.content,
+        'username': reply.user.username,
+        'date_posted': reply.date_posted.strftime('%Y-%m-%d %H:%M'),
+    }
+
+
+@bp.route('/help/<int:help_id>/replies/newer')
+@login_required
+@list_conditional('help', 'users')
+def newer_replies(help_id):
+    # Replies posted after `after` (a cursor from the thread page or from the
+    # previous poll), so followers can fetch only what is new.
+    after = request.args.get('after', '', type=str)
+    page = reply_page(help_id, after)
+    if page:
+        last = page.items[-1]
+        after = encode_cursor(last.date_posted, last.id, 'next')
+    return {'replies': [serialize_reply(r) for r in page],
+            'cursor': after,
+            'more': page.has_next}
+
+
+@bp.route('/help/<int:help_id>/reply', methods=['POST'])
+@login_required
+def add_reply(help_id):
+    if not db.session.query(HelpRequest.query.filter_by(id=help_id).exists()).scalar():
+        abort(404)
+    content = request.form.get('reply')
+
+    if not content:
+        flash("Reply cannot be empty.", "warning")
+        return redirect(url_for('help.help_detail', help_id=help_id))
+
+    new_reply = HelpReply(content=content,
+                          user_id=current_user.id,
+                          request_id=help_id)
+
+    db.session.add(new_reply)
+    HelpRequest.query.filter_by(id=help_id).update(
+        {HelpRequest.reply_count: HelpRequest.reply_count + 1}, synchronize_session=False)
+    bump_versions('help', help_scope(help_id))
+    db.session.commit()
+
+    flash("Reply posted!", "success")
+    return redirect(url_for('help.help_detail', help_id=help_id))
+
+
+@bp.cli.command('recount-replies')
+def recount_replies_command():
+    # Rebuild HelpRequest.reply_count from the HelpReply table.
+    counts = db.session.query(db.func.count(HelpReply.id)).filter(
+        HelpReply.request_id == HelpRequest.id).scalar_subquery()
+    stale = [help_id for help_id, in db.session.query(HelpRequest.id).filter(HelpRequest.reply_count != counts)]
+    if stale:
+        HelpRequest.query.filter(HelpRequest.id.in_(stale)).update(
+            {HelpRequest.reply_count: counts}, synchronize_session=False)
+        bump_versions('help', *map(help_scope, stale))
+    db.session.commit()
+    print(f"Reply counters rebuilt ({len(stale)} changed).")
+
+
+@bp.cli.command('rebuild-help-subjects')
+def rebuild_help_subjects_command():
+    # Rebuild the per-subject counts from the HelpRequest table.
+    HelpSubject.query.delete()
+    subject = db.func.coalesce(HelpRequest.subject, '')
+    rows = db.session.query(subject, db.func.count(HelpRequest.id)).group_by(subject).all()
+    if rows:
+        db.session.execute(db.insert(HelpSubject), [{'subject': s, 'total': t} for s, t in rows])
+    bump_versions('help')
+    db.session.commit()
+    print(f"Rebuilt {len(rows)} help subjects.")
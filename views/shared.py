@@ -0,0 +1,396 @@
+import atexit
+import functools
+import os
+
+from flask import Blueprint, Request, current_app, flash, redirect, render_template, request, url_for
+from flask_login import current_user, login_required
+from markupsafe import Markup
+from sqlalchemy.exc import IntegrityError
+from werkzeug.exceptions import RequestEntityTooLarge
+
+from assets import precompress
+from cache import FragmentCache
+from cooperative import offload
+from dbrouting import primary
+from extensions import app_local, db
+from httpcache import conditional, directory_stamp
+from instrumentation import timed
+from likebuffer import LikeBuffer
+from model import Blog, HelpRequest, Like, ListVersion, Post
+from pagination import KeysetPage
+from search import create_backend
+from uploads import UploadStore, VariantWorker, is_image, variant_name
+
+# Uploads, rendered fragments, search and likes: used by several of the
+# other blueprints, which import the helpers from here.
+bp = Blueprint('shared', __name__, cli_group=None)
+
+upload_store = app_local('upload_store')
+variant_worker = app_local('variant_worker')
+fragment_cache = app_local('fragment_cache')
+search_index = app_local('search_index')
+
+
+@bp.record_once
+def setup(state):
+    app = state.app
+    app.request_class = UploadRequest
+    app.extensions['upload_store'] = UploadStore(os.path.join(app.root_path, app.config['UPLOAD_FOLDER']),
+                                                 max_bytes=app.config['UPLOAD_MAX_BYTES'])
+    app.extensions['variant_worker'] = VariantWorker(app.config['UPLOAD_VARIANT_WORKERS'])
+    atexit.register(app.extensions['variant_worker'].shutdown)
+    app.extensions['fragment_cache'] = FragmentCache('fragments', max_bytes=app.config['FRAGMENT_CACHE_BYTES'])
+    app.extensions['search_index'] = create_backend(app.config['SEARCH_BACKEND'], app.config['SEARCH_INDEX_PATH'])
+    app.extensions['search_index_built'] = False
+    app.extensions['render_stamp'] = render_stamp(app)
+    app.extensions['like_buffer'] = None
+    if app.config['LIKE_WRITE_BEHIND']:
+        like_buffer = LikeBuffer(functools.partial(flush_likes, app),
+                                 max_pending=app.config['LIKE_FLUSH_SIZE'],
+                                 interval=app.config['LIKE_FLUSH_INTERVAL'])
+        like_buffer.start()
+        atexit.register(like_buffer.stop)
+        app.extensions['like_buffer'] = like_buffer
+
+
+# ----------------------------------------
+# Allowed file types
+# ----------------------------------------
+ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif', 'pdf', 'docx', 'ppt', 'pptx'}
+
+
+def allowed_file(filename):
+    return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
+
+
+# ----------------------------------------
+# Upload storage
+# ----------------------------------------
+class UploadRequest(Request):
+    # Stream file parts straight into the upload store instead of a generic
+    # temp file, so save_upload() only has to rename them.
+    def _get_file_stream(self, total_content_length, content_type, filename=None,
+                         content_length=None):
+        return upload_store.open_incoming()
+
+
+def save_upload(uploaded):
+    # Returns the static-relative path stored on the model ("uploads/ab/<sha256>.png").
+    ext = uploaded.filename.rsplit('.', 1)[1].lower()
+    with timed('upload'):
+        relative = offload(upload_store.store, uploaded, ext)
+    variant_worker.submit(upload_store.path(relative))
+    return f"uploads/{relative}"
+
+
+@bp.app_template_global()
+def upload_url(path, variant=None):
+    # Older rows hold paths like "static/uploads\\name.png"; normalize them.
+    relative = path.replace('\\', '/').split('static/')[-1]
+    if variant and is_image(relative):
+        resized = variant_name(relative, variant)
+        if os.path.exists(os.path.join(current_app.static_folder, resized)):
+            return url_for('static', filename=resized)
+    return url_for('static', filename=relative)
+
+
+@bp.app_errorhandler(RequestEntityTooLarge)
+def upload_too_large(error):
+    flash(f"File too large (limit {current_app.config['UPLOAD_MAX_BYTES'] // (1024 * 1024)} MB).", 'danger')
+    return redirect(request.referrer or url_for('feed.index'))
+
+
+@bp.cli.command('compress-assets')
+def compress_assets_command():
+    # Precompressed .gz/.br siblings are served to clients that accept them.
+    for path in precompress(current_app.static_folder):
+        print(os.path.relpath(path, current_app.static_folder))
+
+
+@bp.cli.command('generate-variants')
+def generate_variants_command():
+    # Backfill resized variants for images uploaded before they existed.
+    count = 0
+    for dirpath, _, filenames in os.walk(upload_store.root):
+        for name in filenames:
+            path = os.path.join(dirpath, name)
+            if is_image(name) and not name.endswith('.webp') and '.incoming' not in dirpath:
+                variant_worker.submit(path)
+                count += 1
+    variant_worker.shutdown(wait=True)
+    print(f"Queued variants for {count} images.")
+
+
+# ----------------------------------------
+# Rendered fragments
+# ----------------------------------------
+# The shared part of blog_detail, help_detail and profile is rendered once
+# and kept as HTML; the page templates add the per-user bits (like state,
+# edit button, reply form) around it. Keys are ('blog', id), ('help', id)
+# and ('profile', user id) plus the versions of the fragment's own scopes:
+# 'help:<id>' for a thread and its replies, 'profile:<user id>' for a
+# user's bio, picture, posts and blogs. A write moves only the fragments
+# that show it, through any worker; superseded entries age out of the LRU.
+# Blogs can't be edited and show only their author's username, so their
+# fragment has no scope.
+def profile_scope(user_id):
+    return f"profile:{user_id}"
+
+
+def cached_fragment(key, template, load, scopes=()):
+    # `load` returns the template context, or aborts (nothing is cached then).
+    # Rendered from the primary: a lagging replica would otherwise be cached
+    # under the new versions.
+    def render():
+        with primary():
+            return render_template(template, **load())
+    versions = list_versions(scopes) if scopes else []
+    return Markup(fragment_cache.get_or_render((*key, *versions), render))
+
+
+@bp.route('/fragments/metrics')
+@login_required
+def fragment_metrics():
+    return fragment_cache.stats()
+
+
+# ----------------------------------------
+# Conditional GET
+# ----------------------------------------
+# Each read view names the version scopes its page depends on; every write
+# bumps the scopes it changes, in its own transaction, via bump_versions().
+#
+#     'posts', 'post_likes'   feed, profile
+#     'blogs', 'blog_likes'   blog list and detail, profile
+#     'help'                  help list, threads, new-reply polls
+#     'users'                 anything showing a username or picture
+#     'tasks:<user id>'       that user's dashboard task stats (no ETag)
+#
+# The page ETag is those versions plus the viewer and render_stamp(), so a
+# revalidation costs one primary-key query instead of the page's queries and
+# templates. Counters rather than max(date_posted): edits, deletes and
+# unlikes change a page without moving any date.
+def render_stamp(app):
+    return directory_stamp(os.path.join(app.root_path, app.template_folder), app.static_folder,
+                           skip=(app.extensions['upload_store'].root,))
+
+
+def list_versions(scopes):
+    rows = dict(db.session.query(ListVersion.name, ListVersion.version)
+                .filter(ListVersion.name.in_(scopes)).all())
+    return [rows.get(scope, 0) for scope in scopes]
+
+
+def bump_versions(*scopes):
+    # Part of the caller's transaction; commit follows.
+    db.session.execute(insert_ignore(ListVersion.__table__), [{'name': scope} for scope in scopes])
+    db.session.execute(db.update(ListVersion).where(ListVersion.name.in_(scopes))
+                       .values(version=ListVersion.version + 1))
+
+
+def list_conditional(*scopes):
+    def stamp():
+        if current_app.jinja_env.auto_reload:
+            current_app.extensions['render_stamp'] = render_stamp(current_app)
+        return (current_app.extensions['render_stamp'], current_user.get_id(), *list_versions(scopes))
+    return conditional(stamp)
+
+
+# ----------------------------------------
+# Search index
+# ----------------------------------------
+def search_document(obj):
+    if isinstance(obj, Post):
+        author = obj.author.username if obj.author else ''
+        return 'post', f"{obj.content} {author}"
+    if isinstance(obj, Blog):
+        return 'blog', f"{obj.title} {obj.content}"
+    if isinstance(obj, HelpRequest):
+        return 'help', f"{obj.title} {obj.description}"
+    return None
+
+
+def ensure_search_index():
+    # Populate an empty index from the database once per process; after that
+    # it is kept current by the session hooks below.
+    if current_app.extensions['search_index_built']:
+        return
+    for kind, model in (('post', Post), ('blog', Blog), ('help', HelpRequest)):
+        if search_index.count(kind) == 0:
+            reindex_search(kind, model)
+    current_app.extensions['search_index_built'] = True
+
+
+def reindex_search(kind, model):
+    query = model.query
+    if model is Post:
+        query = query.options(db.joinedload(Post.author))
+    batch = []
+    for obj in query.yield_per(1000):
+        batch.append((obj.id, search_document(obj)[1]))
+        if len(batch) >= 1000:
+            search_index.add_many(kind, batch)
+            batch = []
+    if batch:
+        search_index.add_many(kind, batch)
+
+
+def search_ids(kind, text, prefix=''):
+    ensure_search_index()
+    return search_index.search_ids(kind, text, current_app.config['SEARCH_MAX_RESULTS'], prefix)
+
+
+def search_page(query, model, kind, text, cursor, per_page, prefix=''):
+    # The best SEARCH_MAX_RESULTS matches for `text` (plus words starting
+    # with the `prefix` tokens) among the rows of `query`, best first. The database only filters the ranked ids (by
+    # author, subject, ...), it never re-sorts them, so pages are addressed
+    # by their offset into the ranking rather than by a date cursor.
+    ranked = search_ids(kind, text, prefix)
+    visible = {row_id for row_id, in query.with_entities(model.id).filter(model.id.in_(ranked))}
+    ranked = [doc_id for doc_id in ranked if doc_id in visible]
+    offset = int(cursor) if cursor.isdigit() else 0
+    page_ids = ranked[offset:offset + per_page]
+    rows = {row.id: row for row in query.filter(model.id.in_(page_ids))}
+    return KeysetPage([rows[doc_id] for doc_id in page_ids if doc_id in rows],
+                      next_cursor=str(offset + per_page) if offset + per_page < len(ranked) else None,
+                      prev_cursor=str(max(0, offset - per_page)) if offset else None)
+
+
+@db.event.listens_for(db.session, 'after_flush')
+def collect_search_changes(session, flush_context):
+    pending = session.info.setdefault('search_pending', {})
+    for obj in list(session.new) + list(session.dirty):
+        doc = search_document(obj)
+        if doc:
+            pending[(doc[0], obj.id)] = doc[1]
+    for obj in session.deleted:
+        doc = search_document(obj)
+        if doc:
+            pending[(doc[0], obj.id)] = None
+
+
+@db.event.listens_for(db.session, 'after_commit')
+def apply_search_changes(session):
+    for (kind, doc_id), text in session.info.pop('search_pending', {}).items():
+        if text is None:
+            search_index.remove(kind, doc_id)
+        else:
+            search_index.add(kind, doc_id, text)
+
+
+@db.event.listens_for(db.session, 'after_rollback')
+def discard_search_changes(session):
+    session.info.pop('search_pending', None)
+
+
+@bp.cli.command('reindex-search')
+def reindex_search_command():
+    search_index.clear()
+    for kind, model in (('post', Post), ('blog', Blog), ('help', HelpRequest)):
+        reindex_search(kind, model)
+        print(f"{kind}: {search_index.count(kind)} documents indexed")
+
+
+# ----------------------------------------
+# Likes / Reactions
+# ----------------------------------------
+def liked_ids(target_col, target_ids):
+    if not target_ids or not current_user.is_authenticated:
+        return set()
+    rows = db.session.query(target_col).filter(
+        Like.user_id == current_user.id, target_col.in_(target_ids)
+    ).all()
+    return {row[0] for row in rows}
+
+
+def set_like(model, target_id, **target):
+    # The form may send action=like/unlike to set the state idempotently;
+    # without it the like is toggled. The counter column is only moved when a
+    # Like row was really inserted or deleted, in the same transaction.
+    action = request.form.get('action')
+    match = Like.query.filter_by(user_id=current_user.id, **target)
+    liked = {'like': True, 'unlike': False}.get(action)
+
+    like_buffer = current_app.extensions['like_buffer']
+    if like_buffer is not None:
+        kind = 'post' if model is Post else 'blog'
+        liked = like_buffer.set(kind, target_id, current_user.id, liked,
+                                lambda: db.session.query(match.exists()).scalar())
+        like_count = db.session.query(model.like_count).filter_by(id=target_id).scalar()
+        return {"liked": liked,
+                "like_count": like_count + like_buffer.pending_delta(kind, target_id)}
+
+    if liked is None:
+        liked = not db.session.query(match.exists()).scalar()
+
+    if liked:
+        try:
+            db.session.add(Like(user_id=current_user.id, **target))
+            db.session.flush()
+            delta = 1
+        except IntegrityError:
+            # A concurrent request already inserted the same like.
+            db.session.rollback()
+            delta = 0
+    else:
+        delta = -match.delete(synchronize_session=False)
+
+    if delta:
+        model.query.filter_by(id=target_id).update(
+            {model.like_count: model.like_count + delta}, synchronize_session=False)
+        bump_versions('post_likes' if model is Post else 'blog_likes')
+    db.session.commit()
+
+    like_count = db.session.query(model.like_count).filter_by(id=target_id).scalar()
+    return {"liked": liked, "like_count": like_count}
+
+
+# ----------------------------------------
+# Write-behind likes (LIKE_WRITE_BEHIND)
+# ----------------------------------------
+def insert_ignore(table):
+    # Multi-row insert that skips rows hitting the unique (user, target) keys.
+    if db.engine.dialect.name == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert
+        return insert(table).on_conflict_do_nothing()
+    if db.engine.dialect.name == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+        return insert(table).on_conflict_do_nothing()
+    return db.insert(table).prefix_with('IGNORE')
+
+
+def flush_likes(app, changes):
+    # One transaction per batch: bulk insert the likes, bulk delete the
+    # unlikes, then recount only the targets that were touched.
+    with app.app_context():
+        for kind, model, col in (('post', Post, Like.post_id), ('blog', Blog, Like.blog_id)):
+            added = [{'user_id': user_id, col.key: target_id}
+                     for k, target_id, user_id, liked in changes if k == kind and liked]
+            removed = [(user_id, target_id)
+                       for k, target_id, user_id, liked in changes if k == kind and not liked]
+            touched = {target_id for k, target_id, _, _ in changes if k == kind}
+            if not touched:
+                continue
+
+            if added:
+                db.session.execute(insert_ignore(Like.__table__), added)
+            if removed:
+                db.session.execute(db.delete(Like).where(
+                    db.tuple_(Like.user_id, col).in_(removed)))
+
+            counts = db.session.query(db.func.count(Like.id)).filter(col == model.id).scalar_subquery()
+            db.session.execute(db.update(model).where(model.id.in_(touched))
+                               .values(like_count=counts))
+            bump_versions(f"{kind}_likes")
+        db.session.commit()
+
+
+@bp.cli.command('recount-likes')
+def recount_likes_command():
+    # Rebuild the denormalized counters from the Like table.
+    for model, col in ((Post, Like.post_id), (Blog, Like.blog_id)):
+        counts = db.session.query(db.func.count(Like.id)).filter(col == model.id).scalar_subquery()
+        model.query.update({model.like_count: counts}, synchronize_session=False)
+    bump_versions('post_likes', 'blog_likes')
+    db.session.commit()
+    print("Like counters rebuilt.")
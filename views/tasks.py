@@ -0,0 +1,204 @@
+from datetime import datetime
+
+from flask import Blueprint, flash, redirect, render_template, request, url_for
+from flask_login import current_user, login_required
+
+from cache import TTLCache
+from extensions import app_local, db
+from model import Post, Task, TaskFacet
+from views.shared import bump_versions, insert_ignore, list_versions
+
+bp = Blueprint('tasks', __name__, cli_group=None)
+
+task_stats_cache = app_local('task_stats_cache')
+
+
+# ----------------------------------------
+# Task statistics cache
+# ----------------------------------------
+# The dashboard's task counters and upcoming list are cached per user under
+# the user's 'tasks:<id>' list version, which create_task, complete_task and
+# delete_task bump with the task. A write through any worker therefore moves
+# every worker on to a fresh entry, and a dashboard view normally costs the
+# version lookup and the user's recent posts.
+@bp.record_once
+def setup(state):
+    config = state.app.config
+    state.app.extensions['task_stats_cache'] = TTLCache('task_stats', max_entries=config['TASK_STATS_CACHE_SIZE'],
+                                                        ttl=config['TASK_STATS_CACHE_TTL'])
+
+
+def task_scope(user_id):
+    return f"tasks:{user_id}"
+
+
+def task_stats(user_id):
+    total, completed = db.session.query(
+        db.func.count(Task.id),
+        db.func.coalesce(db.func.sum(db.case((Task.is_completed.is_(True), 1), else_=0)), 0),
+    ).filter(Task.user_id == user_id).one()
+
+    upcoming = Task.query.filter_by(user_id=user_id, is_completed=False).order_by(
+        Task.due_date.asc()).limit(5).all()
+
+    # Plain dicts: cached values outlive the session that loaded them.
+    return {
+        'total': total,
+        'completed': int(completed),
+        'upcoming': [{'title': t.title, 'category': t.category, 'due_date': t.due_date}
+                     for t in upcoming],
+    }
+
+
+# ----------------------------------------
+# Tasks
+# ----------------------------------------
+def bump_task_facet(user_id, category, total=0, completed=0):
+    # Runs in the caller's transaction, so the counts commit with the task.
+    bump_versions(task_scope(user_id))
+    db.session.execute(insert_ignore(TaskFacet.__table__),
+                       [{'user_id': user_id, 'category': category or '', 'total': 0, 'completed': 0}])
+    db.session.execute(
+        db.update(TaskFacet)
+        .where(TaskFacet.user_id == user_id, TaskFacet.category == (category or ''))
+        .values(total=TaskFacet.total + total, completed=TaskFacet.completed + completed)
+    )
+
+
+@bp.route('/tasks')
+@login_required
+def tasks():
+    category = request.args.get('category', '', type=str)
+    status = request.args.get('status', 'all', type=str)
+
+    query = Task.query.filter_by(user_id=current_user.id)
+
+    if category:
+        query = query.filter(Task.category == category)
+
+    if status == 'completed':
+        query = query.filter_by(is_completed=True)
+    elif status == 'pending':
+        query = query.filter_by(is_completed=False)
+
+    tasks = query.order_by(Task.due_date.asc()).all()
+    facets = TaskFacet.query.filter(TaskFacet.user_id == current_user.id,
+                                    TaskFacet.total > 0).order_by(TaskFacet.category).all()
+    categories = [f.category for f in facets if f.category]
+    counts = {f.category: f for f in facets}
+
+    # Status counts for the selected category (or all), from the facet rows.
+    selected = [counts[category]] if category in counts else ([] if category else facets)
+    completed_count = sum(f.completed for f in selected)
+    pending_count = sum(f.total for f in selected) - completed_count
+
+    return render_template('tasks.html',
+                           tasks=tasks,
+                           categories=categories,
+                           category_counts={c: f.total for c, f in counts.items()},
+                           completed_count=completed_count,
+                           pending_count=pending_count,
+                           filter_category=category,
+                           filter_status=status if status in ('completed', 'pending') else '')
+
+
+@bp.route('/create_task', methods=['GET', 'POST'])
+@login_required
+def create_task():
+    if request.method == 'POST':
+        title = request.form['title']
+        category = request.form.get('category', '')
+        due_date_val = request.form.get('due_date')
+
+        due_date = datetime.strptime(due_date_val, '%Y-%m-%d') if due_date_val else None
+
+        new_task = Task(title=title, category=category, due_date=due_date,
+                        user_id=current_user.id)
+        db.session.add(new_task)
+        bump_task_facet(current_user.id, category, total=1)
+        db.session.commit()
+
+        flash('Task added!', 'success')
+        return redirect(url_for('tasks.tasks'))
+
+    return render_template('create_task.html')
+
+
+@bp.route('/complete_task/<int:task_id>')
+@login_required
+def complete_task(task_id):
+    task = Task.query.get_or_404(task_id)
+
+    if task.user_id != current_user.id:
+        flash('Unauthorized!', 'danger')
+        return redirect(url_for('tasks.tasks'))
+
+    if not task.is_completed:
+        task.is_completed = True
+        bump_task_facet(task.user_id, task.category, completed=1)
+    db.session.commit()
+
+    flash('Task marked completed!', 'success')
+    return redirect(url_for('tasks.tasks'))
+
+
+@bp.route('/delete_task/<int:task_id>')
+@login_required
+def delete_task(task_id):
+    task = Task.query.get_or_404(task_id)
+
+    if task.user_id != current_user.id:
+        flash('Unauthorized!', 'danger')
+        return redirect(url_for('tasks.tasks'))
+
+    db.session.delete(task)
+    bump_task_facet(task.user_id, task.category, total=-1, completed=-1 if task.is_completed else 0)
+    db.session.commit()
+
+    flash('Task deleted!', 'info')
+    return redirect(url_for('tasks.tasks'))
+
+
+@bp.cli.command('rebuild-task-facets')
+def rebuild_task_facets_command():
+    # Rebuild the per-user category counts from the Task table.
+    TaskFacet.query.delete()
+    category = db.func.coalesce(Task.category, '')
+    rows = db.session.query(
+        Task.user_id, category,
+        db.func.count(Task.id),
+        db.func.sum(db.case((Task.is_completed.is_(True), 1), else_=0)),
+    ).group_by(Task.user_id, category).all()
+    if rows:
+        db.session.execute(db.insert(TaskFacet), [
+            {'user_id': u, 'category': c, 'total': t, 'completed': d} for u, c, t, d in rows
+        ])
+    db.session.commit()
+    print(f"Rebuilt {len(rows)} task facets.")
+
+
+# ----------------------------------------
+# Dashboard
+# ----------------------------------------
+@bp.route('/dashboard')
+@login_required
+def dashboard():
+    recent_posts = Post.query.filter_by(user_id=current_user.id).order_by(Post.date_posted.desc()).limit(5).all()
+    key = (current_user.id, *list_versions([task_scope(current_user.id)]))
+    stats = task_stats_cache.get(key)
+    if stats is None:
+        stats = task_stats(current_user.id)
+        task_stats_cache.set(key, stats)
+
+    return render_template('dashboard.html',
+                           recent_posts=recent_posts,
+                           upcoming_tasks=stats['upcoming'],
+                           total_tasks=stats['total'],
+                           completed_tasks=stats['completed'],
+                           pending_tasks=stats['total'] - stats['completed'])
+
+
+@bp.route('/dashboard/metrics')
+@login_required
+def dashboard_metrics():
+    return task_stats_cache.stats()